@@ -2,23 +2,47 @@ import os
 import json
 from dotenv import load_dotenv
 import openai
-import faiss
-import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Response
 from pydantic import BaseModel
 import logging
+import threading
+import time
 from typing import Literal, Optional, Dict, Any
 from simulation.emotion_analyzer import EmotionAnalyzer, EmotionState
+from simulation.sentiment_backends import create_backend
+from simulation.emotion_store import open_store
+from simulation.request_logging import (
+    setup_queue_logging, new_request_id, should_sample_payload, log_turn, StageTimer
+)
+from simulation.tracing import get_tracer
+from simulation.menu_retrieval import MenuRetriever
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 EMB_MODEL = os.getenv("EMB_MODEL", "text-embedding-3-small")
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+LLM_SERVER_LOG_FILE = os.getenv("LLM_SERVER_LOG_FILE", "llm_server.log")
+RAG_MAX_K = int(os.getenv("RAG_MAX_K", 3))
+RAG_MAX_DISTANCE = float(os.getenv("RAG_MAX_DISTANCE", 1.3))
+RAG_RELATIVE_MARGIN = float(os.getenv("RAG_RELATIVE_MARGIN", 0.1))
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", 2048))
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "lexicon")
+SENTIMENT_MODEL_DIR = os.getenv("SENTIMENT_MODEL_DIR", "models/sentiment-onnx")
+EMOTION_STORE_PATH = os.getenv("EMOTION_STORE_PATH", "")
+EMOTION_STORE_WRITE_BEHIND = os.getenv("EMOTION_STORE_WRITE_BEHIND", "1") != "0"
+EMOTION_STORE_FLUSH_MS = float(os.getenv("EMOTION_STORE_FLUSH_MS", 200))
+EMOTION_STORE_REFRESH_MS = float(os.getenv("EMOTION_STORE_REFRESH_MS", 1000))
+EMOTION_SESSION_CACHE_SIZE = 256
+DEFAULT_SESSION_ID = "default"
+
+setup_queue_logging(LLM_SERVER_LOG_FILE)
+logger = logging.getLogger("llm_server")
+tracer = get_tracer("llm_server")
 
 if not OPENAI_API_KEY:
     raise RuntimeError("OPENAI_API_KEY is not set. Check your .env file.")
 
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+client = openai.OpenAI(api_key=OPENAI_API_KEY, base_url=os.getenv("OPENAI_BASE_URL") or None)
 
 SYSTEM_PROMPT = (
     "You are CaféBot, an advanced, multilingual service robot in an Italian coffee shop. "
@@ -104,24 +128,83 @@ SYSTEM_PROMPT = (
     "Remember: Your entire output must be a single, valid JSON object as specified."
 )
 
-emotion_analyzer = EmotionAnalyzer(history_size=10)
+sentiment_backend = (create_backend("onnx", model_dir=SENTIMENT_MODEL_DIR)
+                     if SENTIMENT_BACKEND == "onnx" else create_backend(SENTIMENT_BACKEND))
+emotion_analyzer = EmotionAnalyzer(history_size=10, score_cache_size=SENTIMENT_CACHE_SIZE, backend=sentiment_backend)
+
+#Emotion state persistence (restart and cross-worker continuity), disabled unless EMOTION_STORE_PATH is set
+emotion_store = (open_store(EMOTION_STORE_PATH, EMOTION_STORE_WRITE_BEHIND, EMOTION_STORE_FLUSH_MS / 1000.0)
+                 if EMOTION_STORE_PATH else None)
+active_session = {"id": DEFAULT_SESSION_ID}
+
+#Latest snapshot of each session seen by this process and when it was last read from the store
+session_cache: Dict[str, list] = {}
+
+def _cache_session(session_id: str, data: bytes, read_at: float):
+    session_cache.pop(session_id, None)
+    session_cache[session_id] = [data, read_at]
+    if len(session_cache) > EMOTION_SESSION_CACHE_SIZE:
+        session_cache.pop(next(iter(session_cache)))
+
+def load_emotion_state(session_id: str):
+    #Picks up the state saved by another worker or before a restart. The store is read
+    #at most every EMOTION_STORE_REFRESH_MS per session; in between the cache is used
+    if emotion_store is None:
+        return
+    try:
+        now = time.monotonic()
+        cached = session_cache.get(session_id)
+        fresh = cached is not None and now - cached[1] < EMOTION_STORE_REFRESH_MS / 1000.0
+        if fresh and session_id == active_session["id"]:
+            #The analyzer already holds this session's latest state
+            return
+        if fresh:
+            data = cached[0]
+        else:
+            data = emotion_store.load(session_id)
+            if data is not None:
+                _cache_session(session_id, data, now)
+        if session_id != active_session["id"]:
+            active_session["id"] = session_id
+            if data is None:
+                emotion_analyzer.reset_conversation()
+            else:
+                emotion_analyzer.restore(data)
+        elif data is not None:
+            emotion_analyzer.restore(data, only_if_newer=True)
+    except Exception as e:
+        logger.error(f"Could not restore emotion state for session {session_id}: {e}")
+
+def save_emotion_state(session_id: str):
+    if emotion_store is None:
+        return
+    try:
+        data = emotion_analyzer.snapshot()
+        emotion_store.save(session_id, data)
+        #Our own writes do not count as a read: other workers' updates are still picked up
+        cached = session_cache.get(session_id)
+        _cache_session(session_id, data, cached[1] if cached else time.monotonic())
+    except Exception as e:
+        logger.error(f"Could not save emotion state for session {session_id}: {e}")
 
 #KNOWLEDGE BASE (FAISS)
-index = None
-docs = []
+def embed_texts(texts):
+    emb_res = client.embeddings.create(input=texts, model=EMB_MODEL)
+    return [d.embedding for d in emb_res.data]
+
+retriever = None
 try:
     with open("menu.json", "r", encoding="utf-8") as f:
         menu_items = json.load(f)
-    docs = [json.dumps(item, ensure_ascii=False) for item in menu_items]
 
-    if docs:
+    if menu_items:
         print("Generating embeddings for knowledge base…")
-        emb_res = client.embeddings.create(input=docs, model=EMB_MODEL)
-        embs = [d.embedding for d in emb_res.data]
-        dims = len(embs[0])
-        index = faiss.IndexFlatL2(dims)
-        index.add(np.array(embs, dtype="float32"))
-        print(f"FAISS index created with {len(docs)} documents.")
+        retriever = MenuRetriever(
+            menu_items, embed_texts,
+            max_k=RAG_MAX_K, max_distance=RAG_MAX_DISTANCE, relative_margin=RAG_RELATIVE_MARGIN
+        )
+        retriever.build_index()
+        print(f"FAISS index created with {len(menu_items)} documents.")
     else:
         print("menu.json is empty or not found. Knowledge base will be unavailable.")
 
@@ -129,7 +212,7 @@ except FileNotFoundError:
     print("WARNING: menu.json not found. Knowledge base will be unavailable.")
 except Exception as e:
     print(f"Error initializing FAISS knowledge base: {e}")
-    index = None
+    retriever = None
 
 #PYDANTIC MODELS
 class Utterance(BaseModel):
@@ -151,39 +234,115 @@ class LLMResponse(BaseModel):
     content: Optional[str] = None
     function_call: Optional[FunctionCall] = None
     
+#WARM-UP
+warmup_state = {"ready": False, "timings_ms": None, "error": None}
+
+WARMUP_RESPONSE = {
+    "determined_role": "customer",
+    "response_type": "function_call",
+    "content": "Okay, navigating now.",
+    "function_call": {"name": "Maps_to", "arguments": {"location": "counter"}}
+}
+
+def warm_up():
+    """
+    Exercises the cold paths of /chat once before reporting ready: emotion
+    lexicons, pydantic validation/serialization, the pooled connection to
+    the OpenAI backend and the FAISS index. Backend failures are recorded
+    but do not block readiness.
+    """
+    timer = StageTimer()
+    try:
+        with timer.stage("emotion"):
+            #A scratch analyzer on the shared backend: warm_up() resets its conversation,
+            #which must not hit a /chat turn arriving meanwhile
+            EmotionAnalyzer(history_size=10, score_cache_size=0, backend=emotion_analyzer.backend).warm_up()
+        with timer.stage("validation"):
+            Utterance(text="warm up", session_status="first_interaction")
+            LLMResponse(**json.loads(json.dumps(WARMUP_RESPONSE))).model_dump_json()
+        with timer.stage("retrieval"):
+            if retriever:
+                retriever.search("Where is the cappuccino?")
+            else:
+                embed_texts(["Where is the cappuccino?"])
+    except Exception as e:
+        warmup_state["error"] = str(e)
+        logger.error(f"Warm-up step failed: {e}")
+    warmup_state["timings_ms"] = timer.as_dict()
+    warmup_state["ready"] = True
+    log_turn(logger, "warmup_complete", timings_ms=warmup_state["timings_ms"], error=warmup_state["error"])
+
 #FASTAPI APP
 app = FastAPI()
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+@app.on_event("startup")
+async def start_warm_up():
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+@app.get("/readyz")
+async def readyz(response: Response):
+    if not warmup_state["ready"]:
+        response.status_code = 503
+    return warmup_state
+
+@app.get("/metrics")
+async def metrics():
+    return {"sentiment_cache": emotion_analyzer.score_cache.stats()}
 
 @app.post("/reset_emotion")
-async def reset_emotion():
+async def reset_emotion(x_session_id: Optional[str] = Header(None)):
+    session_id = x_session_id or DEFAULT_SESSION_ID
+    active_session["id"] = session_id
     emotion_analyzer.reset_conversation()
+    save_emotion_state(session_id)
     return {"status": "emotion_context_reset"}
 
 @app.post("/chat", response_model=LLMResponse)
-async def chat(u: Utterance):
-    emotion_state, confidence, polarity = emotion_analyzer.analyze_sentiment(u.text)
-    emotional_context = emotion_analyzer.get_emotional_context()
+async def chat(u: Utterance, response: Response, x_request_id: Optional[str] = Header(None),
+               traceparent: Optional[str] = Header(None), x_session_id: Optional[str] = Header(None)):
+    with tracer.span("chat", traceparent=traceparent, session_status=u.session_status) as span:
+        return _chat_turn(u, x_request_id or new_request_id(), span.trace_id, response,
+                          x_session_id or DEFAULT_SESSION_ID)
+
+def _chat_turn(u: Utterance, request_id: str, trace_id: str, response: Response,
+               session_id: str = DEFAULT_SESSION_ID) -> LLMResponse:
+    timer = StageTimer(tracer)
+    turn = {
+        "request_id": request_id,
+        "trace_id": trace_id,
+        "session_id": session_id,
+        "session_status": u.session_status,
+        "current_role": u.current_role,
+        "cache_hits": {},
+        "fallback_reason": None,
+    }
 
-    logging.info(
+    with timer.stage("emotion"):
+        load_emotion_state(session_id)
+        emotion_state, confidence, polarity = emotion_analyzer.analyze_sentiment(u.text)
+        emotional_context = emotion_analyzer.get_emotional_context()
+        save_emotion_state(session_id)
+    turn["cache_hits"]["sentiment"] = emotion_analyzer.last_cache_hit
+
+    logger.debug(
         f"Emotion Analysis - State: {emotion_state}, "
         f"Confidence: {confidence:.2f}, "
         f"Frustration: {emotional_context['frustration_level']:.2f}, "
         f"Confusion: {emotional_context['confusion_level']:.2f}, "
         f"Engagement: {emotional_context['engagement']:.2f}"
     )
+    turn["emotion"] = emotion_state
+    turn["frustration"] = round(emotional_context['frustration_level'], 2)
     
-    #RAG context retrieval
+    #RAG context retrieval (skipped for queries that are not about the menu)
     context = ""
-    if index and docs:
-        try:
-            q_res = client.embeddings.create(input=[u.text], model=EMB_MODEL)
-            q_emb = q_res.data[0].embedding
-            k = min(3, len(docs))
-            _, I = index.search(np.array([q_emb], dtype="float32"), k)
-            context = "\n\n".join(docs[i] for i in I[0])
-        except Exception as e:
-            logging.error(f"Error during RAG context retrieval: {e}")
+    if retriever:
+        with timer.stage("retrieval"):
+            try:
+                context, retrieval_stats = retriever.retrieve(u.text, u.current_role)
+                turn.update(retrieval_stats)
+            except Exception as e:
+                logger.error(f"Error during RAG context retrieval: {e}")
     
     #Enhanced prompt with emotional context
     emotional_prompt_addon = ""
@@ -235,58 +394,81 @@ async def chat(u: Utterance):
     elif emotion_state == "positive":
         temperature = 0.3
 
+    turn["temperature"] = temperature
+    sample_payload = should_sample_payload()
+
     try:
-        logging.info(f"Sending to LLM with emotion context. Temperature: {temperature}")
-        resp = client.chat.completions.create(
-            model=LLM_MODEL,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=300,
-            response_format={ "type": "json_object" }
-        )
+        with timer.stage("completion", model=LLM_MODEL):
+            resp = client.chat.completions.create(
+                model=LLM_MODEL,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=300,
+                response_format={ "type": "json_object" }
+            )
         raw_llm_output = resp.choices[0].message.content
-        logging.info(f"Raw LLM output: {raw_llm_output}")
+        if sample_payload:
+            turn["raw_llm_output"] = raw_llm_output
 
         try:
-            parsed_output = json.loads(raw_llm_output)
-            
-            if not all(k in parsed_output for k in ["determined_role", "response_type"]):
-                raise ValueError("LLM output missing required fields.")
-            if parsed_output["determined_role"] not in ['customer', 'worker', 'supervisor']:
-                 logging.warning(f"LLM returned invalid determined_role '{parsed_output['determined_role']}', defaulting to customer.")
-                 parsed_output["determined_role"] = "customer" 
-
-            llm_response_obj = LLMResponse(**parsed_output)
-            logging.info(f"Successfully parsed and validated LLM response: {llm_response_obj.model_dump_json(indent=2)}")
+            with timer.stage("validation"):
+                parsed_output = json.loads(raw_llm_output)
+                
+                if not all(k in parsed_output for k in ["determined_role", "response_type"]):
+                    raise ValueError("LLM output missing required fields.")
+                if parsed_output["determined_role"] not in ['customer', 'worker', 'supervisor']:
+                     logger.warning(f"LLM returned invalid determined_role '{parsed_output['determined_role']}', defaulting to customer.")
+                     parsed_output["determined_role"] = "customer" 
+                     turn["fallback_reason"] = "invalid_role"
+
+                llm_response_obj = LLMResponse(**parsed_output)
+            turn["role"] = llm_response_obj.determined_role
+            turn["response_type"] = llm_response_obj.response_type
+            if sample_payload:
+                turn["response"] = llm_response_obj.model_dump()
             return llm_response_obj
 
         except json.JSONDecodeError as e:
-            logging.error(f"Failed to parse LLM JSON output. Error: {e}. Output: {raw_llm_output}")
+            logger.error(f"Failed to parse LLM JSON output. Error: {e}. Output: {raw_llm_output}")
+            turn["fallback_reason"] = "json_decode_error"
             
             if emotional_context['frustration_level'] > 0.6:
                 fallback_content = "I understand this is frustrating. Let me get someone to help you."
             else:
                 fallback_content = "I encountered an issue. Please try rephrasing."
             
+            turn["role"] = "customer"
             return LLMResponse(
                 determined_role="customer",
                 response_type="content",
                 content=fallback_content
             )
         except ValueError as e:
-            logging.error(f"LLM output validation error: {e}. Output: {raw_llm_output}")
+            logger.error(f"LLM output validation error: {e}. Output: {raw_llm_output}")
+            turn["fallback_reason"] = "validation_error"
+            turn["role"] = "customer"
             return LLMResponse(
                 determined_role="customer",
                 response_type="content",
                 content="Let me try to understand that better. Could you rephrase?"
             )
 
-    except openai.error.OpenAIError as e:
-        logging.error(f"OpenAI API error: {e}")
-        raise HTTPException(status_code=503, detail=f"OpenAI API error: {str(e)}")
+    except openai.OpenAIError as e:
+        logger.error(f"OpenAI API error: {e}")
+        turn["fallback_reason"] = "openai_error"
+        raise HTTPException(status_code=503, detail=f"OpenAI API error: {str(e)}",
+                            headers={"X-Fallback-Reason": turn["fallback_reason"]})
     except Exception as e:
-        logging.error(f"Unexpected error in /chat endpoint: {e}")
-        raise HTTPException(status_code=500, detail=f"Unexpected server error: {str(e)}")
+        logger.error(f"Unexpected error in /chat endpoint: {e}")
+        turn["fallback_reason"] = "server_error"
+        raise HTTPException(status_code=500, detail=f"Unexpected server error: {str(e)}",
+                            headers={"X-Fallback-Reason": turn["fallback_reason"]})
+    finally:
+        turn["timings_ms"] = timer.as_dict()
+        #Only reaches the client on successful responses; error paths pass it to HTTPException
+        if turn["fallback_reason"]:
+            response.headers["X-Fallback-Reason"] = turn["fallback_reason"]
+        log_turn(logger, "chat_turn", **turn)
 
 
 if __name__ == "__main__":
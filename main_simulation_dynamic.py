@@ -5,6 +5,7 @@ import math
 import numpy as np
 import json
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from simulation import (
     default_configuration_simulation, 
     motion_simulation, 
@@ -15,11 +16,17 @@ from simulation import (
     live_speech
 )
 from simulation.proactive_assistant import ProactiveAssistant
+from simulation.perception_worker import start_worker, stop_worker
+from simulation.frame_recorder import PERCEPTION_RECORD_DIR, FrameRecorder
 from simulation.emotion_analyzer import EmotionAnalyzer
+from simulation.tracing import get_tracer
 
-dynamic_semantic_map = []
+dynamic_semantic_map = None
 WAKE_WORD = "pepper"
+SCAN_VIEWS = 10
+SCAN_BATCH_SIZE = 5
 system_running = True
+tracer = get_tracer("simulation")
 
 def build_environment(client_id):
     print("Building environment...")
@@ -40,11 +47,18 @@ def build_environment(client_id):
     print("Environment built.")
     return [person_id]
 
+_view_proj_cache = {}
+
 def _make_view_proj(pepper, camera_link):
     link_state = p.getLinkState(pepper.robot_model, camera_link,
                                 computeForwardKinematics=True)
     cam_pos   = link_state[4]     
     cam_orn   = link_state[5]         
+    #View and projection only change with the link pose; both getters share one entry
+    key = (pepper.robot_model, camera_link, cam_pos, cam_orn)
+    cached = _view_proj_cache.get(key)
+    if cached is not None:
+        return cached
     cam_mat   = p.getMatrixFromQuaternion(cam_orn)
     cam_dir   = [cam_mat[0], cam_mat[3], cam_mat[6]] 
     cam_up    = [cam_mat[2], cam_mat[5], cam_mat[8]] 
@@ -55,6 +69,9 @@ def _make_view_proj(pepper, camera_link):
                                              aspect=4/3,
                                              nearVal=0.1,
                                              farVal=5.0)
+    if len(_view_proj_cache) >= 64:
+        _view_proj_cache.clear()
+    _view_proj_cache[key] = (view, proj)
     return view, proj
 
 def getCameraViewMatrix(self, cam_id=2):
@@ -72,25 +89,35 @@ def get_robot_position_callback():
     pos, _ = p.getBasePositionAndOrientation(pepper.robot_model)
     return (pos[0], pos[1])
 
-def scan_environment(pepper, perception_module):
+def scan_environment(pepper, perception_module, views=SCAN_VIEWS, batch_size=SCAN_BATCH_SIZE):
+    #Frames are captured on this thread while a worker runs batched inference and
+    #localization on the views captured so far (batch_size=1 is the old per-view scan)
     print("Starting environment scan…")
+    scan_start = time.perf_counter()
     all_found_objects = []
     initial_pose, initial_orient = p.getBasePositionAndOrientation(pepper.robot_model)
 
-    for angle in np.linspace(0, 2*np.pi, 10, endpoint=False):
-        p.resetBasePositionAndOrientation(
-            pepper.robot_model,
-            initial_pose,
-            p.getQuaternionFromEuler([0, 0, angle])
-        )
-        time.sleep(0.1)
-        img, depth_buf, view, proj = perception_module.get_camera_image(pepper)
-        if img is None:
-            continue
-
-        det2d = perception_module.detect_objects(img)
-        det3d = perception_module.localize_objects_3d(det2d, depth_buf, view, proj)
-        all_found_objects.extend(det3d)
+    pending, frames = [], []
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan-inference") as pool:
+        for angle in np.linspace(0, 2*np.pi, views, endpoint=False):
+            p.resetBasePositionAndOrientation(
+                pepper.robot_model,
+                initial_pose,
+                p.getQuaternionFromEuler([0, 0, angle])
+            )
+            time.sleep(0.1)
+            #Frames wait for the worker, so they must not share the reusable capture buffers
+            frame = perception_module.get_camera_image(pepper, reuse_buffers=False)
+            if frame[0] is None:
+                continue
+            frames.append(frame)
+            if len(frames) >= batch_size:
+                pending.append(pool.submit(perception_module.detect_and_localize_views, frames))
+                frames = []
+        if frames:
+            pending.append(pool.submit(perception_module.detect_and_localize_views, frames))
+        for future in pending:
+            all_found_objects.extend(future.result())
 
     p.resetBasePositionAndOrientation(
         pepper.robot_model,
@@ -98,13 +125,13 @@ def scan_environment(pepper, perception_module):
         p.getQuaternionFromEuler([0, 0, 0])
     )
 
-    unique = {
-      f"{o['label']}_{tuple(np.round(o['world_coordinates'],0))}": o
-      for o in all_found_objects
-    }
+    #Views overlap: the fused map merges repeated sightings of the same object;
+    #people are left to the tracker
     global dynamic_semantic_map
-    dynamic_semantic_map = list(unique.values())
-    print(f"Scan complete. Found {len(dynamic_semantic_map)} unique objects.")
+    dynamic_semantic_map = perception_module.semantic_map
+    dynamic_semantic_map.integrate([o for o in all_found_objects if o['label'] not in perception_module.tracker.labels])
+    print(f"Scan complete. Found {len(dynamic_semantic_map)} unique objects "
+          f"in {time.perf_counter() - scan_start:.2f}s ({views} views, batch size {batch_size}).")
 
 def adaptive_gesture_based_on_emotion(pepper, emotion_context):
     if emotion_context['frustration_level'] > 0.6:
@@ -186,39 +213,41 @@ def run_interaction_with_emotion(command, pepper, menu_data, ignored_obstacles):
     if not command:
         return
     
-    print(f"\n[EMOTION] Analyzing: '{command}'")
-    emotion, confidence, polarity = emotion_analyzer.analyze_sentiment(command)
-    emotional_context = emotion_analyzer.get_emotional_context()
+    with tracer.span("interaction", text=command):
+        print(f"\n[EMOTION] Analyzing: '{command}'")
+        with tracer.span("emotion"):
+            emotion, confidence, polarity = emotion_analyzer.analyze_sentiment(command)
+            emotional_context = emotion_analyzer.get_emotional_context()
     
-    print(f"[EMOTION] State: {emotion}, Confidence: {confidence:.2f}")
-    print(f"  Frustration: {emotional_context['frustration_level']:.2f}")
-    print(f"  Confusion: {emotional_context['confusion_level']:.2f}")
-    print(f"  Engagement: {emotional_context['engagement']:.2f}")
-    adaptive_gesture_based_on_emotion(pepper, emotional_context)
-    if emotional_context['frustration_level'] > 0.7:
-        say_simulation.say(pepper, "I can see this is challenging. Let me help you step by step.")
-        time.sleep(1)
-    llm_response = simulation_llm_bridge.process_user_command(command)
-    if llm_response:
-        if emotional_context['confusion_level'] > 0.5:
-            original_say = say_simulation.say
-            def slow_say(p, text):
-                words = text.split()
-                for i in range(0, len(words), 3):
-                    chunk = ' '.join(words[i:i+3])
-                    original_say(p, chunk)
-                    time.sleep(0.2)
-            say_simulation.say = slow_say
+        print(f"[EMOTION] State: {emotion}, Confidence: {confidence:.2f}")
+        print(f"  Frustration: {emotional_context['frustration_level']:.2f}")
+        print(f"  Confusion: {emotional_context['confusion_level']:.2f}")
+        print(f"  Engagement: {emotional_context['engagement']:.2f}")
+        adaptive_gesture_based_on_emotion(pepper, emotional_context)
+        if emotional_context['frustration_level'] > 0.7:
+            say_simulation.say(pepper, "I can see this is challenging. Let me help you step by step.")
+            time.sleep(1)
+        llm_response = simulation_llm_bridge.process_user_command(command)
+        if llm_response:
+            if emotional_context['confusion_level'] > 0.5:
+                original_say = say_simulation.say
+                def slow_say(p, text):
+                    words = text.split()
+                    for i in range(0, len(words), 3):
+                        chunk = ' '.join(words[i:i+3])
+                        original_say(p, chunk)
+                        time.sleep(0.2)
+                say_simulation.say = slow_say
         
-        simulation_llm_bridge.handle_llm_response(
-            pepper, llm_response, dynamic_semantic_map, menu_data, ignored_obstacles
-        )
-        if emotional_context['confusion_level'] > 0.5:
-            say_simulation.say = original_say
-    if emotion == 'positive' and confidence > 0.7:
-        pepper.setAngles(["HeadPitch"], [-0.2], 0.3)
-        time.sleep(0.3)
-        pepper.setAngles(["HeadPitch"], [0], 0.3)
+            simulation_llm_bridge.handle_llm_response(
+                pepper, llm_response, dynamic_semantic_map, menu_data, ignored_obstacles
+            )
+            if emotional_context['confusion_level'] > 0.5:
+                say_simulation.say = original_say
+        if emotion == 'positive' and confidence > 0.7:
+            pepper.setAngles(["HeadPitch"], [-0.2], 0.3)
+            time.sleep(0.3)
+            pepper.setAngles(["HeadPitch"], [0], 0.3)
 
 if __name__ == "__main__":
     try:
@@ -233,7 +262,10 @@ if __name__ == "__main__":
     
     ignored_obstacles = build_environment(client_id)
     perception_module = perception.PerceptionModule()
+    if PERCEPTION_RECORD_DIR:
+        perception_module.recorder = FrameRecorder(PERCEPTION_RECORD_DIR)
     emotion_analyzer = EmotionAnalyzer()
+    emotion_analyzer.warm_up()
     proactive_assistant = ProactiveAssistant(perception_module, get_robot_position_callback)
     default_configuration_simulation.wake_up(pepper)
     
@@ -241,6 +273,8 @@ if __name__ == "__main__":
     scan_environment(pepper, perception_module)
     
     motion_simulation.moveToGoal(pepper, (0.0, 0.0), ignored_obstacles)
+    #Started after the scan, which moves the robot and captures on its own
+    start_worker(perception_module, pepper)
     print("\n[SYSTEM] Starting proactive monitoring...")
     
     proactive_assistant.start_monitoring(pepper)
@@ -252,6 +286,8 @@ if __name__ == "__main__":
     proactive_thread.start()
     print("[SYSTEM] Proactive assistance thread started")
 
+    simulation_llm_bridge.wait_for_server()
+
     print("\n\n--- DEMO SCENARIO 1: CUSTOMER INTERACTION ---")
     say_simulation.say(pepper, "I've finished scanning. I will now run a short demo to show my capabilities.")
     time.sleep(2)
@@ -300,12 +336,16 @@ if __name__ == "__main__":
         print("\n[SYSTEM] Shutting down...")
         system_running = False
         proactive_assistant.stop_monitoring()
+        stop_worker(pepper)
+        if perception_module.recorder is not None:
+            perception_module.recorder.close()
         final_status = proactive_assistant.get_environment_status()
         print(f"\n[FINAL STATS]")
         print(f"  Total users tracked: {final_status['statistics']['total_users_tracked']}")
         print(f"  Interventions triggered: {final_status['statistics']['interventions_triggered']}")
         print(f"  Successful interventions: {final_status['statistics']['successful_interventions']}")
         print(f"  Avg dwell time: {final_status['statistics']['average_dwell_time']:.1f}s")
+        print(f"  Inference skipped (unchanged view): {final_status['perception']['gate']['skip_ratio']:.0%}")
         
         say_simulation.say(pepper, "Goodbye and have a great day!")
         dance_simulation.dance(pepper, "See you soon!")
@@ -6,10 +6,14 @@ import time
 import logging
 from urllib.parse import quote
 import os
+from typing import Dict, Any
+from simulation.request_logging import setup_queue_logging, new_request_id, log_turn, StageTimer
+from simulation.tracing import get_tracer
 
 PEPPER_IP = os.getenv("PEPPER_IP", "127.0.0.1")
 PEPPER_PORT = int(os.getenv("PEPPER_PORT", 9559))
 LLM_SERVER_URL = os.getenv("LLM_SERVER_URL", "http://localhost:8000/chat")
+LLM_READY_URL = os.getenv("LLM_READY_URL", LLM_SERVER_URL.rsplit("/", 1)[0] + "/readyz")
 DISPLAY_URL_BASE = os.getenv("DISPLAY_URL_BASE", "http://localhost:8000")
 
 ASR_VERY_LOW_CONF_THRESHOLD = float(os.getenv("ASR_VERY_LOW_CONF_THRESHOLD", 0.20)) 
@@ -26,6 +30,10 @@ CURRENT_LANGUAGE = "English"
 CONSECUTIVE_ASR_FAILURES = 0
 MAX_ASR_FAILURES_BEFORE_RESET = 2
 
+setup_queue_logging(os.getenv("PEPPER_BRIDGE_LOG_FILE", "pepper_llm_bridge.log"))
+tracer = get_tracer("pepper_llm_bridge")
+http = requests.Session()
+
 try:
     with open("menu.json", "r", encoding="utf-8") as f:
         menu_items = json.load(f)
@@ -33,12 +41,6 @@ except FileNotFoundError:
     menu_items = []
     logging.warning("menu.json not found. Product related functions might be limited.")
 
-logging.basicConfig(
-    filename="pepper_llm_bridge.log",
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(filename)s:%(lineno)d | %(message)s"
-)
-
 session = None
 tts, motion, tablet, memory, asr, awareness, posture, animation_player = (None,) * 8
 ROBOT_IS_SPEAKING = False 
@@ -89,12 +91,27 @@ def simple_say(text_to_say: str):
     ROBOT_IS_SPEAKING = True
     logging.info(f"Robot SAYING (simple): '{text_to_say}'")
     try:
-        tts.say(text_to_say)
+        with tracer.span("simple_say", chars=len(text_to_say)):
+            tts.say(text_to_say)
     except Exception as e:
         logging.error(f"Error during tts.say in simple_say: {e}")
     finally:
         ROBOT_IS_SPEAKING = False
 
+def wait_for_llm_server(timeout: float = 60.0) -> bool:
+    #Waits for llm_server warm-up and opens the pooled connection used by every turn
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if http.get(LLM_READY_URL, timeout=2.0).ok:
+                logging.info("LLM server is ready.")
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(1.0)
+    logging.warning(f"LLM server not ready after {timeout:.0f}s ({LLM_READY_URL}).")
+    return False
+
 def reset_session_state():
     global CURRENT_USER_ROLE, LAST_INTERACTION_TIME, CONSECUTIVE_ASR_FAILURES
     logging.info(f"Resetting session state. Previous role: {CURRENT_USER_ROLE}")
@@ -190,7 +207,11 @@ def handle_function_call_from_llm(fn_call_data: Dict[str, Any]):
         simple_say(f"I'm not familiar with the action: {name}.")
 
 
-def process_user_query_combined(query_text: str):
+def process_user_query_combined(query_text: str, parent_span=None):
+    with tracer.span("process_query", parent=parent_span):
+        _process_user_query(query_text)
+
+def _process_user_query(query_text: str):
     global CURRENT_USER_ROLE, LISTENING_ACTIVE, LAST_INTERACTION_TIME, CONSECUTIVE_ASR_FAILURES
     
     if not session or not session.isConnected():
@@ -203,13 +224,17 @@ def process_user_query_combined(query_text: str):
 
     session_status_val = "first_interaction" if CURRENT_USER_ROLE == "unknown" else "ongoing_interaction"
     payload = {"text": query_text, "session_status": session_status_val, "current_role": CURRENT_USER_ROLE}
+    request_id = new_request_id()
+    timer = StageTimer(tracer)
+    fallback_reason = None
     
     logging.info(f"Sending query to LLM (error handling mode): {payload}")
-    start_time = time.time()
     llm_response_for_log = None
 
     try:
-        response = requests.post(LLM_SERVER_URL, json=payload, timeout=15.0)
+        with timer.stage("llm_request"):
+            headers = tracer.inject_headers({"X-Request-ID": request_id})
+            response = http.post(LLM_SERVER_URL, json=payload, headers=headers, timeout=15.0)
         llm_response_for_log = response.text 
         response.raise_for_status()
         llm_data = response.json() 
@@ -228,38 +253,58 @@ def process_user_query_combined(query_text: str):
         
         if response_type == "function_call" and function_call_dict:
             if reply_content:
-                simple_say(reply_content)
-            handle_function_call_from_llm(function_call_dict) 
+                with timer.stage("tts", trace=False):
+                    simple_say(reply_content)
+            with timer.stage("function_call"):
+                handle_function_call_from_llm(function_call_dict) 
         elif response_type == "content" and reply_content:
-            simple_say(reply_content)
+            with timer.stage("tts", trace=False):
+                simple_say(reply_content)
         elif not reply_content and not function_call_dict:
             logging.warning(f"LLM returned no content and no function call. Query: '{query_text}'")
+            fallback_reason = "empty_response"
             simple_say("I'm not quite sure how to help with that. Could you try asking in a different way, perhaps?")
         else: 
             logging.error(f"LLM returned an unexpected or incomplete JSON structure: {llm_data}")
+            fallback_reason = "unexpected_structure"
             simple_say("I received a slightly confusing response. Could we try that again, please?")
 
     except requests.exceptions.Timeout:
         logging.error("LLM request (combined) timed out.")
+        fallback_reason = "timeout"
         simple_say("I'm taking a bit too long to think about that. Could you try asking again in a moment?")
     except requests.exceptions.RequestException as e:
         logging.error(f"LLM request (combined) failed: {e}")
+        fallback_reason = "request_error"
         simple_say("I'm having some trouble connecting to my AI services right now. Please try again soon.")
     except (json.JSONDecodeError, KeyError, AttributeError) as e:
         logging.error(f"Error processing LLM's JSON response: {e}. Raw Response: {llm_response_for_log}")
+        fallback_reason = "bad_response"
         simple_say("I seem to have received a muddled response from my brain. Could you please rephrase your question?")
     except Exception as e:
         logging.error(f"Unexpected error during combined query processing: {e}")
+        fallback_reason = "unexpected_error"
         simple_say("An unexpected issue occurred while I was processing that. My apologies.")
     finally:
         LISTENING_ACTIVE = False 
 
-    elapsed_time = time.time() - start_time
-    logging.info(
-        f"Processed: User='{query_text}' | Status='{session_status_val}' | Det.Role='{CURRENT_USER_ROLE}' | Time={elapsed_time:.2f}s"
+    log_turn(
+        logging.getLogger("pepper_llm_bridge"), "bridge_turn",
+        request_id=request_id,
+        trace_id=tracer.current_span().trace_id,
+        session_status=session_status_val,
+        role=CURRENT_USER_ROLE,
+        timings_ms=timer.as_dict(),
+        fallback_reason=fallback_reason
     )
 
 def on_word_recognized_callback(key, value, message):
+    with tracer.span("asr_callback") as span:
+        if value and value[0]:
+            span.set(asr_text=value[0], asr_confidence=value[1])
+        _handle_word_recognized(value)
+
+def _handle_word_recognized(value):
     global LISTENING_ACTIVE, CURRENT_USER_ROLE, LAST_INTERACTION_TIME, CONSECUTIVE_ASR_FAILURES, ROBOT_IS_SPEAKING
     
     if ROBOT_IS_SPEAKING:
@@ -318,7 +363,7 @@ def on_word_recognized_callback(key, value, message):
             # threading.Timer(2.0, lambda: os._exit(0)).start() 
             return
         
-        threading.Thread(target=process_user_query_combined, args=(text,)).start()
+        threading.Thread(target=process_user_query_combined, args=(text, tracer.current_span())).start()
     
     elif WAKE_WORD in text_lower:
         if confidence < ASR_ACCEPTABLE_CONF_THRESHOLD:
@@ -337,7 +382,7 @@ def on_word_recognized_callback(key, value, message):
         
         logging.info(f"Wake word detected. Role: '{CURRENT_USER_ROLE}'. Query part: '{query_after_wake_word}'")
         if query_after_wake_word:
-            threading.Thread(target=process_user_query_combined, args=(query_after_wake_word,)).start()
+            threading.Thread(target=process_user_query_combined, args=(query_after_wake_word, tracer.current_span())).start()
         else:
             LAST_INTERACTION_TIME = time.time()
             logging.info("Awaiting command after wake word...")
@@ -350,6 +395,7 @@ if __name__ == "__main__":
         logging.info(f"Pepper LLM Bridge (Error Handling Mode) running. Say '{WAKE_WORD}' to interact.")
         print(f"Pepper LLM Bridge (Error Handling Mode) running. Say '{WAKE_WORD}' to interact.")
         reset_session_state() 
+        wait_for_llm_server()
         simple_say("Hello, I'm CafeBot, How can i help you today?")
 
         try:
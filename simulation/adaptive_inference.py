@@ -0,0 +1,152 @@
+"""
+Adaptive-resolution and region-of-interest inference.
+
+A quiet scene does not need full-resolution YOLO. AdaptiveInference picks a
+mode per frame from what the previous frames contained:
+  low   - capture LOW_SIZE, full-frame inference at LOW_IMGSZ
+  roi   - as low, plus a second pass on crops around "uncertain" detections:
+          small or person-like labels (ROI_LABELS) whose confidence is near
+          the threshold. Crops are enlarged and batched into one call at
+          ROI_IMGSZ, and their boxes are mapped back to frame coordinates
+  high  - capture HIGH_SIZE, full-frame inference at HIGH_IMGSZ, used from
+          the next frame on when there are more uncertain regions than MAX_ROIS
+The mode falls back to low after `quiet_frames` frames without uncertain
+regions. An escalation to high sets `escalation_pending` until the next
+frame has been inferred, so the caller can run that frame even when the
+change gate would skip it. Per-mode frame counts and latencies are kept in stats(), so the
+cost can be compared with recall (tools/bench_perception_replay.py --adaptive).
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from simulation.detection_metrics import box_iou
+
+PERCEPTION_ADAPTIVE = os.getenv("PERCEPTION_ADAPTIVE", "0") == "1"
+LOW_SIZE = (320, 240)
+HIGH_SIZE = (640, 480)
+LOW_IMGSZ = 320
+HIGH_IMGSZ = 640
+ROI_IMGSZ = 320
+#Candidates between these confidences (for ROI_LABELS) get a closer look
+ROI_MIN_CONFIDENCE = 0.2
+ROI_MAX_CONFIDENCE = 0.6
+ROI_LABELS = {"person", "cappuccino", "cornetto", "muffin"}
+ROI_SCALE = 2.0
+ROI_MIN_SIZE = 96
+MAX_ROIS = 4
+LATENCY_WINDOW = 200
+
+MODES = ("low", "roi", "high")
+
+
+class AdaptiveInference:
+    """
+    Chooses capture size and inference mode per frame and runs the detection.
+    """
+    def __init__(self, quiet_frames: int = 10, confidence_threshold: float = 0.45):
+        self.quiet_frames = quiet_frames
+        self.confidence_threshold = confidence_threshold
+        self.mode = "low"
+        self._quiet = 0
+        self._lock = threading.Lock()
+        self._latencies = {mode: deque(maxlen=LATENCY_WINDOW) for mode in MODES}
+        self._frames = {mode: 0 for mode in MODES}
+        self._rois = 0
+        self.last_mode = None
+        self.escalation_pending = False
+
+    def capture_size(self) -> Tuple[int, int]:
+        return HIGH_SIZE if self.mode == "high" else LOW_SIZE
+
+    def _uncertain(self, detections: List[Dict]) -> List[Dict]:
+        return [
+            d for d in detections
+            if d["label"] in ROI_LABELS and ROI_MIN_CONFIDENCE <= d["confidence"] < ROI_MAX_CONFIDENCE
+        ]
+
+    @staticmethod
+    def _crop_box(bbox, width: int, height: int) -> Tuple[int, int, int, int]:
+        x0, y0, x1, y1 = bbox
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        side = max(ROI_MIN_SIZE, ROI_SCALE * max(x1 - x0, y1 - y0))
+        side = min(side, width, height)
+        left = int(min(max(cx - side / 2, 0), width - side))
+        top = int(min(max(cy - side / 2, 0), height - side))
+        return left, top, left + int(side), top + int(side)
+
+    def _refine(self, perceptor, image: np.ndarray, candidates: List[Dict]) -> List[Dict]:
+        height, width = image.shape[:2]
+        boxes = [self._crop_box(c["bbox"], width, height) for c in candidates]
+        crops = [np.ascontiguousarray(image[t:b, l:r]) for l, t, r, b in boxes]
+        refined = []
+        for (left, top, _, _), dets in zip(boxes, perceptor.detect_objects_batch(crops, imgsz=ROI_IMGSZ,
+                                                                                 min_confidence=self.confidence_threshold)):
+            for d in dets:
+                d["bbox"] = np.asarray(d["bbox"], dtype=np.float32) + np.array([left, top, left, top], dtype=np.float32)
+                refined.append(d)
+        return refined
+
+    @staticmethod
+    def _merge(detections: List[Dict], extra: List[Dict]) -> List[Dict]:
+        #Crop detections replace overlapping weaker ones of the same label
+        merged = list(detections)
+        for d in extra:
+            duplicate = next((i for i, m in enumerate(merged)
+                              if m["label"] == d["label"] and box_iou(m["bbox"], d["bbox"]) > 0.5), None)
+            if duplicate is None:
+                merged.append(d)
+            elif d["confidence"] > merged[duplicate]["confidence"]:
+                merged[duplicate] = d
+        return merged
+
+    def detect(self, perceptor, image: np.ndarray) -> List[Dict]:
+        t0 = time.perf_counter()
+        mode = self.mode
+        imgsz = HIGH_IMGSZ if mode == "high" else LOW_IMGSZ
+        raw = perceptor.detect_objects(image, imgsz=imgsz, min_confidence=ROI_MIN_CONFIDENCE)
+        confident = [d for d in raw if d["confidence"] > self.confidence_threshold]
+        uncertain = self._uncertain(raw)
+
+        detections = confident
+        if mode != "high" and uncertain and len(uncertain) <= MAX_ROIS:
+            #Refine right away on this frame; more regions switch the next frames to high
+            mode = "roi"
+            detections = self._merge(confident, self._refine(perceptor, image, uncertain))
+        elif mode == "roi":
+            mode = "low"
+
+        with self._lock:
+            self._frames[mode] += 1
+            self._latencies[mode].append((time.perf_counter() - t0) * 1000.0)
+            if mode == "roi":
+                self._rois += len(uncertain)
+            if uncertain:
+                self._quiet = 0
+                next_mode = "roi" if len(uncertain) <= MAX_ROIS else "high"
+                #roi already refined this frame; high needs a new full-resolution frame
+                self.escalation_pending = next_mode == "high" and mode != "high"
+                self.mode = next_mode
+            else:
+                self._quiet += 1
+                self.escalation_pending = False
+                if self._quiet >= self.quiet_frames:
+                    self.mode = "low"
+        self.last_mode = mode
+        return detections
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = sum(self._frames.values())
+            return {
+                "mode": self.mode,
+                "frames": dict(self._frames),
+                "share": {m: (n / total if total else 0.0) for m, n in self._frames.items()},
+                "latency_p50_ms": {m: float(np.percentile(l, 50)) if l else 0.0 for m, l in self._latencies.items()},
+                "rois": self._rois,
+            }
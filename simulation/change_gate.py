@@ -0,0 +1,119 @@
+"""
+Change gate in front of YOLO inference.
+
+Most monitoring cycles look at an unchanged static scene. Before running
+detection, ChangeGate compares the new frame with the one the cached
+detections came from:
+  - camera pose: translation and rotation between the two view matrices
+  - image: mean absolute difference of small grayscale thumbnails
+If both stay under their thresholds the cached (already localized)
+detections are reused. A refresh is still forced every `max_skip_s`
+seconds, so slow drifts below the thresholds are eventually picked up.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+PERCEPTION_GATE_ENABLED = os.getenv("PERCEPTION_GATE_ENABLED", "1") == "1"
+PERCEPTION_GATE_TRANSLATION_M = float(os.getenv("PERCEPTION_GATE_TRANSLATION_M", 0.02))
+PERCEPTION_GATE_ROTATION_DEG = float(os.getenv("PERCEPTION_GATE_ROTATION_DEG", 1.0))
+PERCEPTION_GATE_PIXEL_DIFF = float(os.getenv("PERCEPTION_GATE_PIXEL_DIFF", 3.0))
+PERCEPTION_GATE_MAX_SKIP_S = float(os.getenv("PERCEPTION_GATE_MAX_SKIP_S", 5.0))
+THUMBNAIL_SIZE = (32, 24)
+
+
+def pose_delta(view_a: np.ndarray, view_b: np.ndarray):
+    #View matrices are world->camera; compare the camera poses they encode
+    rot_a, rot_b = view_a[:3, :3], view_b[:3, :3]
+    center_a = -rot_a.T @ view_a[:3, 3]
+    center_b = -rot_b.T @ view_b[:3, 3]
+    translation = float(np.linalg.norm(center_a - center_b))
+    cos_angle = (np.trace(rot_a @ rot_b.T) - 1.0) / 2.0
+    rotation = float(np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0))))
+    return translation, rotation
+
+
+class ChangeGate:
+    """
+    Decides whether a frame differs enough from the last inferred one.
+    """
+    def __init__(self, enabled: bool = PERCEPTION_GATE_ENABLED,
+                 translation_m: float = PERCEPTION_GATE_TRANSLATION_M,
+                 rotation_deg: float = PERCEPTION_GATE_ROTATION_DEG,
+                 pixel_diff: float = PERCEPTION_GATE_PIXEL_DIFF,
+                 max_skip_s: float = PERCEPTION_GATE_MAX_SKIP_S):
+        self.enabled = enabled
+        self.translation_m = translation_m
+        self.rotation_deg = rotation_deg
+        self.pixel_diff = pixel_diff
+        self.max_skip_s = max_skip_s
+
+        self._lock = threading.Lock()
+        self._view: Optional[np.ndarray] = None
+        self._thumbnail: Optional[np.ndarray] = None
+        self._inferred_at = 0.0
+        self._pending = None
+        self._checks = 0
+        self._skipped = 0
+        self._reasons = {"pose": 0, "image": 0, "max_skip": 0, "first": 0, "forced": 0}
+
+    @staticmethod
+    def thumbnail(image: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def _change_reason(self, view: np.ndarray, thumbnail: np.ndarray, now: float) -> Optional[str]:
+        if self._view is None:
+            return "first"
+        if now - self._inferred_at >= self.max_skip_s:
+            return "max_skip"
+        translation, rotation = pose_delta(self._view, view)
+        if translation > self.translation_m or rotation > self.rotation_deg:
+            return "pose"
+        if float(np.mean(np.abs(thumbnail - self._thumbnail))) > self.pixel_diff:
+            return "image"
+        return None
+
+    def should_infer(self, image: np.ndarray, view: np.ndarray, force: bool = False) -> bool:
+        #True means run detection and then call mark_inferred with the same frame;
+        #force runs it whatever changed (e.g. a pending adaptive re-check)
+        if not self.enabled:
+            return True
+        thumbnail = self.thumbnail(image)
+        now = time.time()
+        with self._lock:
+            self._checks += 1
+            reason = "forced" if force else self._change_reason(view, thumbnail, now)
+            if reason is None:
+                self._skipped += 1
+                return False
+            self._reasons[reason] += 1
+            self._pending = (np.array(view, copy=True), thumbnail, now)
+            return True
+
+    def mark_inferred(self):
+        with self._lock:
+            if self._pending is not None:
+                self._view, self._thumbnail, self._inferred_at = self._pending
+                self._pending = None
+
+    def reset(self):
+        with self._lock:
+            self._view = None
+            self._thumbnail = None
+            self._pending = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "checks": self._checks,
+                "skipped": self._skipped,
+                "skip_ratio": self._skipped / self._checks if self._checks else 0.0,
+                "inferred_because": dict(self._reasons),
+            }
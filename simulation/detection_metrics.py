@@ -0,0 +1,46 @@
+"""
+Matching of detection lists, shared by the perception benchmarks.
+
+Two detections agree when they have the same label and their boxes overlap
+with IoU >= threshold; every detection is matched at most once (greedy,
+best IoU first per reference detection).
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+
+def box_iou(a, b) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def count_matches(reference: Sequence[Dict], candidate: Sequence[Dict], threshold: float = 0.5) -> int:
+    used = set()
+    matched = 0
+    for ref in reference:
+        best, best_iou = None, threshold
+        for j, cand in enumerate(candidate):
+            if j in used or cand["label"] != ref["label"]:
+                continue
+            overlap = box_iou(ref["bbox"], cand["bbox"])
+            if overlap >= best_iou:
+                best, best_iou = j, overlap
+        if best is not None:
+            used.add(best)
+            matched += 1
+    return matched
+
+
+def agreement(reference: List[Sequence[Dict]], candidate: List[Sequence[Dict]],
+              threshold: float = 0.5) -> Tuple[float, float, float]:
+    #Precision, recall and F1 of candidate frames against reference frames
+    matched = sum(count_matches(r, c, threshold) for r, c in zip(reference, candidate))
+    n_ref = sum(len(d) for d in reference)
+    n_cand = sum(len(d) for d in candidate)
+    precision = matched / n_cand if n_cand else 1.0
+    recall = matched / n_ref if n_ref else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
@@ -0,0 +1,179 @@
+"""
+CPU inference backends for the YOLO detector.
+
+The companion PCs have no GPU, and YOLOv8n under PyTorch on CPU limits the
+perception rate. The same weights can be exported with ultralytics to
+  onnx      - run by ONNX Runtime (int8: static QDQ quantization)
+  openvino  - run by OpenVINO (int8: NNCF post-training quantization)
+and loaded back through YOLO(...), so predict() and its Results are the same
+as on the PyTorch path. Exports are cached on disk under
+PERCEPTION_EXPORT_DIR, one file or directory per (weights, backend, int8,
+image size), and are only rebuilt when missing.
+
+int8 needs a calibration set: frames captured from the simulation (see
+write_calibration_set and tools/bench_perception_backends.py) stored as
+images in PERCEPTION_CALIBRATION_DIR.
+
+The default is PyTorch; exporting is opt-in. backend="auto" picks OpenVINO,
+then ONNX Runtime, then PyTorch, depending on what is installed, and keeps
+PyTorch when a CUDA device is available.
+"""
+
+import glob
+import importlib.util
+import os
+import shutil
+import threading
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+PERCEPTION_BACKEND = os.getenv("PERCEPTION_BACKEND", "torch")
+PERCEPTION_INT8 = os.getenv("PERCEPTION_INT8", "0") == "1"
+PERCEPTION_EXPORT_DIR = os.getenv("PERCEPTION_EXPORT_DIR", "models/perception")
+PERCEPTION_CALIBRATION_DIR = os.getenv(
+    "PERCEPTION_CALIBRATION_DIR", os.path.join(PERCEPTION_EXPORT_DIR, "calibration"))
+EXPORT_IMGSZ = 640
+
+BACKENDS = ("torch", "onnx", "openvino")
+_BACKEND_MODULES = {"onnx": "onnxruntime", "openvino": "openvino"}
+_export_lock = threading.Lock()
+
+
+def backend_available(backend: str) -> bool:
+    if backend == "torch":
+        return True
+    module = _BACKEND_MODULES.get(backend)
+    return module is not None and importlib.util.find_spec(module) is not None
+
+
+def _cuda_available() -> bool:
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def select_backend(requested: Optional[str] = None) -> str:
+    requested = (requested or PERCEPTION_BACKEND).lower()
+    if requested != "auto":
+        if requested not in BACKENDS:
+            raise ValueError(f"Unknown perception backend '{requested}', expected one of {BACKENDS} or 'auto'")
+        if not backend_available(requested):
+            raise ImportError(f"Perception backend '{requested}' needs the '{_BACKEND_MODULES[requested]}' package")
+        return requested
+    if _cuda_available():
+        return "torch"
+    for backend in ("openvino", "onnx"):
+        if backend_available(backend):
+            return backend
+    return "torch"
+
+
+def exported_model_path(weights: str, backend: str, int8: bool = False, imgsz: int = EXPORT_IMGSZ) -> str:
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    name = f"{stem}_{imgsz}{'_int8' if int8 else ''}"
+    if backend == "openvino":
+        return os.path.join(PERCEPTION_EXPORT_DIR, f"{name}_openvino_model")
+    return os.path.join(PERCEPTION_EXPORT_DIR, f"{name}.onnx")
+
+
+def calibration_images(calibration_dir: str) -> List[str]:
+    return sorted(
+        path for ext in ("jpg", "png")
+        for path in glob.glob(os.path.join(calibration_dir, "images", f"*.{ext}"))
+    )
+
+
+def write_calibration_set(frames, calibration_dir: str = PERCEPTION_CALIBRATION_DIR) -> int:
+    #frames: BGR images captured from the simulation, e.g. by get_camera_image
+    image_dir = os.path.join(calibration_dir, "images")
+    os.makedirs(image_dir, exist_ok=True)
+    start = len(calibration_images(calibration_dir))
+    count = 0
+    for frame in frames:
+        if frame is None:
+            continue
+        cv2.imwrite(os.path.join(image_dir, f"frame_{start + count:05d}.jpg"), frame)
+        count += 1
+    return count
+
+
+def _calibration_yaml(calibration_dir: str, names) -> str:
+    #Ultralytics dataset file; the frames are unlabeled, only used for activation ranges
+    path = os.path.join(calibration_dir, "calibration.yaml")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"path: {os.path.abspath(calibration_dir)}\ntrain: images\nval: images\nnames:\n")
+        for idx in sorted(names):
+            f.write(f"  {idx}: '{names[idx]}'\n")
+    return path
+
+
+def _letterbox(image: np.ndarray, imgsz: int) -> np.ndarray:
+    #Same preprocessing as the ultralytics predictor for a square exported model
+    h, w = image.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    nh, nw = int(round(h * scale)), int(round(w * scale))
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - nh) // 2, (imgsz - nw) // 2
+    canvas[top:top + nh, left:left + nw] = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+
+
+def _quantize_onnx(fp32_path: str, int8_path: str, images: List[str], imgsz: int):
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.input_name = input_name
+            self.paths = iter(images)
+
+        def get_next(self):
+            path = next(self.paths, None)
+            if path is None:
+                return None
+            return {self.input_name: _letterbox(cv2.imread(path), imgsz)}
+
+    import onnxruntime as ort
+    input_name = ort.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    quantize_static(
+        fp32_path, int8_path, FrameReader(input_name),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+
+
+def export_model(weights: str, backend: str, int8: bool = False, imgsz: int = EXPORT_IMGSZ,
+                 calibration_dir: str = PERCEPTION_CALIBRATION_DIR) -> str:
+    if backend == "torch":
+        return weights
+    target = exported_model_path(weights, backend, int8, imgsz)
+    with _export_lock:
+        if os.path.exists(target):
+            return target
+        images = calibration_images(calibration_dir) if int8 else []
+        if int8 and not images:
+            raise FileNotFoundError(
+                f"int8 export needs calibration frames in {os.path.join(calibration_dir, 'images')}")
+
+        from ultralytics import YOLO
+        os.makedirs(PERCEPTION_EXPORT_DIR, exist_ok=True)
+        model = YOLO(weights)
+        print(f"[Perception] Exporting {weights} to {backend}{' int8' if int8 else ''} (imgsz {imgsz})...")
+        if backend == "openvino":
+            kwargs = {"int8": True, "data": _calibration_yaml(calibration_dir, model.names)} if int8 else {}
+            exported = model.export(format="openvino", imgsz=imgsz, dynamic=True, **kwargs)
+            shutil.move(exported, target)
+        else:
+            exported = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+            if int8:
+                _quantize_onnx(exported, target, images, imgsz)
+                os.remove(exported)
+            else:
+                shutil.move(exported, target)
+        print(f"[Perception] Cached exported model at {target}.")
+    return target
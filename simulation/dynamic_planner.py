@@ -11,7 +11,7 @@ from simulation.perception import PerceptionModule
 
 class DynamicNavigator:
     """
-    A* on a binary occupancy grid built from PerceptionModule.dynamic_semantic_map,
+    A* on a binary occupancy grid built from the fused semantic map of PerceptionModule,
     with continuous replanning when new obstacles appear.
     """
     def __init__(self):
@@ -26,18 +26,24 @@ class DynamicNavigator:
         j = int(round(y / self.resolution)) + center
         return i, j
 
-    def build_occupancy_grid(self):
+    def _fill(self, grid, ci, cj, pad, value):
+        for di in range(-pad, pad+1):
+            for dj in range(-pad, pad+1):
+                ni, nj = ci+di, cj+dj
+                if 0 <= ni < self.grid_size and 0 <= nj < self.grid_size:
+                    if di*di + dj*dj <= pad*pad:
+                        grid[ni, nj] = value
+
+    def build_occupancy_grid(self, keep_free=()):
         grid = np.zeros((self.grid_size, self.grid_size), dtype=np.uint8)
         sem_map = self.perceptor.get_dynamic_semantic_map()
         pad = int(self.buffer / self.resolution)
         for label, x, y, _ in sem_map:
             ci, cj = self.world_to_grid(x, y)
-            for di in range(-pad, pad+1):
-                for dj in range(-pad, pad+1):
-                    ni, nj = ci+di, cj+dj
-                    if 0 <= ni < self.grid_size and 0 <= nj < self.grid_size:
-                        if di*di + dj*dj <= pad*pad:
-                            grid[ni, nj] = 1
+            self._fill(grid, ci, cj, pad, 1)
+        #The goal is usually a landmark of the map itself: clear it and its buffer
+        for ci, cj in keep_free:
+            self._fill(grid, ci, cj, pad, 0)
         return grid
 
     def heuristic(self, a, b):
@@ -86,14 +92,14 @@ class DynamicNavigator:
 
         while True:
             start_cell = self.world_to_grid(*current_xy)
-            grid = self.build_occupancy_grid()
+            grid = self.build_occupancy_grid(keep_free=(goal_cell,))
             path = self.a_star(grid, start_cell, goal_cell)
             if not path:
                 raise RuntimeError("No path found.")
             for cell in path[1:]:
                 if cell == goal_cell:
                     return
-                if self.build_occupancy_grid()[cell] == 1:
+                if self.build_occupancy_grid(keep_free=(goal_cell,))[cell] == 1:
                     break
                 x = (cell[0] - self.grid_size//2) * self.resolution
                 y = (cell[1] - self.grid_size//2) * self.resolution
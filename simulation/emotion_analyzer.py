@@ -1,12 +1,58 @@
-import numpy as np
 from collections import deque
 import time
 import logging
 import json
 from enum import Enum
 from typing import Dict, List, Tuple, Optional
-from textblob import TextBlob
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from simulation.keyword_matcher import KeywordMatcher
+from simulation.repetition_detector import RepetitionDetector
+from simulation.score_cache import ScoreCache
+from simulation.sentiment_backends import SentimentBackend, LexiconBackend
+
+#Keywords for emotion detection (English and Italian)
+EMOTION_KEYWORDS = {
+    'frustrated': ['annoying', 'frustrated', 'stupid', 'broken', 'doesn\'t work', 
+                  'not working', 'useless', 'terrible', 'awful',
+                  'fastidioso', 'frustrato', 'frustrata', 'stupido', 'rotto', 'non funziona',
+                  'inutile', 'terribile', 'orribile'],
+    'confused': ['don\'t understand', 'confused', 'what', 'how', 'where', 
+                'lost', 'help', '?', 'explain',
+                'non capisco', 'confuso', 'confusa', 'cosa', 'dove', 'perso', 'persa',
+                'aiuto', 'spiega', 'spiegami'],
+    'satisfied': ['perfect', 'great', 'thanks', 'excellent', 'good', 
+                 'nice', 'wonderful', 'amazing',
+                 'perfetto', 'ottimo', 'grazie', 'eccellente', 'buono', 'bello',
+                 'meraviglioso', 'fantastico'],
+    'urgent': ['quickly', 'hurry', 'fast', 'now', 'immediately', 'urgent',
+              'velocemente', 'in fretta', 'presto', 'subito', 'adesso', 'urgente']
+}
+
+#Topics in priority order: menu items first, then actions
+TOPIC_KEYWORDS = {
+    'menu_cappuccino': ['cappuccino', 'cappuccini'],
+    'menu_espresso': ['espresso', 'espressos', 'caffè', 'caffe'],
+    'menu_tea': ['tea', 'teas', 'tè'],
+    'menu_cornetto': ['cornetto', 'cornetti', 'croissant', 'croissants', 'brioche'],
+    'menu_muffin': ['muffin', 'muffins'],
+    'menu_sandwich': ['sandwich', 'sandwiches', 'panino', 'panini', 'tramezzino'],
+    'menu_water': ['water', 'acqua'],
+    'menu_juice': ['juice', 'juices', 'succo', 'spremuta'],
+    'action_price': ['price', 'prices', 'prezzo', 'prezzi', 'costo'],
+    'action_location': ['location', 'posizione'],
+    'action_allergen': ['allergen', 'allergens', 'allergene', 'allergeni'],
+    'action_order': ['order', 'orders', 'ordine', 'ordinare'],
+    'action_menu': ['menu', 'menù'],
+}
+
+#Compiled once per process and shared by every analyzer
+KEYWORD_MATCHER = KeywordMatcher({**EMOTION_KEYWORDS, **TOPIC_KEYWORDS})
+
+#Turns used for the polarity trend slope and the mean response time
+TREND_WINDOW = 5
+RESPONSE_TIME_WINDOW = 5
+
+#Bumped whenever the snapshot layout changes; older snapshots are rejected
+SNAPSHOT_VERSION = 1
 
 class EmotionState(Enum):
     POSITIVE = "positive"
@@ -18,29 +64,40 @@ class EmotionState(Enum):
 
 class EmotionAnalyzer:
     
-    def __init__(self, history_size: int = 10):
+    def __init__(self, history_size: int = 10, repetition_threshold: float = 0.7,
+                 repetition_memory: int = 32, score_cache_size: int = 1024,
+                 backend: Optional[SentimentBackend] = None):
         self.emotion_history = deque(maxlen=history_size)
         self.interaction_timestamps = deque(maxlen=history_size)
         self.query_history = deque(maxlen=history_size)
-        self.vader = SentimentIntensityAnalyzer()
+        self.backend = backend or LexiconBackend()
         
-        #Keywords for emotion detection
-        self.emotion_keywords = {
-            'frustrated': ['annoying', 'frustrated', 'stupid', 'broken', 'doesn\'t work', 
-                          'not working', 'useless', 'terrible', 'awful'],
-            'confused': ['don\'t understand', 'confused', 'what', 'how', 'where', 
-                        'lost', 'help', '?', 'explain'],
-            'satisfied': ['perfect', 'great', 'thanks', 'excellent', 'good', 
-                         'nice', 'wonderful', 'amazing'],
-            'urgent': ['quickly', 'hurry', 'fast', 'now', 'immediately', 'urgent']
-        }
+        self.emotion_keywords = EMOTION_KEYWORDS
+        self.keyword_matcher = KEYWORD_MATCHER
+        #Stateless scores (backend scores, keyword matches) shared across sessions
+        self.score_cache = ScoreCache(score_cache_size)
+        self.last_cache_hit = False
 
-        self.repetition_counter = {}
+        #Exact repeats are remembered for the last `repetition_memory` turns,
+        #near duplicates are checked against the last 3
+        self.repetition_detector = RepetitionDetector(
+            capacity=repetition_memory, window=3, threshold=repetition_threshold
+        )
         self.topic_switches = 0
         self.last_topic = None
         self.clarification_requests = 0
         self.last_query_time = None
-        self.response_times = deque(maxlen=5)
+        self.response_times = deque(maxlen=RESPONSE_TIME_WINDOW)
+        #Wall-clock time of the last state change, used to pick the newest snapshot
+        self.updated_at = 0.0
+
+        #Running aggregates, updated once per utterance so that reading the
+        #emotional context is a constant-time snapshot
+        self._response_time_sum = 0.0
+        self._trend_polarities = deque(maxlen=TREND_WINDOW)
+        self._trend_sum_y = 0.0
+        self._trend_sum_xy = 0.0
+        self.frustration_components = self._frustration_components({}, False, None, 0, False)
 
         self.current_state = {
             'primary_emotion': EmotionState.NEUTRAL,
@@ -54,51 +111,96 @@ class EmotionAnalyzer:
         
     def analyze_sentiment(self, text: str) -> Tuple[str, float, float]:
         try:
-            blob = TextBlob(text)
-            tb_polarity = blob.sentiment.polarity
-            tb_subjectivity = blob.sentiment.subjectivity
-            vader_scores = self.vader.polarity_scores(text)
-            vader_compound = vader_scores['compound']
-            combined_polarity = 0.6 * tb_polarity + 0.4 * vader_compound
-            primary_emotion = self._detect_primary_emotion(
-                text, combined_polarity, tb_subjectivity
-            )
-            analyzer_agreement = 1 - abs(tb_polarity - vader_compound)
-            confidence = min(analyzer_agreement * (1 + tb_subjectivity), 1.0)
-            self._update_emotion_history(
-                primary_emotion, combined_polarity, confidence, text
-            )
-            engagement = self._calculate_engagement(text)
-            self.current_state['primary_emotion'] = primary_emotion
-            self.current_state['intensity'] = abs(combined_polarity)
-            self.current_state['engagement'] = engagement
-            
-            return primary_emotion.value, confidence, combined_polarity
+            polarity, subjectivity, confidence, matches = self._stateless_scores(text)
+            return self._apply_scores(text, polarity, subjectivity, confidence, matches)
             
         except Exception as e:
             logging.error(f"Sentiment analysis error: {e}")
             return EmotionState.NEUTRAL.value, 0.5, 0.0
-    
-    def _detect_primary_emotion(self, text: str, polarity: float, subjectivity: float) -> EmotionState:
 
-        text_lower = text.lower()
-        frustration_score = sum(
-            1 for word in self.emotion_keywords['frustrated'] 
-            if word in text_lower
+    def analyze_batch(self, texts: List[str], pure: bool = True) -> List[Tuple[str, float, float]]:
+        """
+        Scores many texts in one call: cache misses go to the backend as a
+        single batch. With pure=True the conversation state is left untouched
+        (offline evaluation, log re-scoring); with pure=False the texts are
+        applied in order as consecutive turns, like repeated analyze_sentiment calls.
+        """
+        if not texts:
+            return []
+        scores = [self.score_cache.get(text) for text in texts]
+        misses = [i for i, cached in enumerate(scores) if cached is None]
+        if misses:
+            t0 = time.perf_counter()
+            try:
+                batch = self.backend.score_batch([texts[i] for i in misses])
+            except Exception as e:
+                logging.error(f"Batch sentiment scoring failed, scoring one by one: {e}")
+                batch = None
+            cost_ms = (time.perf_counter() - t0) * 1000.0 / len(misses)
+            for j, i in enumerate(misses):
+                try:
+                    row = batch[j] if batch is not None else self.backend.score(texts[i])
+                    scores[i] = (float(row[0]), float(row[1]), float(row[2]), self._keyword_matches(texts[i]))
+                    self.score_cache.put(texts[i], scores[i], cost_ms)
+                except Exception as e:
+                    logging.error(f"Sentiment analysis error: {e}")
+
+        results = []
+        for text, score in zip(texts, scores):
+            if score is None:
+                results.append((EmotionState.NEUTRAL.value, 0.5, 0.0))
+                continue
+            polarity, subjectivity, confidence, matches = score
+            if pure:
+                emotion = self._detect_primary_emotion(text, polarity, subjectivity, record=False, matches=matches)
+                results.append((emotion.value, confidence, polarity))
+            else:
+                results.append(self._apply_scores(text, polarity, subjectivity, confidence, matches))
+        return results
+
+    def _keyword_matches(self, text: str) -> Dict:
+        return {k: frozenset(v) for k, v in self.keyword_matcher.scan(text).items()}
+
+    def _compute_stateless(self, text: str) -> Tuple[float, float, float, Dict]:
+        polarity, subjectivity, confidence = self.backend.score(text)
+        return polarity, subjectivity, confidence, self._keyword_matches(text)
+
+    def _stateless_scores(self, text: str) -> Tuple[float, float, float, Dict]:
+        #Cached per normalized text; the returned matches are shared and must not be mutated
+        scores, self.last_cache_hit = self.score_cache.get_or_compute(text, self._compute_stateless)
+        return scores
+
+    def _apply_scores(self, text: str, combined_polarity: float, subjectivity: float, confidence: float,
+                      matches: Optional[Dict] = None) -> Tuple[str, float, float]:
+        if matches is None:
+            matches = self.keyword_matcher.scan(text)
+        repeated = self._check_repetition(text)
+        primary_emotion = self._detect_primary_emotion(
+            text, combined_polarity, subjectivity, repeated=repeated, matches=matches
         )
-        if frustration_score >= 2 or (polarity < -0.3 and self._check_repetition(text)):
-            return EmotionState.FRUSTRATED
-        confusion_score = sum(
-            1 for word in self.emotion_keywords['confused'] 
-            if word in text_lower
+        self._update_emotion_history(
+            primary_emotion, combined_polarity, confidence, text, repeated, matches
         )
-        if confusion_score >= 2 or text_lower.count('?') > 2:
+        engagement = self._calculate_engagement(text)
+        self.current_state['primary_emotion'] = primary_emotion
+        self.current_state['intensity'] = abs(combined_polarity)
+        self.current_state['engagement'] = engagement
+        self.updated_at = time.time()
+        
+        return primary_emotion.value, confidence, combined_polarity
+    
+    def _detect_primary_emotion(self, text: str, polarity: float, subjectivity: float, record: bool = True,
+                                repeated: Optional[bool] = None, matches: Optional[Dict] = None) -> EmotionState:
+
+        if matches is None:
+            matches = self.keyword_matcher.scan(text)
+        if repeated is None and polarity < -0.3:
+            repeated = self._check_repetition(text, record)
+        if len(matches.get('frustrated', ())) >= 2 or (polarity < -0.3 and repeated):
+            return EmotionState.FRUSTRATED
+        if len(matches.get('confused', ())) >= 2 or text.count('?') > 2:
             return EmotionState.CONFUSED
-        satisfaction_score = sum(
-            1 for word in self.emotion_keywords['satisfied'] 
-            if word in text_lower
-        )
-        if satisfaction_score >= 2 and polarity > 0.5:
+        if len(matches.get('satisfied', ())) >= 2 and polarity > 0.5:
             return EmotionState.SATISFIED
         if polarity > 0.3:
             return EmotionState.POSITIVE
@@ -107,29 +209,11 @@ class EmotionAnalyzer:
         else:
             return EmotionState.NEUTRAL
     
-    def _check_repetition(self, text: str) -> bool:
-        text_normalized = text.lower().strip()
-        if text_normalized in self.repetition_counter:
-            self.repetition_counter[text_normalized] += 1
-            return self.repetition_counter[text_normalized] > 1
-        for past_query in list(self.query_history)[-3:]:
-            if self._calculate_similarity(text_normalized, past_query) > 0.7:
-                return True
-        
-        self.repetition_counter[text_normalized] = 1
-        return False
+    def _check_repetition(self, text: str, record: bool = True) -> bool:
+        return self.repetition_detector.check(text, record)
     
     def _calculate_similarity(self, text1: str, text2: str) -> float:
-        set1 = set(text1.split())
-        set2 = set(text2.split())
-        
-        if not set1 or not set2:
-            return 0.0
-        
-        intersection = set1.intersection(set2)
-        union = set1.union(set2)
-        
-        return len(intersection) / len(union)
+        return self.repetition_detector.similarity(text1, text2)
     
     def _calculate_engagement(self, text: str) -> float:
         engagement_score = 0.5
@@ -151,8 +235,10 @@ class EmotionAnalyzer:
         
         return max(0.0, min(1.0, engagement_score))
     
-    def _update_emotion_history(self, emotion: EmotionState, polarity: float, confidence: float, text: str):
+    def _update_emotion_history(self, emotion: EmotionState, polarity: float, confidence: float, text: str,
+                                repeated: bool = False, matches: Optional[Dict] = None):
         current_time = time.time()
+        gap = current_time - self.last_query_time if self.last_query_time else None
         
         self.emotion_history.append({
             'emotion': emotion,
@@ -168,60 +254,90 @@ class EmotionAnalyzer:
             recent_emotions = [h['emotion'] for h in list(self.emotion_history)[-3:]]
             unique_emotions = len(set(recent_emotions))
             self.current_state['stability'] = 1.0 / unique_emotions
-        
+
+        if gap is not None:
+            self._push_response_time(gap)
+        self._push_trend_polarity(polarity)
+
+        if matches is None:
+            matches = self.keyword_matcher.scan(text)
+        topic = self._topic_from_matches(matches)
+        if self.last_topic and topic != self.last_topic:
+            self.topic_switches += 1
+        self.last_topic = topic
+        self.frustration_components = self._frustration_components(
+            matches, repeated, gap, self.topic_switches, self._negative_trend()
+        )
+
         self.last_query_time = current_time
-    
-    def detect_frustration_patterns(self, text: str) -> float:
-        frustration_score = 0.0
-        current_time = time.time()
-        if self.last_query_time:
-            time_diff = current_time - self.last_query_time
-            if time_diff < 3:
-                frustration_score += 0.3
-            self.response_times.append(time_diff)
 
-        if self._check_repetition(text):
-            frustration_score += 0.3
+    def _push_response_time(self, gap: float):
+        if len(self.response_times) == self.response_times.maxlen:
+            self._response_time_sum -= self.response_times[0]
+        self.response_times.append(gap)
+        self._response_time_sum += gap
+
+    def _push_trend_polarity(self, polarity: float):
+        #Sliding-window sums for the least-squares slope over x = 0..n-1:
+        #dropping the oldest point shifts every remaining x down by one
+        window = self._trend_polarities
+        if len(window) == window.maxlen:
+            oldest = window[0]
+            self._trend_sum_y -= oldest
+            self._trend_sum_xy -= self._trend_sum_y
+        window.append(polarity)
+        self._trend_sum_y += polarity
+        self._trend_sum_xy += (len(window) - 1) * polarity
+
+    def _trend_slope(self) -> float:
+        n = len(self._trend_polarities)
+        if n < 2:
+            return 0.0
+        sum_x = n * (n - 1) / 2.0
+        sum_xx = (n - 1) * n * (2 * n - 1) / 6.0
+        return (n * self._trend_sum_xy - sum_x * self._trend_sum_y) / (n * sum_xx - sum_x * sum_x)
+
+    def _negative_trend(self) -> bool:
+        p = self._trend_polarities
+        if len(p) < 3:
+            return False
+        return p[-2] < 0 and p[-1] < 0 and p[-2] < p[-3] and p[-1] < p[-2]
+
+    def _frustration_components(self, matches: Dict, repeated: bool, gap: Optional[float],
+                                topic_switches: int, negative_trend: bool) -> Dict[str, float]:
+        return {
+            'rapid_response': 0.3 if gap is not None and gap < 3 else 0.0,
+            'repetition': 0.3 if repeated else 0.0,
+            'negative_trend': 0.4 if negative_trend else 0.0,
+            'keywords': 0.1 * len(matches.get('frustrated', ())),
+            'topic_switches': 0.2 if topic_switches > 3 else 0.0,
+        }
+
+    def _frustration_level(self, components: Dict[str, float]) -> float:
+        score = sum(components.values())
         if self.current_state['stability'] < 0.5:
-            frustration_score += 0.2
-        if len(self.emotion_history) >= 3:
-            recent = list(self.emotion_history)[-3:]
-            negative_trend = all(
-                h['polarity'] < 0 and h['polarity'] < prev['polarity']
-                for h, prev in zip(recent[1:], recent[:-1])
-            )
-            if negative_trend:
-                frustration_score += 0.4
-        text_lower = text.lower()
-        keyword_count = sum(
-            1 for word in self.emotion_keywords['frustrated']
-            if word in text_lower
+            score += 0.2
+        return min(score, 1.0)
+
+    def detect_frustration_patterns(self, text: str) -> float:
+        #Scores `text` as if it were the next turn, without recording it
+        gap = time.time() - self.last_query_time if self.last_query_time else None
+        matches = self.keyword_matcher.scan(text)
+        topic = self._topic_from_matches(matches)
+        switches = self.topic_switches + (1 if self.last_topic and topic != self.last_topic else 0)
+        components = self._frustration_components(
+            matches, self._check_repetition(text, record=False), gap, switches,
+            self.frustration_components['negative_trend'] > 0
         )
-        frustration_score += keyword_count * 0.1
-        current_topic = self._extract_topic(text)
-        if self.last_topic and current_topic != self.last_topic:
-            self.topic_switches += 1
-            if self.topic_switches > 3:
-                frustration_score += 0.2
-        self.last_topic = current_topic
-        
-        return min(frustration_score, 1.0)
+        return self._frustration_level(components)
     
     def _extract_topic(self, text: str) -> str:
-        menu_items = ['cappuccino', 'espresso', 'tea', 'cornetto', 
-                     'muffin', 'sandwich', 'water', 'juice']
-        actions = ['price', 'location', 'allergen', 'order', 'menu']
-        
-        text_lower = text.lower()
-        
-        for item in menu_items:
-            if item in text_lower:
-                return f"menu_{item}"
-        
-        for action in actions:
-            if action in text_lower:
-                return f"action_{action}"
-        
+        return self._topic_from_matches(self.keyword_matcher.scan(text))
+
+    def _topic_from_matches(self, matches: Dict) -> str:
+        for topic in TOPIC_KEYWORDS:
+            if topic in matches:
+                return topic
         return "general"
     
     def get_emotional_context(self) -> Dict:
@@ -237,8 +353,7 @@ class EmotionAnalyzer:
                 'recommendations': []
             }
         
-        current = self.emotion_history[-1]
-        frustration_level = self.detect_frustration_patterns("")
+        frustration_level = self._frustration_level(self.frustration_components)
         confusion_level = 0.0
         if self.current_state['primary_emotion'] == EmotionState.CONFUSED:
             confusion_level = 0.5
@@ -258,18 +373,12 @@ class EmotionAnalyzer:
             'engagement': self.current_state['engagement'],
             'stability': self.current_state['stability'],
             'recommendations': recommendations,
-            'response_time_avg': np.mean(self.response_times) if self.response_times else 10.0
+            'response_time_avg': (self._response_time_sum / len(self.response_times)
+                                  if self.response_times else 10.0)
         }
     
     def _calculate_emotional_trend(self) -> str:
-        if len(self.emotion_history) < 2:
-            return 'stable'
-        
-        recent = list(self.emotion_history)[-5:]
-        polarities = [h['polarity'] for h in recent]
-        x = np.arange(len(polarities))
-        slope = np.polyfit(x, polarities, 1)[0]
-        
+        slope = self._trend_slope()
         if slope > 0.1:
             return 'improving'
         elif slope < -0.1:
@@ -312,15 +421,123 @@ class EmotionAnalyzer:
         
         return list(set(recommendations))
     
+    def warm_up(self):
+        #Loads the backend (lexicons or model) and runs every scoring path once,
+        #then discards the synthetic turns so no customer state is affected
+        for text in ("Hello, how much is a cappuccino?",
+                     "This is not working, it's so annoying!",
+                     "Grazie, perfetto!"):
+            self.analyze_sentiment(text)
+            self.detect_frustration_patterns(text)
+        self.get_emotional_context()
+        self.restore(self.snapshot())
+        self.reset_conversation()
+        self.last_query_time = None
+        self.updated_at = 0.0
+
+    def snapshot(self) -> bytes:
+        """
+        Serializes the conversation state as compact versioned JSON (about 1 KB).
+        Caches, the backend and the configuration are not included.
+        """
+        state = {
+            'v': SNAPSHOT_VERSION,
+            'updated_at': self.updated_at,
+            'history': [
+                [h['emotion'].value, h['polarity'], h['confidence'], h['timestamp'], h['text_sample']]
+                for h in self.emotion_history
+            ],
+            'queries': list(self.query_history),
+            'response_times': list(self.response_times),
+            'trend': list(self._trend_polarities),
+            'topic': self.last_topic,
+            'topic_switches': self.topic_switches,
+            'clarifications': self.clarification_requests,
+            'last_query_time': self.last_query_time,
+            'frustration': self.frustration_components,
+            'state': {
+                'primary_emotion': self.current_state['primary_emotion'].value,
+                'secondary_emotions': [e.value if isinstance(e, EmotionState) else e
+                                       for e in self.current_state['secondary_emotions']],
+                'intensity': self.current_state['intensity'],
+                'stability': self.current_state['stability'],
+                'engagement': self.current_state['engagement'],
+            },
+            'repetition': self.repetition_detector.state(),
+        }
+        return json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    def snapshot_time(data: bytes) -> float:
+        return json.loads(data).get('updated_at', 0.0)
+
+    def restore(self, data: bytes, only_if_newer: bool = False) -> bool:
+        """
+        Replaces the conversation state with a snapshot. With only_if_newer=True
+        the snapshot is applied only if it is more recent than the current state.
+        Returns whether it was applied.
+        """
+        state = json.loads(data)
+        if state.get('v') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported emotion snapshot version {state.get('v')}")
+        if only_if_newer and state['updated_at'] <= self.updated_at:
+            return False
+
+        self.emotion_history.clear()
+        self.interaction_timestamps.clear()
+        for emotion, polarity, confidence, timestamp, text_sample in state['history']:
+            self.emotion_history.append({
+                'emotion': EmotionState(emotion),
+                'polarity': polarity,
+                'confidence': confidence,
+                'timestamp': timestamp,
+                'text_sample': text_sample
+            })
+            self.interaction_timestamps.append(timestamp)
+        self.query_history.clear()
+        self.query_history.extend(state['queries'])
+
+        self.response_times.clear()
+        self._response_time_sum = 0.0
+        for gap in state['response_times']:
+            self._push_response_time(gap)
+        self._trend_polarities.clear()
+        self._trend_sum_y = 0.0
+        self._trend_sum_xy = 0.0
+        for polarity in state['trend']:
+            self._push_trend_polarity(polarity)
+
+        self.last_topic = state['topic']
+        self.topic_switches = state['topic_switches']
+        self.clarification_requests = state['clarifications']
+        self.last_query_time = state['last_query_time']
+        self.frustration_components = dict(state['frustration'])
+        current = state['state']
+        self.current_state = {
+            'primary_emotion': EmotionState(current['primary_emotion']),
+            'secondary_emotions': list(current['secondary_emotions']),
+            'intensity': current['intensity'],
+            'stability': current['stability'],
+            'engagement': current['engagement']
+        }
+        self.repetition_detector.load_state(state['repetition'])
+        self.updated_at = state['updated_at']
+        return True
+
     def reset_conversation(self):
         self.emotion_history.clear()
         self.interaction_timestamps.clear()
         self.query_history.clear()
-        self.repetition_counter.clear()
+        self.repetition_detector.clear()
         self.topic_switches = 0
         self.last_topic = None
         self.clarification_requests = 0
         self.response_times.clear()
+        self._response_time_sum = 0.0
+        self._trend_polarities.clear()
+        self._trend_sum_y = 0.0
+        self._trend_sum_xy = 0.0
+        self.frustration_components = self._frustration_components({}, False, None, 0, False)
         self.current_state = {
             'primary_emotion': EmotionState.NEUTRAL,
             'secondary_emotions': [],
@@ -328,4 +545,5 @@ class EmotionAnalyzer:
             'stability': 1.0,
             'engagement': 0.5
         }
+        self.updated_at = time.time()
         logging.info("Emotion analyzer reset for new conversation")
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+SQLite persistence for EmotionAnalyzer snapshots, keyed by session id.
+
+EmotionStateStore writes synchronously. WriteBehindStore wraps it: save()
+only records the latest snapshot of each session in memory and a background
+thread commits pending snapshots in one transaction every `flush_interval`
+seconds, so persisting on every turn stays off the /chat critical path.
+Reads see pending and in-flight (being committed) snapshots of the same
+process first.
+"""
+
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+class EmotionStateStore:
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS emotion_state ("
+            "session_id TEXT PRIMARY KEY, updated_at REAL NOT NULL, state BLOB NOT NULL)"
+        )
+
+    def save(self, session_id: str, data: bytes):
+        self.save_many({session_id: data})
+
+    def save_many(self, snapshots: Dict[str, bytes]):
+        if not snapshots:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO emotion_state (session_id, updated_at, state) VALUES (?, ?, ?)",
+                    [(sid, now, sqlite3.Binary(data)) for sid, data in snapshots.items()]
+                )
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def load(self, session_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM emotion_state WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM emotion_state WHERE session_id = ?", (session_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class WriteBehindStore:
+    """
+    Coalescing write-behind wrapper around EmotionStateStore.
+    """
+    def __init__(self, store: EmotionStateStore, flush_interval: float = 0.2):
+        self.store = store
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, bytes] = {}
+        #Taken by a flush but not committed yet; still visible to load()
+        self._inflight: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="emotion-store", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save(self, session_id: str, data: bytes):
+        with self._lock:
+            self._pending[session_id] = data
+
+    def load(self, session_id: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._pending.get(session_id)
+            if data is None:
+                data = self._inflight.get(session_id)
+        return data if data is not None else self.store.load(session_id)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._pending.pop(session_id, None)
+            self._inflight.pop(session_id, None)
+        self.store.delete(session_id)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._inflight = pending
+        try:
+            self.store.save_many(pending)
+        except sqlite3.Error:
+            #Keep the snapshots for the next attempt unless newer ones arrived
+            with self._lock:
+                for sid, data in pending.items():
+                    self._pending.setdefault(sid, data)
+                self._inflight = {}
+            raise
+        with self._lock:
+            self._inflight = {}
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logging.error(f"Emotion store flush failed: {e}")
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+        self.flush()
+        self.store.close()
+
+
+def open_store(path: str, write_behind: bool = True, flush_interval: float = 0.2):
+    store = EmotionStateStore(path)
+    return WriteBehindStore(store, flush_interval) if write_behind else store
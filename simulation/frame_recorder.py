@@ -0,0 +1,90 @@
+"""
+Recording of camera frames for offline perception benchmarks.
+
+With PERCEPTION_RECORD_DIR set, every `PERCEPTION_RECORD_EVERY`-th frame
+captured by the demo's PerceptionModule is saved as one compressed .npz
+file holding the BGR image, the depth buffer, the view and projection
+matrices and the capture time. Frames are copied and handed to a
+background writer thread. When its queue is full new frames are dropped,
+so recording never slows down capture. load_recording() yields the frames
+back in capture order without needing PyBullet.
+"""
+
+import glob
+import os
+import queue
+import threading
+import time
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+PERCEPTION_RECORD_DIR = os.getenv("PERCEPTION_RECORD_DIR", "")
+PERCEPTION_RECORD_EVERY = int(os.getenv("PERCEPTION_RECORD_EVERY", 1))
+RECORD_QUEUE_SIZE = 64
+
+
+class FrameRecorder:
+    """
+    Writes (image_bgr, depth_buf, view, proj) frames to out_dir/frame_NNNNNN.npz.
+    """
+    def __init__(self, out_dir: str, every: int = PERCEPTION_RECORD_EVERY, max_frames: Optional[int] = None):
+        self.out_dir = out_dir
+        self.every = max(1, every)
+        self.max_frames = max_frames
+        os.makedirs(out_dir, exist_ok=True)
+        self._next_index = len(glob.glob(os.path.join(out_dir, "frame_*.npz")))
+        self._seen = 0
+        self.recorded = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=RECORD_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="frame-recorder", daemon=True)
+        self._thread.start()
+        print(f"[Perception] Recording every {self.every} frame(s) to {out_dir}.")
+
+    def record(self, frame: Tuple, timestamp: Optional[float] = None):
+        image, depth_buf, view, proj = frame
+        if image is None:
+            return
+        self._seen += 1
+        if (self._seen - 1) % self.every:
+            return
+        if self.max_frames is not None and self.recorded + self._queue.qsize() >= self.max_frames:
+            return
+        #Copies: the capture buffers are reused by the next frame
+        item = (timestamp or time.time(), image.copy(), np.array(depth_buf, dtype=np.float32),
+                np.array(view, dtype=np.float32), np.array(proj, dtype=np.float32))
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            timestamp, image, depth_buf, view, proj = item
+            path = os.path.join(self.out_dir, f"frame_{self._next_index:06d}.npz")
+            try:
+                np.savez_compressed(path, image=image, depth=depth_buf, view=view, proj=proj,
+                                    timestamp=np.float64(timestamp))
+                self._next_index += 1
+                self.recorded += 1
+            except OSError as e:
+                print(f"[Perception] Could not write {path}: {e}")
+            self._queue.task_done()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=10.0)
+        print(f"[Perception] Recorded {self.recorded} frames to {self.out_dir} ({self.dropped} dropped).")
+
+
+def load_recording(path: str, limit: Optional[int] = None) -> Iterator[Tuple[float, Tuple]]:
+    #Yields (timestamp, (image_bgr, depth_buf, view, proj)) in capture order
+    files = sorted(glob.glob(os.path.join(path, "frame_*.npz")))
+    for file in files[:limit]:
+        with np.load(file) as data:
+            yield float(data["timestamp"]), (data["image"], data["depth"], data["view"], data["proj"])
@@ -0,0 +1,52 @@
+"""
+Multi-pattern keyword matcher used by EmotionAnalyzer.
+
+All keyword sets are compiled once into a single table of token n-grams.
+A text is tokenized once and every n-gram up to the longest keyword is looked
+up in that table, so one pass returns the matches of every category, matching
+respects word boundaries ('how' no longer matches inside 'show') and the cost
+depends on the text length, not on how many keywords are registered.
+"""
+
+import re
+from typing import Dict, List, Set, Tuple
+
+_TOKEN_RE = re.compile(r"\w+|\?")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class KeywordMatcher:
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = list(categories)
+        self._terms: Dict[Tuple[str, ...], List[Tuple[str, str]]] = {}
+        for category, terms in categories.items():
+            for term in terms:
+                key = tuple(tokenize(term))
+                if key:
+                    self._terms.setdefault(key, []).append((category, term))
+        self._max_len = max((len(k) for k in self._terms), default=0)
+
+    def scan(self, text: str) -> Dict[str, Set[str]]:
+        """
+        Returns, for each category with at least one hit, the set of its
+        keywords found in `text`.
+        """
+        tokens = tokenize(text)
+        found: Dict[str, Set[str]] = {}
+        n_tokens = len(tokens)
+        for i in range(n_tokens):
+            for n in range(1, min(self._max_len, n_tokens - i) + 1):
+                hits = self._terms.get(tuple(tokens[i:i + n]))
+                if hits:
+                    for category, term in hits:
+                        found.setdefault(category, set()).add(term)
+        return found
+
+    def counts(self, text: str) -> Dict[str, int]:
+        #Number of distinct keywords of each category present in `text`
+        found = self.scan(text)
+        return {category: len(found.get(category, ())) for category in self.categories}
@@ -0,0 +1,139 @@
+"""
+Adaptive retrieval over the menu knowledge base for llm_server.
+
+A cheap local pre-classifier decides whether a query is about the menu at all,
+so greetings, role statements and navigation to non-menu places skip the query
+embedding and the FAISS search. When retrieval runs, results are filtered by
+an absolute and a relative L2 distance threshold (adaptive k), and each item
+is trimmed to the fields the query actually needs before it is put in the prompt.
+"""
+
+import re
+import json
+import faiss
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+from simulation.emotion_analyzer import TOPIC_KEYWORDS
+
+#Generic product/menu intent words (English and Italian), on top of the menu vocabulary
+MENU_INTENT_TERMS = [
+    "price", "prices", "cost", "costs", "how much", "allergen", "allergens", "allergy",
+    "ingredients", "menu", "drink", "drinks", "food", "eat", "snack", "coffee",
+    "recommend", "stock", "vegan", "gluten", "lactose", "sweet", "breakfast",
+    "prezzo", "prezzi", "costa", "quanto", "allergeni", "ingredienti", "menù",
+    "bere", "mangiare", "caffè", "dolce", "colazione",
+]
+#Product and menu-action topics of the emotion analyzer: covers the Italian item
+#names (tè, panino, spremuta, acqua...) that menu.json does not list
+MENU_TOPICS = ("menu_", "action_price", "action_allergen", "action_menu")
+
+#Ordering phrasings: the product may be named in a way the vocabulary does not know,
+#so these queries retrieve rather than risk losing the menu context
+ORDER_PATTERN = (r"\b(?:can i have|could i have|can i get|could i get|i'?d like|i would like|i want|"
+                 r"give me|posso avere|posso prendere|vorrei|prendo|mi dai|mi dà|mi da)\b")
+
+INTENT_PATTERNS = {
+    "price": r"\b(?:price|prices|cost|costs|how much|prezzo|prezzi|costa|quanto)\b",
+    "allergens": r"\b(?:allergen|allergens|allergy|gluten|lactose|milk|nuts|allergeni|latte)\b",
+    "location": r"\b(?:where|take me|guide|locate|find|dove|portami|trova)\b",
+}
+
+INTENT_FIELDS = {
+    "price": ["name", "price", "currency"],
+    "allergens": ["name", "allergens"],
+    "location": ["name", "location"],
+}
+DEFAULT_FIELDS = ["name", "description", "price", "currency", "location", "allergens"]
+STAFF_FIELDS = ["id", "stock"]
+
+MIN_PREFIX_LEN = 4
+
+
+class MenuRetriever:
+
+    def __init__(self, menu_items: List[Dict], embed_fn: Callable[[List[str]], List[List[float]]],
+                 max_k: int = 3, max_distance: float = 1.3, relative_margin: float = 0.1):
+        self.items = menu_items
+        self.embed = embed_fn
+        self.max_k = max_k
+        self.max_distance = max_distance
+        self.relative_margin = relative_margin
+        self.index = None
+
+        vocabulary = set(t.lower() for t in MENU_INTENT_TERMS)
+        for topic, words in TOPIC_KEYWORDS.items():
+            if topic.startswith(MENU_TOPICS):
+                vocabulary.update(w.lower() for w in words)
+        for item in menu_items:
+            name = item.get("name", "").lower()
+            vocabulary.add(name)
+            vocabulary.update(w for w in name.split() if len(w) >= 3)
+            vocabulary.update(k.lower() for k in item.get("keywords", []))
+            if item.get("category"):
+                vocabulary.add(item["category"].lower())
+        self.vocabulary = vocabulary
+        self._vocab_re = re.compile(
+            r"\b(?:" + "|".join(re.escape(t) for t in sorted(vocabulary, key=len, reverse=True)) + r")\b",
+            re.IGNORECASE
+        )
+        #Prefixes of single-word terms catch truncated ASR output ("cornet", "cappucc")
+        self._prefixes = {
+            w[:n] for w in vocabulary if " " not in w and len(w) >= MIN_PREFIX_LEN
+            for n in range(MIN_PREFIX_LEN, len(w) + 1)
+        }
+        self._intent_res = {k: re.compile(p, re.IGNORECASE) for k, p in INTENT_PATTERNS.items()}
+        self._order_re = re.compile(ORDER_PATTERN, re.IGNORECASE)
+
+    def build_index(self):
+        docs = [json.dumps(item, ensure_ascii=False) for item in self.items]
+        embs = self.embed(docs)
+        self.index = faiss.IndexFlatL2(len(embs[0]))
+        self.index.add(np.array(embs, dtype="float32"))
+        return self.index
+
+    def needs_retrieval(self, text: str) -> bool:
+        if self._vocab_re.search(text) or self._order_re.search(text):
+            return True
+        tokens = re.findall(r"\w+", text.lower())
+        return any(len(t) >= MIN_PREFIX_LEN and t in self._prefixes for t in tokens)
+
+    def search(self, text: str) -> List[Tuple[int, float]]:
+        q_emb = self.embed([text])[0]
+        k = min(self.max_k, len(self.items))
+        D, I = self.index.search(np.array([q_emb], dtype="float32"), k)
+        if k == 0 or I[0][0] < 0:
+            return []
+        cutoff = min(self.max_distance, float(D[0][0]) + self.relative_margin)
+        return [(int(i), float(d)) for i, d in zip(I[0], D[0]) if i >= 0 and d <= cutoff]
+
+    def fields_for(self, text: str, role: str = "unknown") -> List[str]:
+        fields = []
+        for intent, pattern in self._intent_res.items():
+            if pattern.search(text):
+                fields.extend(f for f in INTENT_FIELDS[intent] if f not in fields)
+        if not fields:
+            fields = list(DEFAULT_FIELDS)
+        if role in ("worker", "supervisor"):
+            fields.extend(STAFF_FIELDS)
+        return fields
+
+    def trim(self, item: Dict, fields: List[str]) -> str:
+        return json.dumps({f: item[f] for f in fields if f in item}, ensure_ascii=False, separators=(",", ":"))
+
+    def retrieve(self, text: str, role: str = "unknown") -> Tuple[str, Dict]:
+        """
+        Returns the prompt context for `text` (possibly empty) and a small
+        stats dict for the turn log.
+        """
+        if self.index is None:
+            return "", {"retrieval": "unavailable"}
+        if not self.needs_retrieval(text):
+            return "", {"retrieval": "skipped"}
+        hits = self.search(text)
+        fields = self.fields_for(text, role)
+        context = "\n".join(self.trim(self.items[i], fields) for i, _ in hits)
+        return context, {
+            "retrieval": "hit" if hits else "miss",
+            "retrieved_k": len(hits),
+            "best_distance": round(hits[0][1], 3) if hits else None,
+        }
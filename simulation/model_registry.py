@@ -0,0 +1,138 @@
+"""
+Process-wide registry of detection models.
+
+Every PerceptionModule used to load its own YOLO('yolov8n.pt'), and the
+dynamic demo creates several of them. The registry hands out one
+SharedModel per weights file. The model is loaded lazily on first use,
+and inference is serialized with a per-model lock because the ultralytics
+predictor keeps per-call state and is not safe to call from several
+threads at once.
+
+Models are keyed by (weights, backend, int8): the PyTorch weights can also
+run as an exported ONNX Runtime or OpenVINO model (see detector_backends).
+The backend is resolved on first use, like the model itself, so building a
+PerceptionModule imports neither torch nor a runtime. When the backend was
+picked by "auto", a failed export, load or first inference falls back to the
+PyTorch weights instead of failing perception.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from simulation.detector_backends import BACKENDS, PERCEPTION_BACKEND, PERCEPTION_INT8, export_model, select_backend
+
+
+class SharedModel:
+    """
+    Lazily loaded, thread-safe handle to one model instance.
+    """
+    def __init__(self, weights: str, backend: str = "torch", int8: bool = False):
+        self.weights = weights
+        #'auto' is resolved by _ensure_loaded; until then backend is None
+        self.requested = backend
+        self.backend = None if backend == "auto" else backend
+        self.int8 = int8 and backend != "torch"
+        #Backend chosen by "auto": on export/load/first-inference failure use the torch weights
+        self.fallback = backend == "auto"
+        self._model = None
+        self._checked = backend == "torch"
+        self._load_lock = threading.Lock()
+        self._infer_lock = threading.Lock()
+        self.load_time_s = None
+
+    def _load(self, path: str):
+        from ultralytics import YOLO
+        t0 = time.perf_counter()
+        self._model = YOLO(path, task="detect")
+        self.load_time_s = time.perf_counter() - t0
+        print(f"[Perception] Loaded {path} ({self.description}) in {self.load_time_s:.2f}s "
+              f"(shared by all PerceptionModules).")
+
+    def _fall_back(self, error: Exception) -> bool:
+        if not self.fallback or self.backend == "torch":
+            return False
+        print(f"[Perception] {self.description} backend failed ({error}), falling back to torch.")
+        self.backend, self.int8, self._checked = "torch", False, True
+        self._load(self.weights)
+        return True
+
+    def _ensure_loaded(self):
+        if self._model is not None:
+            return self._model
+        with self._load_lock:
+            if self._model is None:
+                #Also checks that an explicitly requested runtime is installed
+                self.backend = select_backend(self.requested)
+                #int8 only applies to exported models
+                self.int8 = self.int8 and self.backend != "torch"
+                self._checked = self.backend == "torch"
+                try:
+                    self._load(export_model(self.weights, self.backend, self.int8))
+                except Exception as e:
+                    if not self._fall_back(e):
+                        raise
+        return self._model
+
+    @property
+    def description(self) -> str:
+        return f"{self.backend or self.requested}{' int8' if self.int8 else ''}"
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def names(self) -> Dict[int, str]:
+        return self._ensure_loaded().names
+
+    def predict(self, source, **kwargs):
+        model = self._ensure_loaded()
+        with self._infer_lock:
+            if self._checked:
+                return model(source, **kwargs)
+            #Exported runtimes are only initialized by the first inference
+            try:
+                results = model(source, **kwargs)
+            except Exception as e:
+                with self._load_lock:
+                    if not self._fall_back(e):
+                        raise
+                results = self._model(source, **kwargs)
+            self._checked = True
+            return results
+
+    __call__ = predict
+
+
+class ModelRegistry:
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str, bool], SharedModel] = {}
+        self._lock = threading.Lock()
+
+    def get(self, weights: str, backend: Optional[str] = None, int8: Optional[bool] = None) -> SharedModel:
+        #Only validated here: the backend itself is resolved on first inference
+        backend = (backend or PERCEPTION_BACKEND).lower()
+        if backend != "auto" and backend not in BACKENDS:
+            raise ValueError(f"Unknown perception backend '{backend}', expected one of {BACKENDS} or 'auto'")
+        int8 = (PERCEPTION_INT8 if int8 is None else int8) and backend != "torch"
+        key = (weights, backend, int8)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = SharedModel(weights, backend, int8)
+                self._models[key] = model
+            return model
+
+    def loaded_models(self):
+        with self._lock:
+            return [key for key, m in self._models.items() if m.loaded]
+
+
+registry = ModelRegistry()
+
+
+def get_model(weights: str = "yolov8n.pt", backend: Optional[str] = None,
+              int8: Optional[bool] = None) -> SharedModel:
+    return registry.get(weights, backend, int8)
@@ -8,6 +8,9 @@ Simulation‐side navigation module with continuous replanning
 using the dynamic semantic map from PerceptionModule.
 """
 
+#Navigation starts from a map at most this old
+NAVIGATION_MAP_MAX_AGE_MS = 300
+
 _perceptor = PerceptionModule()
 _navigator = DynamicNavigator()
 
@@ -29,7 +32,7 @@ def teleport_to(pepper, x, y):
 
 def moveToGoalDynamic(pepper, goal_xy):
   
-    _perceptor.update_semantic_map(pepper)
+    _perceptor.update_semantic_map(pepper, max_age_ms=NAVIGATION_MAP_MAX_AGE_MS)
     start_xy = get_robot_position(pepper)
     _navigator.navigate(
         start_xy      = start_xy,
@@ -1,17 +1,36 @@
-import pybullet as p
 import cv2
+import time
 import numpy as np
-from ultralytics import YOLO
-from threading import Lock
+try:
+    import pybullet as p
+except ImportError:
+    #Recorded frames can be replayed (tools/bench_perception_replay.py) without PyBullet
+    p = None
+from threading import Lock, local
+from simulation.model_registry import get_model
+from simulation.change_gate import ChangeGate
+from simulation.adaptive_inference import PERCEPTION_ADAPTIVE, AdaptiveInference
+from simulation.semantic_map import shared_map
+from simulation.tracker import MultiObjectTracker
+from simulation.perception_worker import EMPTY_SNAPSHOT, SemanticMapSnapshot, get_worker
+
+CONFIDENCE_THRESHOLD = 0.45
+#Central fraction of each bbox (per side) used for the depth median
+DEPTH_ROI_FRACTION = 0.5
+FAR_PLANE_DEPTH = 0.9999
+INVERSE_CACHE_SIZE = 64
 
 class PerceptionModule:
     """
     YOLOv8-based 2D detection + 3D localization,
     with a thread-safe dynamic_semantic_map for navigation.
     """
-    def __init__(self):
-        self.model = YOLO('yolov8n.pt')
-        print("PerceptionModule initialized with pre-trained YOLOv8 model.")
+    def __init__(self, weights='yolov8n.pt', backend=None, int8=None, semantic_map=None):
+        #Shared across all PerceptionModules, loaded on the first inference;
+        #backend is 'torch', 'onnx', 'openvino' or 'auto' (default: PERCEPTION_BACKEND, torch),
+        #resolved together with the model on first inference
+        self.model = get_model(weights, backend, int8)
+        print(f"PerceptionModule initialized (model: {weights}, backend: {self.model.description}).")
         
         self.coco_to_cafe_map = {
             'cup': 'cappuccino',
@@ -20,15 +39,61 @@ class PerceptionModule:
             'chair': 'chair',
             'sandwich': 'sandwich',
             'cake': 'muffin',
-            'donut': 'cornetto'
+            'donut': 'cornetto',
+            'person': 'person'
         }
         self.target_classes = list(self.coco_to_cafe_map.keys())
+        self._class_indices = None
+        #ultralytics per-stage timings (ms) of the last detect_objects call
+        self.last_speed = {}
+        self._inv_cache = {}
+        #Capture buffers are per thread: the monitoring loop, the motion module and
+        #the bridge may capture concurrently through the same module
+        self._capture = local()
+        self._matrix_cache = {}
+        #Skips YOLO while the camera and the image do not change
+        self.gate = ChangeGate()
+        self._gated_detections = []
+        #Optional FrameRecorder, every captured frame is passed to it
+        self.recorder = None
+        #Resolution and ROI passes follow scene activity (PERCEPTION_ADAPTIVE=1)
+        self.adaptive = AdaptiveInference(confidence_threshold=CONFIDENCE_THRESHOLD) if PERCEPTION_ADAPTIVE else None
         
+        #Writers serialize on the lock; readers just take the current immutable snapshot
         self._map_lock = Lock()
-        self.dynamic_semantic_map = []
+        self._map_snapshot = EMPTY_SNAPSHOT
+        #Persistent map fused over all frames; shared by all modules unless one is given
+        self.semantic_map = semantic_map if semantic_map is not None else shared_map
+        #People move: they are tracked per frame instead of fused into the static map
+        self.tracker = MultiObjectTracker(labels=("person",))
+
+    def _capture_buffers(self, width, height):
+        buffers = getattr(self._capture, 'buffers', None)
+        if buffers is None or buffers.shape[:2] != (height, width):
+            buffers = np.empty((height, width, 3), dtype=np.uint8)
+            self._capture.buffers = buffers
+        return buffers
+
+    def _camera_matrices(self, view_list, proj_list):
+        #The view/projection lists only change with the camera link pose
+        key = (tuple(view_list), tuple(proj_list))
+        matrices = self._matrix_cache.get(key)
+        if matrices is None:
+            if len(self._matrix_cache) >= INVERSE_CACHE_SIZE:
+                self._matrix_cache.clear()
+            matrices = (
+                np.array(view_list, dtype=np.float32).reshape((4,4), order='F'),
+                np.array(proj_list, dtype=np.float32).reshape((4,4), order='F')
+            )
+            self._matrix_cache[key] = matrices
+        return matrices
 
-    def get_camera_image(self, pepper, width=320, height=240):
-      
+    def get_camera_image(self, pepper, width=320, height=240, reuse_buffers=True):
+        """
+        Returns (image_bgr, depth_buf, view, proj). With reuse_buffers the BGR
+        image is written into a per-thread buffer that the next capture on the
+        same thread overwrites; pass reuse_buffers=False to keep the frame.
+        """
         view_list = pepper.getCameraViewMatrix(2)
         proj_list = pepper.getCameraProjectionMatrix(2)
         _, _, rgba, depth_buf, _ = p.getCameraImage(
@@ -39,80 +104,238 @@ class PerceptionModule:
         if rgba is None:
             return None, None, None, None
 
-        rgba = np.array(rgba, dtype=np.uint8).reshape((height, width, 4))
-        image_bgr = cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR)
-        depth_buf = np.array(depth_buf, dtype=np.float32).reshape((height, width))
-
-        view = np.array(view_list, dtype=np.float32).reshape((4,4), order='F')
-        proj = np.array(proj_list, dtype=np.float32).reshape((4,4), order='F')
+        #With numpy-enabled PyBullet these are already arrays and asarray/reshape do not copy
+        rgba = np.asarray(rgba, dtype=np.uint8).reshape((height, width, 4))
+        depth_buf = np.asarray(depth_buf, dtype=np.float32).reshape((height, width))
+        if reuse_buffers:
+            image_bgr = cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR, dst=self._capture_buffers(width, height))
+        else:
+            image_bgr = cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR)
 
+        view, proj = self._camera_matrices(view_list, proj_list)
+        if self.recorder is not None:
+            self.recorder.record((image_bgr, depth_buf, view, proj))
         return image_bgr, depth_buf, view, proj
 
-    def detect_objects(self, image):
+    def _target_class_indices(self):
+        if self._class_indices is None:
+            self._class_indices = [
+                idx for idx, name in self.model.names.items()
+                if name in self.target_classes
+            ]
+        return self._class_indices
+
+    def _parse_result(self, result, min_confidence=CONFIDENCE_THRESHOLD):
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return []
+        classes = boxes.cls.cpu().numpy().astype(int)
+        scores = boxes.conf.cpu().numpy()
+        xyxy = boxes.xyxy.cpu().numpy()
+        detections = []
+        for cls, confidence, bbox in zip(classes, scores, xyxy):
+            cafe_label = self.coco_to_cafe_map.get(self.model.names[cls])
+            if cafe_label and confidence > min_confidence:
+                detections.append({
+                    "label": cafe_label,
+                    "confidence": float(confidence),
+                    "bbox": bbox
+                })
+        return detections
+
+    def _predict(self, source, imgsz=None):
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        return self.model.predict(source, classes=self._target_class_indices(), verbose=False, **kwargs)
+
+    def detect_objects(self, image, imgsz=None, min_confidence=CONFIDENCE_THRESHOLD):
         
         if image is None:
             return []
+        results = self._predict(image, imgsz)
+        self.last_speed = dict(results[0].speed) if results else {}
+        return [d for r in results for d in self._parse_result(r, min_confidence)]
 
-        class_indices = [
-            idx for idx, name in self.model.names.items()
-            if name in self.target_classes
-        ]
-        results = self.model(image, classes=class_indices, verbose=False)
-        
-        detections = []
-        for r in results:
-            for box in r.boxes:
-                coco_label = self.model.names[int(box.cls)]
-                cafe_label = self.coco_to_cafe_map.get(coco_label)
-                if cafe_label:
-                    confidence = float(box.conf)
-                    bbox = box.xyxy[0].cpu().numpy()
-                    if confidence > 0.45:
-                        detections.append({
-                            "label": cafe_label,
-                            "confidence": confidence,
-                            "bbox": bbox
-                        })
+    def detect_objects_batch(self, images, imgsz=None, min_confidence=CONFIDENCE_THRESHOLD):
+        """
+        One batched YOLO call for several frames; returns one detection list
+        per input image (empty for None entries).
+        """
+        detections = [[] for _ in images]
+        valid = [i for i, img in enumerate(images) if img is not None]
+        if not valid:
+            return detections
+        results = self._predict([images[i] for i in valid], imgsz)
+        for i, r in zip(valid, results):
+            detections[i] = self._parse_result(r, min_confidence)
         return detections
 
-    def localize_objects_3d(self, detections, depth_buffer, view_matrix, proj_matrix):
-        
-        inv_proj = np.linalg.inv(np.array(proj_matrix).reshape(4,4,order='F'))
-        inv_view = np.linalg.inv(np.array(view_matrix).reshape(4,4,order='F'))
+    def _inverse_pv(self, view_matrix, proj_matrix):
+        #inv(proj @ view) only changes with the camera pose, so it is cached per pose
+        view = np.asarray(view_matrix, dtype=np.float64).reshape(4, 4, order='F')
+        proj = np.asarray(proj_matrix, dtype=np.float64).reshape(4, 4, order='F')
+        key = view.tobytes() + proj.tobytes()
+        inv_pv = self._inv_cache.get(key)
+        if inv_pv is None:
+            if len(self._inv_cache) >= INVERSE_CACHE_SIZE:
+                self._inv_cache.clear()
+            inv_pv = np.linalg.inv(proj @ view)
+            self._inv_cache[key] = inv_pv
+        return inv_pv
+
+    def _robust_depth(self, depth_buffer, bbox):
+        #Median of the valid (non far-plane) depths in the central part of the bbox,
+        #so background pixels seen through handles or around edges do not win
         height, width = depth_buffer.shape
+        x0, y0, x1, y1 = bbox
+        mx = (x1 - x0) * (1 - DEPTH_ROI_FRACTION) / 2
+        my = (y1 - y0) * (1 - DEPTH_ROI_FRACTION) / 2
+        c0, c1 = max(int(x0 + mx), 0), min(int(np.ceil(x1 - mx)), width)
+        r0, r1 = max(int(y0 + my), 0), min(int(np.ceil(y1 - my)), height)
+        roi = depth_buffer[r0:r1, c0:c1]
+        valid = roi[(roi > 0) & (roi < FAR_PLANE_DEPTH)]
+        if valid.size:
+            return float(np.median(valid))
+        u = min(max(int((x0 + x1) / 2), 0), width - 1)
+        v = min(max(int((y0 + y1) / 2), 0), height - 1)
+        return float(depth_buffer[v, u])
 
-        localized = []
-        for det in detections:
-            u = int((det['bbox'][0] + det['bbox'][2]) / 2)
-            v = int((det['bbox'][1] + det['bbox'][3]) / 2)
-            if not (0 <= u < width and 0 <= v < height):
-                continue
-            depth = depth_buffer[v, u]
-            x_ndc =  2 * u / width  - 1
-            y_ndc = -2 * v / height + 1
-            z_ndc =  2 * depth    - 1
-            clip = np.array([x_ndc, y_ndc, z_ndc, 1.0])
-            eye = inv_proj @ clip
-            eye /= eye[3]
-            world_h = inv_view @ eye
-            world = world_h[:3] / world_h[3]
-            det['world_coordinates'] = world.tolist()
-            localized.append(det)
-        return localized
-
-    def update_semantic_map(self, pepper, width=320, height=240):
-        
-        image, depth_buf, vm, pm = self.get_camera_image(pepper, width, height)
+    def localize_objects_3d(self, detections, depth_buffer, view_matrix, proj_matrix):
+        return self.localize_views([detections], [depth_buffer], [view_matrix], [proj_matrix])
+
+    def localize_views(self, detections_per_view, depth_buffers, view_matrices, proj_matrices):
+        """
+        Unprojects the bbox centres of all detections of all views in one
+        vectorized pass, using the cached inverse of proj @ view of each view
+        and a robust depth per bbox. All views must share the same resolution.
+        """
+        if not depth_buffers:
+            return []
+        height, width = depth_buffers[0].shape
+        view_idx, us, vs, depths, dets = [], [], [], [], []
+        for k, view_dets in enumerate(detections_per_view):
+            for det in view_dets:
+                u = int((det['bbox'][0] + det['bbox'][2]) / 2)
+                v = int((det['bbox'][1] + det['bbox'][3]) / 2)
+                if 0 <= u < width and 0 <= v < height:
+                    view_idx.append(k)
+                    us.append(u)
+                    vs.append(v)
+                    depths.append(self._robust_depth(depth_buffers[k], det['bbox']))
+                    dets.append(det)
+        if not dets:
+            return []
+
+        view_idx = np.array(view_idx)
+        us = np.array(us, dtype=np.float64)
+        vs = np.array(vs, dtype=np.float64)
+        inv_pv = np.stack([self._inverse_pv(vm, pm) for vm, pm in zip(view_matrices, proj_matrices)])
+
+        clip = np.stack([
+            2 * us / width - 1,
+            -2 * vs / height + 1,
+            2 * np.array(depths) - 1,
+            np.ones(len(dets))
+        ], axis=1)
+        world_h = np.einsum('nij,nj->ni', inv_pv[view_idx], clip)
+        world = world_h[:, :3] / world_h[:, 3:4]
+        for det, xyz in zip(dets, world):
+            det['world_coordinates'] = xyz.tolist()
+        return dets
+
+    def detect_and_localize_views(self, frames):
+        #frames: list of (image_bgr, depth_buf, view, proj) from get_camera_image
+        frames = [f for f in frames if f[0] is not None]
+        if not frames:
+            return []
+        images, depths, views, projs = zip(*frames)
+        return self.localize_views(self.detect_objects_batch(list(images)), depths, views, projs)
+
+    def detect_and_localize(self, frame):
+        """
+        Detection and localization of one (image_bgr, depth_buf, view, proj)
+        frame behind the change gate: unchanged frames reuse the detections
+        of the last inferred frame. Returns (detections, fresh), where fresh
+        is False when the detections were reused.
+        """
+        image, depth_buf, vm, pm = frame
         if image is None:
-            return
-        det2d = self.detect_objects(image)
+            return [], False
+        #A pending escalation to high resolution must not wait for the scene to change
+        escalated = self.adaptive is not None and self.adaptive.escalation_pending
+        if not self.gate.should_infer(image, vm, force=escalated):
+            return [dict(d) for d in self._gated_detections], False
+        det2d = self.adaptive.detect(self, image) if self.adaptive is not None else self.detect_objects(image)
         det3d = self.localize_objects_3d(det2d, depth_buf, vm, pm)
+        self._gated_detections = det3d
+        self.gate.mark_inferred()
+        return det3d, True
+
+    def capture_size(self):
+        return self.adaptive.capture_size() if self.adaptive is not None else (320, 240)
+
+    def metrics(self):
+        metrics = {
+            "map_version": self._map_snapshot.version,
+            "map_age_ms": self._map_snapshot.age_ms(),
+            "gate": self.gate.stats(),
+            "tracks": len(self.tracker.tracks()),
+        }
+        if self.adaptive is not None:
+            metrics["adaptive"] = self.adaptive.stats()
+        return metrics
+
+    def publish_semantic_map(self, detections, captured_at, fresh=True):
+        #The snapshot holds what this frame saw; the fused map accumulates the static
+        #objects and the tracker follows the people. Reused (gated) detections are not
+        #new observations: integrating them again would defeat the map decay, and the
+        #tracker extrapolates its tracks over skipped frames on its own (get_tracks)
+        if fresh:
+            self.tracker.update(detections, captured_at)
+            self.semantic_map.integrate([d for d in detections if d['label'] not in self.tracker.labels], captured_at)
         with self._map_lock:
-            self.dynamic_semantic_map = [
-                (d['label'], *d['world_coordinates']) for d in det3d
-            ]
+            snapshot = SemanticMapSnapshot(
+                version=self._map_snapshot.version + 1,
+                captured_at=captured_at,
+                entries=tuple((d['label'], *d['world_coordinates']) for d in detections)
+            )
+            self._map_snapshot = snapshot
+        return snapshot
+
+    def update_semantic_map(self, pepper, width=None, height=None, max_age_ms=None):
+        """
+        With a PerceptionWorker running for this robot, returns its latest map
+        (waiting only if it is older than max_age_ms) instead of running
+        inference on the calling thread. Otherwise captures and detects now.
+        """
+        worker = get_worker(pepper)
+        if worker is not None:
+            snapshot = worker.get_map(max_age_ms)
+            if worker.perception is not self:
+                with self._map_lock:
+                    if snapshot.captured_at >= self._map_snapshot.captured_at:
+                        self._map_snapshot = snapshot
+            return snapshot
+
+        if width is None or height is None:
+            width, height = self.capture_size()
+        captured_at = time.time()
+        frame = self.get_camera_image(pepper, width, height)
+        if frame[0] is None:
+            return self._map_snapshot
+        detections, fresh = self.detect_and_localize(frame)
+        return self.publish_semantic_map(detections, captured_at, fresh)
+
+    def get_map_snapshot(self):
+        return self._map_snapshot
+
+    def get_tracks(self, now=None):
+        #Confirmed person tracks predicted to `now`, also between detector runs
+        return self.tracker.tracks(now)
+
+    @property
+    def dynamic_semantic_map(self):
+        return self.semantic_map.entries()
 
     def get_dynamic_semantic_map(self):
-        
-        with self._map_lock:
-            return list(self.dynamic_semantic_map)
+        #Fused over time: objects stay on the map after leaving the view until they decay
+        return self.semantic_map.entries()
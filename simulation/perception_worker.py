@@ -0,0 +1,177 @@
+"""
+Background perception pipeline.
+
+Until now every caller of update_semantic_map ran capture, YOLO and
+localization on its own thread: the proactive monitoring loop, the bridge
+on every LLM response and moveToGoalDynamic. PerceptionWorker moves this to
+two dedicated threads:
+  capture   - grabs a frame every `capture_interval` seconds into a small
+              ring buffer; when the buffer is full the oldest frame is dropped
+  inference - always takes the newest frame, discards the older ones
+              (latest frame wins), and publishes a new SemanticMapSnapshot
+Snapshots are immutable and replaced atomically, so readers never block on
+inference. A caller that needs fresher data asks for a map no older than
+`max_age_ms`; only then does it wait, and at most `timeout` seconds.
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class SemanticMapSnapshot:
+    version: int
+    captured_at: float
+    entries: Tuple[Tuple[str, float, float, float], ...]
+
+    def age_ms(self, now: Optional[float] = None) -> float:
+        if not self.captured_at:
+            return float("inf")
+        return ((now or time.time()) - self.captured_at) * 1000.0
+
+
+EMPTY_SNAPSHOT = SemanticMapSnapshot(version=0, captured_at=0.0, entries=())
+
+
+class PerceptionWorker:
+    """
+    Capture and inference threads feeding one PerceptionModule's semantic map.
+    """
+    def __init__(self, perception, pepper, ring_size: int = 3, capture_interval: float = 0.1,
+                 width: Optional[int] = None, height: Optional[int] = None):
+        self.perception = perception
+        self.pepper = pepper
+        self.capture_interval = capture_interval
+        self.width = width
+        self.height = height
+
+        self._frames = deque(maxlen=ring_size)
+        self._frame_cond = threading.Condition()
+        self._map_cond = threading.Condition()
+        self._refresh = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self.stats = {"captured": 0, "processed": 0, "dropped": 0, "inference_ms": 0.0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads) and not self._stop.is_set()
+
+    def start(self):
+        if self.running:
+            return self
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="perception-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="perception-inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        print(f"[Perception] Worker started (ring of {self._frames.maxlen} frames, "
+              f"capture every {self.capture_interval * 1000:.0f} ms).")
+        return self
+
+    def stop(self):
+        if not self._threads:
+            return
+        self._stop.set()
+        self._refresh.set()
+        with self._frame_cond:
+            self._frame_cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=3.0)
+        self._threads = []
+        with self._map_cond:
+            self._map_cond.notify_all()
+        print(f"[Perception] Worker stopped. Stats: {self.stats}, gate: {self.perception.gate.stats()}")
+
+    def _capture_loop(self):
+        while not self._stop.is_set():
+            captured_at = time.time()
+            #Without a fixed size, follow the module (adaptive resolution)
+            width, height = (self.width, self.height) if self.width and self.height else self.perception.capture_size()
+            try:
+                #Frames wait in the ring, so they cannot use the reusable capture buffer
+                frame = self.perception.get_camera_image(
+                    self.pepper, width, height, reuse_buffers=False)
+            except Exception as e:
+                print(f"[Perception] Capture failed: {e}")
+                frame = (None,)
+            if frame[0] is not None:
+                with self._frame_cond:
+                    if len(self._frames) == self._frames.maxlen:
+                        self.stats["dropped"] += 1
+                    self._frames.append((captured_at, frame))
+                    self.stats["captured"] += 1
+                    self._frame_cond.notify()
+            self._refresh.wait(self.capture_interval)
+            self._refresh.clear()
+
+    def _inference_loop(self):
+        while not self._stop.is_set():
+            with self._frame_cond:
+                while not self._frames and not self._stop.is_set():
+                    self._frame_cond.wait(0.5)
+                if self._stop.is_set():
+                    break
+                captured_at, frame = self._frames.pop()
+                self.stats["dropped"] += len(self._frames)
+                self._frames.clear()
+
+            t0 = time.perf_counter()
+            try:
+                detections, fresh = self.perception.detect_and_localize(frame)
+                self.perception.publish_semantic_map(detections, captured_at, fresh)
+            except Exception as e:
+                print(f"[Perception] Worker inference failed: {e}")
+                continue
+            self.stats["processed"] += 1
+            self.stats["inference_ms"] = (time.perf_counter() - t0) * 1000.0
+            with self._map_cond:
+                self._map_cond.notify_all()
+
+    def get_map(self, max_age_ms: Optional[float] = None, timeout: float = 1.0) -> SemanticMapSnapshot:
+        #Non-blocking unless the current snapshot is older than max_age_ms
+        snapshot = self.perception.get_map_snapshot()
+        if max_age_ms is None or snapshot.age_ms() <= max_age_ms:
+            return snapshot
+
+        oldest = time.time() - max_age_ms / 1000.0
+        deadline = time.time() + timeout
+        self._refresh.set()
+        with self._map_cond:
+            while True:
+                snapshot = self.perception.get_map_snapshot()
+                remaining = deadline - time.time()
+                if snapshot.captured_at >= oldest or remaining <= 0 or not self.running:
+                    return snapshot
+                self._map_cond.wait(remaining)
+
+
+_workers: Dict[int, PerceptionWorker] = {}
+_workers_lock = threading.Lock()
+
+
+def start_worker(perception, pepper, **kwargs) -> PerceptionWorker:
+    #One worker per robot; every PerceptionModule capturing from that robot reads its map
+    with _workers_lock:
+        worker = _workers.get(pepper.robot_model)
+        if worker is None or not worker.running:
+            worker = PerceptionWorker(perception, pepper, **kwargs)
+            _workers[pepper.robot_model] = worker
+    return worker.start()
+
+
+def get_worker(pepper) -> Optional[PerceptionWorker]:
+    worker = _workers.get(getattr(pepper, "robot_model", None))
+    return worker if worker is not None and worker.running else None
+
+
+def stop_worker(pepper):
+    with _workers_lock:
+        worker = _workers.pop(pepper.robot_model, None)
+    if worker is not None:
+        worker.stop()
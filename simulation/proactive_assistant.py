@@ -7,6 +7,9 @@ from dataclasses import dataclass
 from enum import Enum
 import json
 
+#Maximum age of the semantic map used by one monitoring cycle
+MONITOR_MAP_MAX_AGE_MS = 500
+
 class InteractionPriority(Enum):
     LOW = 1
     MEDIUM = 2
@@ -24,6 +27,7 @@ class User:
     assisted: bool
     interaction_count: int
     behavior_pattern: str  #'browsing', 'waiting', 'confused', 'leaving'
+    track_id: Optional[int] = None
     
 @dataclass
 class Intervention:
@@ -124,7 +128,7 @@ class ProactiveAssistant:
     def _monitoring_loop(self, pepper):
         while self.monitoring_active and not self.stop_event.is_set():
             try:
-                self.perception.update_semantic_map(pepper)
+                self.perception.update_semantic_map(pepper, max_age_ms=MONITOR_MAP_MAX_AGE_MS)
                 detected_humans = self._detect_humans()
                 self._update_user_tracking(detected_humans)
                 self._analyze_user_behaviors()
@@ -139,85 +143,59 @@ class ProactiveAssistant:
                 time.sleep(2)
     
     def _detect_humans(self) -> List[Dict]:
-        semantic_map = self.perception.get_dynamic_semantic_map()
+        #Person tracks from the perception tracker, predicted to now between detections
         humans = []
-        human_labels = ['person', 'human', 'customer', 'user', 'visitor']
-        
-        for item in semantic_map:
-            label, x, y, z = item
-            if any(h_label in label.lower() for h_label in human_labels):
-                humans.append({
-                    'position': (x, y),
-                    'height': z,
-                    'timestamp': time.time(),
-                    'confidence': 0.9
-                })
+        for track in self.perception.get_tracks(time.time()):
+            humans.append({
+                'track_id': track['track_id'],
+                'position': track['position'],
+                'velocity': track['velocity'],
+                'height': track['height'],
+                'timestamp': track['last_detected'],
+                'confidence': track['confidence']
+            })
         
         return humans
     
     def _update_user_tracking(self, current_humans: List[Dict]):
+        #Association is done by the tracker: one user per track id
         current_time = time.time()
-        association_threshold = 1.5
-        matched_detections = []
-        for user_id, user in list(self.users.items()):
-            if hasattr(user, 'velocity'):
-                predicted_pos = (
-                    user.position[0] + user.velocity[0] * 0.5,
-                    user.position[1] + user.velocity[1] * 0.5
-                )
-            else:
-                predicted_pos = user.position
-            best_match = None
-            best_distance = association_threshold
+        by_track = {user.track_id: user for user in self.users.values()}
+        for human in current_humans:
+            user = by_track.get(human['track_id'])
+            if user is not None:
+                user.position = human['position']
+                user.velocity = human['velocity']
+                user.last_seen = human['timestamp']
+                user.dwell_time = current_time - user.first_seen
+                user.current_zone = self._get_current_zone(human['position'])
+                continue
             
-            for idx, human in enumerate(current_humans):
-                if idx not in matched_detections:
-                    dist = np.linalg.norm(
-                        np.array(human['position']) - np.array(predicted_pos)
-                    )
-                    if dist < best_distance:
-                        best_match = idx
-                        best_distance = dist
+            self.user_id_counter += 1
+            new_id = f"user_{self.user_id_counter:04d}"
             
-            if best_match is not None:
-                new_pos = current_humans[best_match]['position']
-                time_diff = current_time - user.last_seen
-                if time_diff > 0:
-                    velocity = (
-                        (new_pos[0] - user.position[0]) / time_diff,
-                        (new_pos[1] - user.position[1]) / time_diff
-                    )
-                    user.velocity = velocity
-                user.position = new_pos
-                user.last_seen = current_time
-                user.dwell_time = current_time - user.first_seen
-                user.current_zone = self._get_current_zone(new_pos)
-                
-                matched_detections.append(best_match)
-            else:
-                if current_time - user.last_seen > 10:
-                    del self.users[user_id]
-                    logging.info(f"User {user_id} left the environment")
-
-        for idx, human in enumerate(current_humans):
-            if idx not in matched_detections:
-                self.user_id_counter += 1
-                new_id = f"user_{self.user_id_counter:04d}"
-                
-                self.users[new_id] = User(
-                    id=new_id,
-                    position=human['position'],
-                    first_seen=current_time,
-                    last_seen=current_time,
-                    current_zone=self._get_current_zone(human['position']),
-                    dwell_time=0.0,
-                    assisted=False,
-                    interaction_count=0,
-                    behavior_pattern='browsing'
-                )
-                
-                self.stats['total_users_tracked'] += 1
-                logging.info(f"New user {new_id} detected at {human['position']}")
+            self.users[new_id] = User(
+                id=new_id,
+                position=human['position'],
+                first_seen=current_time,
+                last_seen=human['timestamp'],
+                current_zone=self._get_current_zone(human['position']),
+                dwell_time=0.0,
+                assisted=False,
+                interaction_count=0,
+                behavior_pattern='browsing',
+                track_id=human['track_id']
+            )
+            self.users[new_id].velocity = human['velocity']
+            
+            self.stats['total_users_tracked'] += 1
+            logging.info(f"New user {new_id} (track {human['track_id']}) detected at {human['position']}")
+        
+        active_tracks = {human['track_id'] for human in current_humans}
+        for user_id, user in list(self.users.items()):
+            if user.track_id not in active_tracks and current_time - user.last_seen > 10:
+                del self.users[user_id]
+                logging.info(f"User {user_id} left the environment")
     
     def _get_current_zone(self, position: Tuple[float, float]) -> Optional[str]:
         for zone_name, zone_data in self.interaction_zones.items():
@@ -407,5 +385,6 @@ class ProactiveAssistant:
                                  if u.behavior_pattern == behavior)
                     for behavior in ['browsing', 'waiting', 'confused', 'leaving']
                 },
-                'statistics': self.stats
+                'statistics': self.stats,
+                'perception': self.perception.metrics()
             }
\ No newline at end of file
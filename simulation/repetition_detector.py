@@ -0,0 +1,122 @@
+"""
+Fixed-memory repetition detector used by EmotionAnalyzer.
+
+Every utterance is reduced to a 64-bit fingerprint of its normalized tokens
+and a MinHash signature of its word shingles, stored in a preallocated ring
+buffer. A new utterance counts as a repetition when its fingerprint matches
+any stored one (exact repeat) or when the estimated Jaccard similarity with
+one of the most recent entries reaches the threshold (near duplicate). The
+buffer never grows, so memory is the same after one turn or a million.
+"""
+
+import zlib
+import base64
+import numpy as np
+from typing import Dict, List
+
+from simulation.keyword_matcher import tokenize
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class RepetitionDetector:
+
+    def __init__(self, capacity: int = 32, window: int = 3, threshold: float = 0.7,
+                 num_perm: int = 64, shingle_size: int = 1, seed: int = 1):
+        if window > capacity:
+            raise ValueError("window must not exceed capacity")
+        self.capacity = capacity
+        self.window = window
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+        self._signatures = np.zeros((capacity, num_perm), dtype=np.uint64)
+        self._fingerprints = np.zeros(capacity, dtype=np.uint64)
+        self._size = 0
+        self._next = 0
+
+    def _shingles(self, tokens: List[str]) -> List[str]:
+        n = self.shingle_size
+        if len(tokens) <= n:
+            return [" ".join(tokens)]
+        return [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+
+    def signature(self, tokens: List[str]) -> np.ndarray:
+        hashes = np.array(
+            sorted({zlib.crc32(s.encode("utf-8")) for s in self._shingles(tokens)}),
+            dtype=np.uint64
+        )
+        #(a*h + b) mod p, folded to 32 bits; h and a,b < 2^32 so the product fits in uint64
+        permuted = ((np.outer(hashes, self._a) + self._b) % np.uint64(_MERSENNE_PRIME)) & _MAX_HASH
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def fingerprint(tokens: List[str]) -> int:
+        data = " ".join(tokens).encode("utf-8")
+        return (zlib.crc32(data) << 32) | zlib.adler32(data)
+
+    def similarity(self, text1: str, text2: str) -> float:
+        #Estimated Jaccard similarity of the two texts' shingle sets
+        t1, t2 = tokenize(text1), tokenize(text2)
+        if not t1 or not t2:
+            return 0.0
+        return float(np.mean(self.signature(t1) == self.signature(t2)))
+
+    def _recent_slots(self) -> np.ndarray:
+        count = min(self.window, self._size)
+        return (self._next - 1 - np.arange(count)) % self.capacity
+
+    def check(self, text: str, record: bool = True) -> bool:
+        tokens = tokenize(text)
+        if not tokens:
+            return False
+        fp = np.uint64(self.fingerprint(tokens))
+        sig = self.signature(tokens)
+
+        repeated = bool(np.any(self._fingerprints[:self._size] == fp))
+        if not repeated and self._size:
+            recent = self._signatures[self._recent_slots()]
+            repeated = bool(np.any(np.mean(recent == sig, axis=1) >= self.threshold))
+
+        if record:
+            self._signatures[self._next] = sig
+            self._fingerprints[self._next] = fp
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+        return repeated
+
+    def state(self) -> Dict:
+        #Compact snapshot: every fingerprint, but only the signatures of the
+        #`window` most recent entries, since older ones are never compared
+        order = (self._next - self._size + np.arange(self._size)) % self.capacity
+        recent = order[-self.window:] if self._size else order
+        return {
+            "fp": base64.b64encode(self._fingerprints[order].astype("<u8").tobytes()).decode("ascii"),
+            "sig": base64.b64encode(self._signatures[recent].astype("<u4").tobytes()).decode("ascii"),
+        }
+
+    def load_state(self, state: Dict):
+        fingerprints = np.frombuffer(base64.b64decode(state["fp"]), dtype="<u8")[-self.capacity:]
+        signatures = np.frombuffer(base64.b64decode(state["sig"]), dtype="<u4").reshape(-1, self.num_perm)
+        signatures = signatures[-min(self.window, len(fingerprints)):] if len(fingerprints) else signatures[:0]
+        self.clear()
+        size = len(fingerprints)
+        self._fingerprints[:size] = fingerprints
+        self._signatures[size - len(signatures):size] = signatures
+        self._size = size
+        self._next = size % self.capacity
+
+    def clear(self):
+        self._signatures.fill(0)
+        self._fingerprints.fill(0)
+        self._size = 0
+        self._next = 0
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,146 @@
+"""
+Queue-based structured logging shared by llm_server and the robot bridges.
+
+Callers only enqueue records; a background QueueListener thread formats them
+as compact JSON lines and writes them to disk, so a log call never waits on
+file I/O. Per-turn summaries are emitted with log_turn() and carry the fields
+needed to rebuild latency distributions offline (request id, stage timings,
+role, cache hits, fallback reason).
+"""
+
+import json
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional
+
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", 0.05))
+
+_listener = None
+
+
+class JsonLineFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops records instead of blocking when the writer
+    falls behind; the number of dropped records is kept in `dropped`.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        #Only resolve the message here; JSON formatting happens on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_queue_logging(filename: Optional[str] = None, level: int = logging.INFO,
+                        queue_size: int = LOG_QUEUE_SIZE) -> logging.handlers.QueueListener:
+    """
+    Replaces the root handlers with a non-blocking queue handler and starts
+    the background writer. Records go to `filename` (JSON lines) or stderr.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    if filename:
+        target = logging.FileHandler(filename, encoding="utf-8")
+    else:
+        target = logging.StreamHandler()
+    target.setFormatter(JsonLineFormatter())
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, target, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_queue_logging)
+    return _listener
+
+
+def stop_queue_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def should_sample_payload(rate: float = None) -> bool:
+    rate = LOG_PAYLOAD_SAMPLE_RATE if rate is None else rate
+    return rate > 0 and random.random() < rate
+
+
+def log_turn(logger: logging.Logger, event: str, **fields):
+    logger.info(event, extra={"fields": fields})
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock milliseconds per named stage of a single turn.
+    When a tracer is given, every stage is also recorded as a span.
+    """
+    def __init__(self, tracer=None):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.tracer = tracer
+
+    @contextmanager
+    def stage(self, name: str, trace: bool = True, **attrs):
+        t0 = time.perf_counter()
+        try:
+            with (self.tracer.span(name, **attrs) if self.tracer and trace else nullcontext()):
+                yield
+        finally:
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            self.stages[name] = round(self.stages.get(name, 0.0) + elapsed, 2)
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self.start) * 1000.0, 2)
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.stages, total=self.total_ms())
@@ -1,8 +1,15 @@
 import pybullet as p
 import time
 from threading import Thread
+from simulation.tracing import get_tracer
+
+_tracer = get_tracer("simulation")
 
 def say(pepper, strsay):
+    with _tracer.span("say_simulation.say", chars=len(strsay)):
+        _say(pepper, strsay)
+
+def _say(pepper, strsay):
     
     time.sleep(1)
 
@@ -0,0 +1,86 @@
+"""
+Bounded LRU cache for the stateless part of sentiment scoring.
+
+Short phrases ("thanks", "yes", "where is the restroom?") come back across
+sessions, so their sentiment backend scores and keyword matches are computed
+once and reused. The cache tracks hits, misses, evictions and the compute
+time saved by hits (each entry remembers how long it took to compute).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class ScoreCache:
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_ms = 0.0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        #Whitespace only: case is kept because VADER weights ALL-CAPS words
+        return " ".join(text.split())
+
+    def get(self, text: str) -> Optional[Any]:
+        #Counts a hit or a miss; None means the caller must compute and put()
+        if self.maxsize <= 0:
+            return None
+        key = self.normalize(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_ms += entry[1]
+            return entry[0]
+
+    def put(self, text: str, value: Any, cost_ms: float):
+        if self.maxsize <= 0:
+            return
+        key = self.normalize(text)
+        with self._lock:
+            self._entries[key] = (value, cost_ms)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, text: str, compute: Callable[[str], Any]) -> Tuple[Any, bool]:
+        """
+        Returns (value, hit). On a miss `compute` is called on the original
+        text outside the lock and the result is stored.
+        """
+        value = self.get(text)
+        if value is not None:
+            return value, True
+        t0 = time.perf_counter()
+        value = compute(text)
+        self.put(text, value, (time.perf_counter() - t0) * 1000.0)
+        return value, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "compute_ms_saved": round(self.saved_ms, 2),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
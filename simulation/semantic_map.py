@@ -0,0 +1,229 @@
+"""
+Persistent semantic map fused over time.
+
+Each frame's localized detections are integrated into a spatial hash of
+cubic cells (`cell_size` metres). Every cell holds a list of Landmarks per
+label. A landmark keeps a confidence-weighted mean position, its fused
+confidence (noisy-OR of the observations), and the time it was last seen. A
+detection is matched against the landmarks of the same label in its cell
+and the neighbouring cells within `merge_radius` (ceil(merge_radius /
+cell_size) rings). Integrating a frame therefore costs O(detections)
+whatever the size of the map.
+
+Confidence decays with the time since an object was last seen (half-life
+`half_life_s`). Landmarks whose decayed confidence falls below
+`min_confidence` are dropped when the map is queried, so objects outside
+the current view persist for a while instead of vanishing with the next frame.
+
+Lookups by label and position (nearest, k-nearest, radius) go through one
+LabelIndex per label, kept up to date by integrate and prune, so a query
+costs the neighbourhood it searches even while the map changes every frame.
+"""
+
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from simulation.spatial_index import LabelIndex, match_labels
+
+SEMANTIC_MAP_CELL_M = float(os.getenv("SEMANTIC_MAP_CELL_M", 0.25))
+SEMANTIC_MAP_MERGE_M = float(os.getenv("SEMANTIC_MAP_MERGE_M", 0.35))
+SEMANTIC_MAP_HALF_LIFE_S = float(os.getenv("SEMANTIC_MAP_HALF_LIFE_S", 600.0))
+SEMANTIC_MAP_MIN_CONFIDENCE = float(os.getenv("SEMANTIC_MAP_MIN_CONFIDENCE", 0.1))
+#Caps the weight of past observations, so a moved object is followed within a few frames
+MAX_POSITION_WEIGHT = 5.0
+DEFAULT_CONFIDENCE = 0.5
+
+
+@dataclass
+class Landmark:
+    label: str
+    position: List[float]
+    confidence: float
+    first_seen: float
+    last_seen: float
+    observations: int = 1
+    weight: float = field(default=0.0, repr=False)
+
+    def as_dict(self, confidence: float) -> Dict:
+        return {
+            "label": self.label,
+            "world_coordinates": list(self.position),
+            "confidence": confidence,
+            "last_seen": self.last_seen,
+            "observations": self.observations,
+        }
+
+
+class FusedSemanticMap:
+    """
+    Thread-safe spatial hash of fused landmarks.
+    """
+    def __init__(self, cell_size: float = SEMANTIC_MAP_CELL_M, merge_radius: float = SEMANTIC_MAP_MERGE_M,
+                 half_life_s: float = SEMANTIC_MAP_HALF_LIFE_S, min_confidence: float = SEMANTIC_MAP_MIN_CONFIDENCE):
+        self.cell_size = cell_size
+        self.merge_radius = merge_radius
+        self.half_life_s = half_life_s
+        self.min_confidence = min_confidence
+        self._cells: Dict[Tuple[int, int, int], Dict[str, List[Landmark]]] = {}
+        #Enough rings of cells to see every landmark within merge_radius
+        reach = max(1, math.ceil(merge_radius / cell_size))
+        self._neighbours = [(di, dj, dk) for di in range(-reach, reach + 1)
+                            for dj in range(-reach, reach + 1) for dk in range(-reach, reach + 1)]
+        #Per-label floor-plane grids of the same Landmark objects
+        self._labels: Dict[str, LabelIndex] = {}
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def _cell(self, position) -> Tuple[int, int, int]:
+        s = self.cell_size
+        return int(position[0] // s), int(position[1] // s), int(position[2] // s)
+
+    def decayed_confidence(self, landmark: Landmark, now: float) -> float:
+        age = max(0.0, now - landmark.last_seen)
+        return landmark.confidence * 0.5 ** (age / self.half_life_s)
+
+    def _nearest(self, label: str, position, cell) -> Tuple[Optional[Tuple[int, int, int]], Optional[Landmark]]:
+        best_key, best, best_d2 = None, None, self.merge_radius ** 2
+        for di, dj, dk in self._neighbours:
+            key = (cell[0] + di, cell[1] + dj, cell[2] + dk)
+            for landmark in self._cells.get(key, {}).get(label, ()):
+                d2 = sum((a - b) ** 2 for a, b in zip(landmark.position, position))
+                if d2 <= best_d2:
+                    best_key, best, best_d2 = key, landmark, d2
+        return best_key, best
+
+    def _index_add(self, landmark: Landmark):
+        index = self._labels.get(landmark.label)
+        if index is None:
+            index = self._labels[landmark.label] = LabelIndex(position=lambda lm: lm.position)
+        index.add(landmark)
+
+    def _remove(self, key, landmark: Landmark):
+        index = self._labels[landmark.label]
+        index.remove(landmark)
+        if not index.size:
+            del self._labels[landmark.label]
+        cell = self._cells[key]
+        cell[landmark.label].remove(landmark)
+        if not cell[landmark.label]:
+            del cell[landmark.label]
+        if not cell:
+            del self._cells[key]
+
+    def integrate(self, detections: Iterable, timestamp: Optional[float] = None) -> int:
+        """
+        Fuses one batch of detections: dicts with label, world_coordinates and
+        confidence, or (label, x, y, z) tuples. Returns the number of new landmarks.
+        """
+        now = timestamp or time.time()
+        created = 0
+        with self._lock:
+            for det in detections:
+                if isinstance(det, dict):
+                    label, position = det["label"], det["world_coordinates"]
+                    confidence = float(det.get("confidence", DEFAULT_CONFIDENCE))
+                else:
+                    label, position, confidence = det[0], det[1:4], DEFAULT_CONFIDENCE
+                position = [float(v) for v in position]
+                cell = self._cell(position)
+                key, landmark = self._nearest(label, position, cell)
+
+                if landmark is None:
+                    landmark = Landmark(label, position, confidence, now, now, 1, confidence)
+                    self._cells.setdefault(cell, {}).setdefault(label, []).append(landmark)
+                    self._index_add(landmark)
+                    created += 1
+                    continue
+
+                old_xy = landmark.position[:2]
+                prior = self.decayed_confidence(landmark, now)
+                total = landmark.weight + confidence
+                landmark.position = [
+                    (p * landmark.weight + q * confidence) / total
+                    for p, q in zip(landmark.position, position)
+                ]
+                landmark.weight = min(total, MAX_POSITION_WEIGHT)
+                landmark.confidence = 1.0 - (1.0 - prior) * (1.0 - confidence)
+                landmark.last_seen = now
+                landmark.observations += 1
+                self._labels[label].move(landmark, old_xy)
+
+                new_cell = self._cell(landmark.position)
+                if new_cell != key:
+                    #Rehash a landmark whose mean drifted into another cell
+                    self._remove(key, landmark)
+                    self._cells.setdefault(new_cell, {}).setdefault(label, []).append(landmark)
+                    self._index_add(landmark)
+            self.version += 1
+        return created
+
+    def prune(self, now: Optional[float] = None) -> int:
+        now = now or time.time()
+        removed = 0
+        with self._lock:
+            for key in list(self._cells):
+                for landmark in [lm for lms in self._cells[key].values() for lm in lms
+                                 if self.decayed_confidence(lm, now) < self.min_confidence]:
+                    self._remove(key, landmark)
+                    removed += 1
+            if removed:
+                self.version += 1
+        return removed
+
+    def landmarks(self, now: Optional[float] = None, min_confidence: Optional[float] = None) -> List[Dict]:
+        now = now or time.time()
+        self.prune(now)
+        threshold = self.min_confidence if min_confidence is None else min_confidence
+        with self._lock:
+            result = []
+            for cell in self._cells.values():
+                for landmark in (lm for lms in cell.values() for lm in lms):
+                    confidence = self.decayed_confidence(landmark, now)
+                    if confidence >= threshold:
+                        result.append(landmark.as_dict(confidence))
+        return result
+
+    def entries(self, now: Optional[float] = None, min_confidence: Optional[float] = None) -> List[Tuple[str, float, float, float]]:
+        #Same (label, x, y, z) tuples as the per-frame map
+        return [(lm["label"], *lm["world_coordinates"]) for lm in self.landmarks(now, min_confidence)]
+
+    def resolve_label(self, query: str) -> List[str]:
+        with self._lock:
+            return match_labels(query, list(self._labels))
+
+    def _query(self, query: str, search) -> List[Dict]:
+        now = time.time()
+        alive = lambda lm: self.decayed_confidence(lm, now) >= self.min_confidence
+        found = []
+        with self._lock:
+            for label in match_labels(query, list(self._labels)):
+                found.extend(search(self._labels[label], alive))
+            found.sort(key=lambda t: t[0])
+            return [dict(lm.as_dict(self.decayed_confidence(lm, now)), distance=d) for d, lm in found]
+
+    def nearest(self, query: str, position, k: int = 1, radius: Optional[float] = None) -> List[Dict]:
+        #Closest landmarks (on the floor plane) whose label fuzzily matches query
+        x, y = position[0], position[1]
+        return self._query(query, lambda index, alive: index.nearest(x, y, k, radius, alive))[:k]
+
+    def within(self, query: str, position, radius: float) -> List[Dict]:
+        x, y = position[0], position[1]
+        return self._query(query, lambda index, alive: index.within(x, y, radius, alive))
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._labels.clear()
+            self.version += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(lms) for cell in self._cells.values() for lms in cell.values())
+
+
+#Shared by every PerceptionModule in the process, like the detection model
+shared_map = FusedSemanticMap()
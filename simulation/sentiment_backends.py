@@ -0,0 +1,166 @@
+"""
+Pluggable sentiment scoring backends for EmotionAnalyzer.
+
+Every backend turns text into (polarity in [-1, 1], subjectivity in [0, 1],
+confidence in [0, 1]); keyword matching and the conversation state stay in
+EmotionAnalyzer. The lexicon backend is the original TextBlob + VADER
+combination. The ONNX backend runs a quantized multilingual transformer
+(e.g. an int8 XLM-RoBERTa sentiment model) on CPU in batches; onnxruntime
+and tokenizers are only imported, and the model only loaded, on first use.
+"""
+
+import os
+import logging
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from textblob import TextBlob
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+TEXTBLOB_WEIGHT = 0.6
+VADER_WEIGHT = 0.4
+
+
+class SentimentBackend:
+    """
+    Base class: subclasses implement score_batch, score defaults to a batch of one.
+    """
+    name = "base"
+
+    def score(self, text: str) -> Tuple[float, float, float]:
+        polarity, subjectivity, confidence = self.score_batch([text])[0]
+        return float(polarity), float(subjectivity), float(confidence)
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def warm_up(self):
+        self.score_batch(["Hello, how much is a cappuccino?", "Grazie, perfetto!"])
+
+
+class LexiconBackend(SentimentBackend):
+    """
+    TextBlob polarity/subjectivity blended with the VADER compound score;
+    confidence grows with the agreement of the two analyzers.
+    """
+    name = "lexicon"
+
+    def __init__(self):
+        self.vader = SentimentIntensityAnalyzer()
+
+    def raw_scores(self, text: str) -> Tuple[float, float, float]:
+        sentiment = TextBlob(text).sentiment
+        return sentiment.polarity, sentiment.subjectivity, self.vader.polarity_scores(text)['compound']
+
+    def score(self, text: str) -> Tuple[float, float, float]:
+        tb_polarity, tb_subjectivity, vader_compound = self.raw_scores(text)
+        combined_polarity = TEXTBLOB_WEIGHT * tb_polarity + VADER_WEIGHT * vader_compound
+        analyzer_agreement = 1 - abs(tb_polarity - vader_compound)
+        confidence = min(analyzer_agreement * (1 + tb_subjectivity), 1.0)
+        return combined_polarity, tb_subjectivity, confidence
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        raw = np.array([self.raw_scores(t) for t in texts], dtype=np.float64).reshape(-1, 3)
+        tb_polarity, tb_subjectivity, vader_compound = raw[:, 0], raw[:, 1], raw[:, 2]
+        combined = TEXTBLOB_WEIGHT * tb_polarity + VADER_WEIGHT * vader_compound
+        confidence = np.minimum((1 - np.abs(tb_polarity - vader_compound)) * (1 + tb_subjectivity), 1.0)
+        return np.column_stack([combined, tb_subjectivity, confidence])
+
+
+class OnnxSentimentBackend(SentimentBackend):
+    """
+    Quantized transformer classifier exported to ONNX, run with onnxruntime on
+    CPU. `model_dir` holds model.onnx (or model_quantized.onnx) and the
+    tokenizer.json of the original Hugging Face model.
+    """
+    name = "onnx"
+
+    def __init__(self, model_dir: str, labels: Sequence[str] = ("negative", "neutral", "positive"),
+                 max_length: int = 128, batch_size: int = 16, num_threads: Optional[int] = None):
+        self.model_dir = model_dir
+        self.labels = [l.lower() for l in labels]
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self._session = None
+        self._tokenizer = None
+        self._input_names = set()
+        self._load_lock = threading.Lock()
+
+    def _model_path(self) -> str:
+        for name in ("model_quantized.onnx", "model.onnx"):
+            path = os.path.join(self.model_dir, name)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"No model_quantized.onnx or model.onnx in {self.model_dir}")
+
+    def _ensure_loaded(self):
+        if self._session is not None:
+            return
+        with self._load_lock:
+            if self._session is not None:
+                return
+            try:
+                import onnxruntime as ort
+                from tokenizers import Tokenizer
+            except ImportError as e:
+                raise ImportError(
+                    f"SENTIMENT_BACKEND=onnx needs the '{e.name}' package: pip install onnxruntime tokenizers"
+                ) from e
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.num_threads:
+                options.intra_op_num_threads = self.num_threads
+            model_path = self._model_path()
+            session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+            tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+            tokenizer.enable_truncation(max_length=self.max_length)
+            tokenizer.enable_padding()
+
+            self._input_names = {i.name for i in session.get_inputs()}
+            self._tokenizer = tokenizer
+            self._session = session
+            logging.info(f"Loaded ONNX sentiment model {model_path}")
+
+    def _feeds(self, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        encodings = self._tokenizer.encode_batch(list(texts))
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        return {k: v for k, v in feeds.items() if k in self._input_names}
+
+    def _to_scores(self, logits: np.ndarray) -> np.ndarray:
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        column = {label: probs[:, i] for i, label in enumerate(self.labels)}
+        zeros = np.zeros(len(probs))
+        positive = column.get("positive", zeros)
+        negative = column.get("negative", zeros)
+        neutral = column.get("neutral", zeros)
+        return np.column_stack([positive - negative, 1.0 - neutral, probs.max(axis=1)])
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        self._ensure_loaded()
+        out = np.zeros((len(texts), 3), dtype=np.float64)
+        for start in range(0, len(texts), self.batch_size):
+            chunk = texts[start:start + self.batch_size]
+            logits = self._session.run(None, self._feeds(chunk))[0]
+            out[start:start + len(chunk)] = self._to_scores(np.asarray(logits, dtype=np.float64))
+        return out
+
+
+SENTIMENT_BACKENDS = {
+    LexiconBackend.name: LexiconBackend,
+    OnnxSentimentBackend.name: OnnxSentimentBackend,
+}
+
+
+def create_backend(name: str = "lexicon", **kwargs) -> SentimentBackend:
+    if name not in SENTIMENT_BACKENDS:
+        raise ValueError(f"Unknown sentiment backend '{name}', expected one of {sorted(SENTIMENT_BACKENDS)}")
+    return SENTIMENT_BACKENDS[name](**kwargs)
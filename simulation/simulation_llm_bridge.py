@@ -1,10 +1,15 @@
 import requests
 import json
+import time
 from simulation import say_simulation
-from simulation.motion_simulation_dynamic import moveToGoalDynamic
+from simulation.motion_simulation_dynamic import moveToGoalDynamic, get_robot_position
 from simulation.perception import PerceptionModule
+from simulation.tracing import get_tracer
 
 LLM_SERVER_URL = "http://localhost:8000/chat"
+LLM_READY_URL = "http://localhost:8000/readyz"
+#Maximum age of the semantic map when handling an LLM response
+PERCEPTION_MAX_AGE_MS = 500
 
 session_state = {
     "current_role": "unknown",
@@ -12,6 +17,22 @@ session_state = {
 }
 
 _perceptor = PerceptionModule()
+_tracer = get_tracer("simulation")
+_http = requests.Session()
+
+def wait_for_server(timeout=60.0):
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if _http.get(LLM_READY_URL, timeout=2.0).ok:
+                print("[Bridge] LLM server is ready.")
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(1.0)
+    print(f"[Bridge] WARNING: LLM server not ready after {timeout:.0f}s.")
+    return False
 
 def reset_session():
 
@@ -29,7 +50,9 @@ def process_user_command(text_command):
         "current_role": session_state["current_role"]
     }
     try:
-        response = requests.post(LLM_SERVER_URL, json=payload, timeout=20.0)
+        with _tracer.span("chat_request"):
+            response = _http.post(LLM_SERVER_URL, json=payload,
+                                  headers=_tracer.inject_headers(), timeout=20.0)
         response.raise_for_status()
         data = response.json()
         session_state["current_role"] = data.get("determined_role", "customer")
@@ -42,7 +65,8 @@ def process_user_command(text_command):
 
 def handle_llm_response(pepper, response_data, dynamic_map, menu_data, ignored_ids):
     
-    _perceptor.update_semantic_map(pepper)
+    with _tracer.span("perception"):
+        _perceptor.update_semantic_map(pepper, max_age_ms=PERCEPTION_MAX_AGE_MS)
 
     if not response_data:
         say_simulation.say(pepper,
@@ -50,13 +74,14 @@ def handle_llm_response(pepper, response_data, dynamic_map, menu_data, ignored_i
         return
 
     if response_data.get("response_type") == "function_call":
-        result_text = handle_function_call(
-            pepper,
-            response_data["function_call"],
-            dynamic_map,
-            menu_data,
-            ignored_ids
-        )
+        with _tracer.span("function_call", function=response_data["function_call"].get("name")):
+            result_text = handle_function_call(
+                pepper,
+                response_data["function_call"],
+                dynamic_map,
+                menu_data,
+                ignored_ids
+            )
         if result_text:
             say_simulation.say(pepper, result_text)
     else:
@@ -74,14 +99,15 @@ def handle_function_call(pepper, function_call, dynamic_map, menu_data, ignored_
         if not loc:
             return "I did not understand the destination. Could you repeat?"
 
-        coords = next(
-            ((x, y) for obj in dynamic_map
-             for label, x, y, z in [(obj["label"], *obj["world_coordinates"])]
-             if loc in label.lower()),
-            None
-        )
-        if coords:
-            moveToGoalDynamic(pepper, coords)
+        #Closest instance to the robot among the labels matching the request
+        nearest = dynamic_map.nearest(loc, get_robot_position(pepper), k=1)
+        if nearest:
+            x, y, _ = nearest[0]["world_coordinates"]
+            try:
+                moveToGoalDynamic(pepper, (x, y))
+            except RuntimeError as e:
+                print(f"[Bridge] Navigation to {loc} at ({x:.2f}, {y:.2f}) failed: {e}")
+                return f"Sorry, I can't find a free path to the {loc} right now."
             return f"Okay, I've arrived at the {loc}."
         else:
             return f"Sorry, I couldn't find any {loc} nearby."
@@ -0,0 +1,198 @@
+"""
+Per-label spatial index over semantic-map landmarks.
+
+Landmarks of each label are bucketed into a uniform 2D grid on the floor
+plane. Nearest and k-nearest queries search rings of cells outward from the
+query point and stop once no unvisited ring can hold anything closer.
+Radius queries only visit the cells that overlap the circle. The cost is
+proportional to the neighbourhood, not to the number of objects.
+LabelIndex is updated in place (add, remove, move), so a map that changes
+every frame keeps its index without rebuilding it.
+
+Labels are matched fuzzily. "the water bottle", "bottle of water",
+"cappuccinos" and "capucino" all resolve to the map's labels, by exact
+match first, then by token overlap, and finally by close spelling.
+"""
+
+import difflib
+import heapq
+import math
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+INDEX_CELL_M = 1.0
+STOPWORDS = {
+    "the", "a", "an", "of", "to", "me", "please", "some", "any", "my", "nearest", "closest",
+    "il", "lo", "la", "i", "gli", "le", "un", "una", "uno", "di", "del", "della", "al", "alla",
+}
+
+
+def label_tokens(text: str) -> Tuple[str, ...]:
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower().replace("_", " ")):
+        if token in STOPWORDS:
+            continue
+        #Crude singular form, enough for "tables", "chairs", "muffins"
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tuple(tokens)
+
+
+def match_labels(query: str, labels: Iterable[str], cutoff: float = 0.75) -> List[str]:
+    labels = list(labels)
+    query_tokens = set(label_tokens(query))
+    if not query_tokens:
+        return []
+    by_tokens = {label: set(label_tokens(label)) for label in labels}
+
+    exact = [l for l, t in by_tokens.items() if t == query_tokens]
+    if exact:
+        return exact
+    overlap = [l for l, t in by_tokens.items() if t and (t <= query_tokens or query_tokens <= t)]
+    if overlap:
+        return overlap
+    joined = {" ".join(sorted(t)): l for l, t in by_tokens.items()}
+    close = difflib.get_close_matches(" ".join(sorted(query_tokens)), list(joined), n=3, cutoff=cutoff)
+    return [joined[c] for c in close]
+
+
+def _world_xy(item: Dict):
+    return item["world_coordinates"]
+
+
+class LabelIndex:
+    """
+    Uniform grid of the landmarks of one label, updated in place with add,
+    remove and move. `position` returns the (x, y, ...) of an item.
+    """
+    def __init__(self, landmarks: Sequence = (), cell_size: float = INDEX_CELL_M, position=_world_xy):
+        self.cell_size = cell_size
+        self._position = position
+        self._buckets: Dict[Tuple[int, int], List] = {}
+        self.size = 0
+        #Only ever grows: bounds limit the ring search, stale ones just cost empty rings
+        self._bounds = None
+        for landmark in landmarks:
+            self.add(landmark)
+
+    def add(self, landmark):
+        x, y = self._position(landmark)[:2]
+        ci, cj = cell = self._cell(x, y)
+        self._buckets.setdefault(cell, []).append(landmark)
+        self.size += 1
+        if self._bounds is None:
+            self._bounds = (ci, ci, cj, cj)
+        else:
+            imin, imax, jmin, jmax = self._bounds
+            self._bounds = (min(imin, ci), max(imax, ci), min(jmin, cj), max(jmax, cj))
+
+    def remove(self, landmark, xy=None):
+        #xy: where the landmark was indexed, if it has moved since
+        x, y = (xy if xy is not None else self._position(landmark))[:2]
+        cell = self._cell(x, y)
+        bucket = self._buckets.get(cell, [])
+        for i, other in enumerate(bucket):
+            if other is landmark:
+                del bucket[i]
+                self.size -= 1
+                break
+        if not bucket:
+            self._buckets.pop(cell, None)
+
+    def move(self, landmark, old_xy):
+        if self._cell(*old_xy[:2]) != self._cell(*self._position(landmark)[:2]):
+            self.remove(landmark, old_xy)
+            self.add(landmark)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def _ring(self, ci: int, cj: int, r: int):
+        if r == 0:
+            yield ci, cj
+            return
+        for i in range(ci - r, ci + r + 1):
+            yield i, cj - r
+            yield i, cj + r
+        for j in range(cj - r + 1, cj + r):
+            yield ci - r, j
+            yield ci + r, j
+
+    def _max_ring(self, ci: int, cj: int) -> int:
+        imin, imax, jmin, jmax = self._bounds
+        return max(abs(ci - imin), abs(ci - imax), abs(cj - jmin), abs(cj - jmax))
+
+    def nearest(self, x: float, y: float, k: int = 1, radius: Optional[float] = None,
+                accept: Optional[Callable] = None) -> List[Tuple[float, Dict]]:
+        #accept: optional filter, e.g. landmarks whose confidence has not decayed away
+        if not self.size:
+            return []
+        ci, cj = self._cell(x, y)
+        best: List[Tuple[float, int, Dict]] = []
+        for r in range(self._max_ring(ci, cj) + 1):
+            #Every point in ring r is at least (r - 1) cells away
+            floor = max(0, r - 1) * self.cell_size
+            if radius is not None and floor > radius:
+                break
+            if len(best) == k and -best[0][0] <= floor:
+                break
+            for cell in self._ring(ci, cj, r):
+                for landmark in self._buckets.get(cell, ()):
+                    if accept is not None and not accept(landmark):
+                        continue
+                    lx, ly = self._position(landmark)[:2]
+                    d = math.hypot(lx - x, ly - y)
+                    if radius is not None and d > radius:
+                        continue
+                    item = (-d, id(landmark), landmark)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, item)
+        return sorted(((-nd, lm) for nd, _, lm in best), key=lambda t: t[0])
+
+    def within(self, x: float, y: float, radius: float, accept: Optional[Callable] = None) -> List[Tuple[float, Dict]]:
+        i0, j0 = self._cell(x - radius, y - radius)
+        i1, j1 = self._cell(x + radius, y + radius)
+        found = []
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                for landmark in self._buckets.get((i, j), ()):
+                    if accept is not None and not accept(landmark):
+                        continue
+                    lx, ly = self._position(landmark)[:2]
+                    d = math.hypot(lx - x, ly - y)
+                    if d <= radius:
+                        found.append((d, landmark))
+        return sorted(found, key=lambda t: t[0])
+
+
+class SpatialIndex:
+    """
+    One LabelIndex per label, built from a list of landmark dicts.
+    """
+    def __init__(self, landmarks: Sequence[Dict], cell_size: float = INDEX_CELL_M):
+        by_label: Dict[str, List[Dict]] = {}
+        for landmark in landmarks:
+            by_label.setdefault(landmark["label"], []).append(landmark)
+        self.labels = {label: LabelIndex(items, cell_size) for label, items in by_label.items()}
+
+    def resolve(self, query: str) -> List[str]:
+        return match_labels(query, self.labels)
+
+    def nearest(self, query: str, position, k: int = 1, radius: Optional[float] = None) -> List[Dict]:
+        x, y = position[0], position[1]
+        candidates = []
+        for label in self.resolve(query):
+            candidates.extend(self.labels[label].nearest(x, y, k, radius))
+        candidates.sort(key=lambda t: t[0])
+        return [dict(lm, distance=d) for d, lm in candidates[:k]]
+
+    def within(self, query: str, position, radius: float) -> List[Dict]:
+        x, y = position[0], position[1]
+        found = []
+        for label in self.resolve(query):
+            found.extend(self.labels[label].within(x, y, radius))
+        found.sort(key=lambda t: t[0])
+        return [dict(lm, distance=d) for d, lm in found]
@@ -0,0 +1,196 @@
+"""
+Lightweight end-to-end tracing for the CaféBot turn pipeline.
+
+A trace follows one user utterance from the ASR callback (or the simulation
+interaction loop) through the bridge, the /chat request of llm_server and
+back to the spoken reply. Spans are handed to a background exporter thread
+and appended to a local JSONL file (one span per line), which
+tools/trace_report.py turns into per-stage waterfalls and percentiles.
+
+Context crosses process boundaries through the W3C `traceparent` header and
+thread boundaries by passing the parent span explicitly; within a thread or
+asyncio task the current span is tracked with a ContextVar.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+TRACEPARENT_HEADER = "traceparent"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("cafebot_current_span", default=None)
+
+
+class Span:
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "service",
+                 "start", "duration_ms", "attrs", "status", "_t0")
+
+    def __init__(self, name: str, service: str, trace_id: str, parent_id: Optional[str] = None, **attrs):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.service = service
+        self.start = time.time()
+        self.duration_ms = None
+        self.attrs = attrs
+        self.status = "ok"
+        self._t0 = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000.0, 3)
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start": round(self.start, 6),
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+class _JsonlExporter:
+    """
+    Appends finished spans to a JSONL file from a daemon thread so that
+    recording a span costs a queue put on the caller's thread.
+    """
+    def __init__(self, path: str, max_queue: int = 10000):
+        self.path = path
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8", buffering=1) as f:
+            while True:
+                span = self._queue.get()
+                batch = [span]
+                while len(batch) < 256:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                f.write("".join(
+                    json.dumps(s.to_dict(), ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+                    for s in batch
+                ))
+
+    def flush(self, timeout: float = 2.0):
+        deadline = time.time() + timeout
+        while not self._queue.empty() and time.time() < deadline:
+            time.sleep(0.01)
+
+
+_exporters: Dict[str, _JsonlExporter] = {}
+_registry_lock = threading.RLock()
+
+
+def _get_exporter(path: str) -> _JsonlExporter:
+    #One writer thread per file, shared by every tracer of the process
+    with _registry_lock:
+        if path not in _exporters:
+            _exporters[path] = _JsonlExporter(path)
+        return _exporters[path]
+
+
+class Tracer:
+
+    def __init__(self, service: str, path: str = TRACE_FILE, enabled: bool = TRACING_ENABLED):
+        self.service = service
+        self.enabled = enabled
+        self._exporter = _get_exporter(path) if enabled else None
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _current_span.get()
+
+    def start_span(self, name: str, parent: Optional[Span] = None,
+                   traceparent: Optional[str] = None, **attrs) -> Span:
+        parent = parent or _current_span.get()
+        if parent is not None:
+            return Span(name, self.service, parent.trace_id, parent.span_id, **attrs)
+        remote = parse_traceparent(traceparent)
+        if remote:
+            return Span(name, self.service, remote[0], remote[1], **attrs)
+        return Span(name, self.service, uuid.uuid4().hex, None, **attrs)
+
+    def end_span(self, span: Span):
+        span.finish()
+        if self._exporter is not None:
+            self._exporter.export(span)
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None,
+             traceparent: Optional[str] = None, **attrs):
+        """
+        Opens a span as a child of `parent`, the current span, or the remote
+        `traceparent` (in that order), starting a new trace if none is given.
+        """
+        s = self.start_span(name, parent=parent, traceparent=traceparent, **attrs)
+        token = _current_span.set(s)
+        try:
+            yield s
+        except BaseException as e:
+            s.status = "error"
+            s.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(s)
+
+    def inject_headers(self, headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        headers = dict(headers or {})
+        current = _current_span.get()
+        if current is not None:
+            headers[TRACEPARENT_HEADER] = current.traceparent()
+        return headers
+
+    def flush(self, timeout: float = 2.0):
+        if self._exporter is not None:
+            self._exporter.flush(timeout)
+
+
+_tracers: Dict[str, Tracer] = {}
+
+
+def get_tracer(service: str) -> Tracer:
+    with _registry_lock:
+        if service not in _tracers:
+            _tracers[service] = Tracer(service)
+        return _tracers[service]
@@ -0,0 +1,177 @@
+"""
+Tracking-by-detection for people, in the style of SORT and ByteTrack.
+
+Tracks live on the floor plane in world coordinates, so they survive the
+robot turning its head or moving. Each track runs a constant-velocity Kalman
+filter over (x, y, vx, vy). Frames are associated in two stages. First,
+confident detections are matched greedily to all tracks by increasing
+distance within `gate_m`. Then the remaining weaker detections get a chance
+to keep unmatched confirmed tracks alive (the ByteTrack idea). A track is
+confirmed after `min_hits` detections and dropped `max_age_s` seconds after
+its last detection. Unmatched tentative tracks are dropped at once.
+
+Between detections tracks() extrapolates every track to the current time,
+so consumers can poll faster than YOLO runs (change gate, adaptive mode,
+slow backends) and still get stable ids and predicted positions.
+"""
+
+import itertools
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+TRACKER_GATE_M = float(os.getenv("TRACKER_GATE_M", 1.0))
+TRACKER_MAX_AGE_S = float(os.getenv("TRACKER_MAX_AGE_S", 3.0))
+TRACKER_MIN_HITS = int(os.getenv("TRACKER_MIN_HITS", 3))
+TRACKER_HIGH_CONFIDENCE = 0.6
+#Kalman noise: measurement std (m) and process acceleration std (m/s^2)
+MEASUREMENT_STD = 0.15
+ACCELERATION_STD = 1.0
+
+_H = np.array([[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0]])
+_R = np.eye(2) * MEASUREMENT_STD ** 2
+
+
+class Track:
+    """
+    Constant-velocity Kalman filter for one tracked object.
+    """
+    def __init__(self, track_id: int, label: str, position, confidence: float, timestamp: float):
+        self.track_id = track_id
+        self.label = label
+        self.x = np.array([position[0], position[1], 0.0, 0.0], dtype=np.float64)
+        self.P = np.diag([MEASUREMENT_STD ** 2, MEASUREMENT_STD ** 2, 1.0, 1.0])
+        self.height = float(position[2]) if len(position) > 2 else 0.0
+        self.confidence = confidence
+        self.t = timestamp
+        self.first_seen = timestamp
+        self.last_detected = timestamp
+        self.hits = 1
+
+    def predict(self, timestamp: float):
+        dt = max(0.0, timestamp - self.t)
+        if dt == 0.0:
+            return
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        q = ACCELERATION_STD ** 2
+        G = np.array([[dt * dt / 2, 0.0], [0.0, dt * dt / 2], [dt, 0.0], [0.0, dt]])
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + q * (G @ G.T)
+        self.t = timestamp
+
+    def update(self, position, confidence: float, timestamp: float):
+        z = np.asarray(position[:2], dtype=np.float64)
+        S = _H @ self.P @ _H.T + _R
+        K = self.P @ _H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - _H @ self.x)
+        self.P = (np.eye(4) - K @ _H) @ self.P
+        if len(position) > 2:
+            self.height = float(position[2])
+        self.confidence = confidence
+        self.last_detected = timestamp
+        self.hits += 1
+
+    def extrapolated(self, timestamp: float):
+        dt = max(0.0, timestamp - self.t)
+        return self.x[0] + self.x[2] * dt, self.x[1] + self.x[3] * dt
+
+
+class MultiObjectTracker:
+    """
+    Tracks the detections whose label is in `labels`.
+    """
+    def __init__(self, labels: Iterable[str] = ("person",), gate_m: float = TRACKER_GATE_M,
+                 max_age_s: float = TRACKER_MAX_AGE_S, min_hits: int = TRACKER_MIN_HITS,
+                 high_confidence: float = TRACKER_HIGH_CONFIDENCE):
+        self.labels = set(labels)
+        self.gate_m = gate_m
+        self.max_age_s = max_age_s
+        self.min_hits = min_hits
+        self.high_confidence = high_confidence
+        self._tracks: List[Track] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _associate(self, tracks: List[Track], detections: List[Dict]):
+        #Greedy global matching: closest (track, detection) pairs first, within the gate
+        pairs = []
+        for ti, track in enumerate(tracks):
+            for di, det in enumerate(detections):
+                if det["label"] != track.label:
+                    continue
+                d = float(np.hypot(track.x[0] - det["world_coordinates"][0], track.x[1] - det["world_coordinates"][1]))
+                if d <= self.gate_m:
+                    pairs.append((d, ti, di))
+        matched_t, matched_d, matches = set(), set(), []
+        for _, ti, di in sorted(pairs):
+            if ti in matched_t or di in matched_d:
+                continue
+            matched_t.add(ti)
+            matched_d.add(di)
+            matches.append((tracks[ti], detections[di]))
+        unmatched_tracks = [t for i, t in enumerate(tracks) if i not in matched_t]
+        unmatched_dets = [d for i, d in enumerate(detections) if i not in matched_d]
+        return matches, unmatched_tracks, unmatched_dets
+
+    def update(self, detections: Iterable[Dict], timestamp: Optional[float] = None) -> List[Dict]:
+        now = timestamp if timestamp is not None else time.time()
+        detections = [d for d in detections if d["label"] in self.labels]
+        high = [d for d in detections if d.get("confidence", 1.0) >= self.high_confidence]
+        low = [d for d in detections if d.get("confidence", 1.0) < self.high_confidence]
+
+        with self._lock:
+            for track in self._tracks:
+                track.predict(now)
+            matches, remaining, new_dets = self._associate(self._tracks, high)
+            confirmed_left = [t for t in remaining if t.hits >= self.min_hits]
+            low_matches, _, _ = self._associate(confirmed_left, low)
+            for track, det in matches + low_matches:
+                track.update(det["world_coordinates"], det.get("confidence", 1.0), now)
+
+            updated = {id(t) for t, _ in matches + low_matches}
+            self._tracks = [
+                t for t in self._tracks
+                if id(t) in updated
+                or (t.hits >= self.min_hits and now - t.last_detected <= self.max_age_s)
+            ]
+            for det in new_dets:
+                self._tracks.append(Track(next(self._ids), det["label"], det["world_coordinates"],
+                                          det.get("confidence", 1.0), now))
+        return self.tracks(now)
+
+    def tracks(self, now: Optional[float] = None, include_tentative: bool = False) -> List[Dict]:
+        #Confirmed tracks extrapolated to `now`; positions between detections are predictions
+        now = now if now is not None else time.time()
+        with self._lock:
+            result = []
+            for t in self._tracks:
+                if t.hits < self.min_hits and not include_tentative:
+                    continue
+                if now - t.last_detected > self.max_age_s:
+                    continue
+                x, y = t.extrapolated(now)
+                result.append({
+                    "track_id": t.track_id,
+                    "label": t.label,
+                    "position": (float(x), float(y)),
+                    "height": t.height,
+                    "velocity": (float(t.x[2]), float(t.x[3])),
+                    "confidence": t.confidence,
+                    "first_seen": t.first_seen,
+                    "last_detected": t.last_detected,
+                    "predicted": now > t.last_detected,
+                    "hits": t.hits,
+                })
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._tracks = []
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._tracks)
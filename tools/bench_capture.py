@@ -0,0 +1,116 @@
+"""
+Camera capture latency and per-frame allocations.
+
+Renders the same scene headless (pybullet DIRECT) through two capture paths:
+  legacy  - the previous get_camera_image: np.array(...).reshape copies,
+            a fresh cv2.cvtColor output and the matrices rebuilt every frame
+  reused  - PerceptionModule.get_camera_image with the per-thread BGR buffer
+            and the view/projection matrices cached per camera pose
+The renderer itself dominates the latency; the allocation numbers show what
+the capture path adds on top of it.
+
+Usage:
+    python tools/bench_capture.py --frames 200 --width 320 --height 240
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+import pybullet as p
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from simulation.perception import PerceptionModule
+
+
+class StaticCamera:
+    """
+    Stands in for PepperVirtual: a camera at a fixed pose looking at the table.
+    """
+    def __init__(self, width, height):
+        self._view = p.computeViewMatrix([-1.5, -1.5, 1.2], [-3.5, -3.5, 0.7], [0, 0, 1])
+        self._proj = p.computeProjectionMatrixFOV(fov=60, aspect=width / height, nearVal=0.1, farVal=5.0)
+
+    def getCameraViewMatrix(self, cam_id=2):
+        return self._view
+
+    def getCameraProjectionMatrix(self, cam_id=2):
+        return self._proj
+
+
+def legacy_capture(pepper, width, height):
+    view_list = pepper.getCameraViewMatrix(2)
+    proj_list = pepper.getCameraProjectionMatrix(2)
+    _, _, rgba, depth_buf, _ = p.getCameraImage(width, height, viewMatrix=view_list, projectionMatrix=proj_list)
+    rgba = np.array(rgba, dtype=np.uint8).reshape((height, width, 4))
+    image_bgr = cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR)
+    depth_buf = np.array(depth_buf, dtype=np.float32).reshape((height, width))
+    view = np.array(view_list, dtype=np.float32).reshape((4,4), order='F')
+    proj = np.array(proj_list, dtype=np.float32).reshape((4,4), order='F')
+    return image_bgr, depth_buf, view, proj
+
+
+def build_scene():
+    p.connect(p.DIRECT)
+    p.setAdditionalSearchPath(ROOT)
+    p.loadURDF("simulation/objects/counter.urdf", [-6, 0, 0])
+    p.loadURDF("simulation/objects/table.urdf", [-3.5, -3.5, 0])
+    p.loadURDF("simulation/objects/cappuccino.urdf", [-3.45, -3.55, 0.66])
+
+
+def bench(capture, frames):
+    capture()
+    latencies = []
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        capture()
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    gc.collect()
+    tracemalloc.start()
+    peaks = []
+    for _ in range(min(frames, 50)):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        frame = capture()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        del frame
+    tracemalloc.stop()
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return p50, p99, float(np.mean(peaks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera capture latency / allocation benchmark")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    args = parser.parse_args()
+
+    build_scene()
+    camera = StaticCamera(args.width, args.height)
+    perceptor = PerceptionModule()
+    print(f"PyBullet numpy output: {'yes' if p.isNumpyEnabled() else 'no (lists are converted)'}")
+
+    paths = {
+        "legacy": lambda: legacy_capture(camera, args.width, args.height),
+        "reused": lambda: perceptor.get_camera_image(camera, args.width, args.height),
+    }
+    print(f"{'path':<8} {'p50 ms':>8} {'p99 ms':>8} {'alloc KB/frame':>15}")
+    print("-" * 42)
+    for name, capture in paths.items():
+        p50, p99, alloc = bench(capture, args.frames)
+        print(f"{name:<8} {p50:>8.2f} {p99:>8.2f} {alloc / 1024:>15.1f}")
+    p.disconnect()
+
+
+if __name__ == "__main__":
+    main()
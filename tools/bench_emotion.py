@@ -0,0 +1,70 @@
+"""
+Throughput benchmark for EmotionAnalyzer: per-call analyze_sentiment loop vs
+analyze_batch (pure and stateful), on the queries of the test datasets.
+
+Usage:
+    python tools/bench_emotion.py --n 2000 --repeat 3
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from simulation.emotion_analyzer import EmotionAnalyzer
+
+
+def load_corpus(n):
+    texts = []
+    for name in ("test_dataset.jsonl", "test_robustness_dataset.jsonl"):
+        with open(os.path.join(ROOT, name), "r", encoding="utf-8") as f:
+            texts.extend(json.loads(line)["query"] for line in f if line.strip())
+    return [texts[i % len(texts)] for i in range(n)]
+
+
+def bench(label, fn, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(texts)
+        best = min(best, time.perf_counter() - t0)
+    print(f"{label:<28} {len(texts) / best:>12.0f} texts/s   ({best * 1000:.1f} ms for {len(texts)})")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EmotionAnalyzer batch throughput benchmark")
+    parser.add_argument("--n", type=int, default=2000, help="Number of texts per run")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant (best is reported)")
+    args = parser.parse_args()
+
+    texts = load_corpus(args.n)
+    #No score cache: repeated runs over the same corpus would otherwise time LRU hits
+    analyzer = EmotionAnalyzer(history_size=10, score_cache_size=0)
+    analyzer.warm_up()
+
+    def loop(batch):
+        analyzer.reset_conversation()
+        for t in batch:
+            analyzer.analyze_sentiment(t)
+
+    def batch_pure(batch):
+        analyzer.analyze_batch(batch, pure=True)
+
+    def batch_stateful(batch):
+        analyzer.reset_conversation()
+        analyzer.analyze_batch(batch, pure=False)
+
+    print(f"EmotionAnalyzer throughput, {args.n} texts, best of {args.repeat}")
+    base = bench("analyze_sentiment loop", loop, texts, args.repeat)
+    pure = bench("analyze_batch(pure=True)", batch_pure, texts, args.repeat)
+    stateful = bench("analyze_batch(pure=False)", batch_stateful, texts, args.repeat)
+    print(f"speedup vs loop: pure x{base / pure:.2f}, stateful x{base / stateful:.2f}")
+
+
+if __name__ == "__main__":
+    main()
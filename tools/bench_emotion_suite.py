@@ -0,0 +1,277 @@
+"""
+Micro-benchmark and regression suite for EmotionAnalyzer.
+
+Measures analyze_sentiment (uncached and cached), get_emotional_context,
+detect_frustration_patterns and reset_conversation:
+  - cold latency: first call on a freshly built analyzer, median over
+    `--cold-runs` constructions
+  - warm latency: median and p99 over many calls
+  - allocations: peak bytes allocated per call and bytes retained per call (tracemalloc)
+and replays a long synthetic conversation (10k turns by default) mixing
+neutral turns, repeated questions and escalating frustration, reporting
+per-turn latency at the start and end of the conversation, retained memory
+and the mean frustration level of each phase.
+
+Results can be saved as a baseline and later runs compared against it. A
+metric fails the run (exit code 1) when it is worse than the baseline by
+more than its relative tolerance and by more than an absolute floor
+(`--min-delta-ms`, `--min-delta-bytes`), so timings of a few microseconds
+do not fail on noise. p99 metrics come from too few samples to gate on; they are
+reported only. Baselines are machine specific.
+
+Usage:
+    python tools/bench_emotion_suite.py --save-baseline tools/emotion_baseline.json
+    python tools/bench_emotion_suite.py --baseline tools/emotion_baseline.json --tolerance 0.25
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from simulation.emotion_analyzer import EmotionAnalyzer
+
+#Distinct neutral questions (template changes every turn), so they are not flagged as repetitions
+NEUTRAL = [
+    template.format(product)
+    for product in ("cappuccino", "espresso", "tea", "cornetto", "muffin", "sandwich", "orange juice", "water")
+    for template in ("How much is the {}?", "Do you have {} today?", "Quanto costa il {}?",
+                     "Take me to the {} please.", "Is there milk in the {}?")
+]
+REPEATED = ["Where is the restroom?", "where is the restroom", "Where is the restroom??"]
+ESCALATING = [
+    "I already asked that.", "That's not what I asked.", "This is not working.",
+    "This is useless and annoying!", "Stupid robot, it doesn't work, terrible!",
+    "Non funziona, sei inutile, è terribile!",
+]
+
+#Metrics where a higher value is a regression; the behaviour check is handled separately
+LOWER_IS_BETTER_SUFFIXES = ("_ms", "_bytes")
+#Tail latencies: reported, but too noisy at these sample counts to fail a run
+REPORT_ONLY_SUFFIXES = ("_p99_ms",)
+
+
+def _percentiles(samples):
+    p50, p99 = np.percentile(samples, [50, 99])
+    return float(p50), float(p99)
+
+
+def _new_analyzer(cache=False):
+    analyzer = EmotionAnalyzer(history_size=10, score_cache_size=1024 if cache else 0)
+    analyzer.warm_up()
+    return analyzer
+
+
+def _operations(analyzer, rng):
+    texts = NEUTRAL + REPEATED + ESCALATING
+    return {
+        "analyze_sentiment": lambda: analyzer.analyze_sentiment(rng.choice(texts)),
+        "get_emotional_context": analyzer.get_emotional_context,
+        "detect_frustration_patterns": lambda: analyzer.detect_frustration_patterns(rng.choice(texts)),
+        "reset_conversation": analyzer.reset_conversation,
+    }
+
+
+def _prime(analyzer, turns=10):
+    for i in range(turns):
+        analyzer.analyze_sentiment(ESCALATING[i % len(ESCALATING)])
+
+
+def bench_latency(calls, cold_runs, seed):
+    results = {}
+    for cache in (False, True):
+        suffix = "_cached" if cache else ""
+        for name in ("analyze_sentiment", "get_emotional_context", "detect_frustration_patterns", "reset_conversation"):
+            if cache and name != "analyze_sentiment":
+                continue
+            #A single first call is one sample of a few microseconds: take the median
+            cold = []
+            for _ in range(cold_runs):
+                analyzer = _new_analyzer(cache)
+                _prime(analyzer)
+                op = _operations(analyzer, random.Random(seed))[name]
+                t0 = time.perf_counter()
+                op()
+                cold.append((time.perf_counter() - t0) * 1000.0)
+            results[f"{name}{suffix}.cold_ms"] = float(np.median(cold))
+
+            samples = []
+            for _ in range(calls):
+                t0 = time.perf_counter()
+                op()
+                samples.append((time.perf_counter() - t0) * 1000.0)
+                if name == "reset_conversation":
+                    _prime(analyzer, 3)
+            p50, p99 = _percentiles(samples)
+            results[f"{name}{suffix}.warm_p50_ms"] = p50
+            results[f"{name}{suffix}.warm_p99_ms"] = p99
+    return results
+
+
+def bench_allocations(calls, seed):
+    results = {}
+    for name in ("analyze_sentiment", "get_emotional_context", "detect_frustration_patterns", "reset_conversation"):
+        analyzer = _new_analyzer(cache=False)
+        _prime(analyzer)
+        op = _operations(analyzer, random.Random(seed))[name]
+        op()
+        gc.collect()
+        tracemalloc.start()
+        peaks = []
+        start_current, _ = tracemalloc.get_traced_memory()
+        for _ in range(calls):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            op()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+        gc.collect()
+        end_current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"{name}.alloc_peak_bytes"] = float(np.mean(peaks))
+        results[f"{name}.retained_per_call_bytes"] = max(0.0, (end_current - start_current) / calls)
+    return results
+
+
+def synthetic_conversation(turns, seed):
+    #Repeating 50-turn cycles: neutral questions, repeated questions, escalating frustration
+    rng = random.Random(seed)
+    script = []
+    neutral_turns = 0
+    for i in range(turns):
+        phase = i % 50
+        if phase < 20:
+            script.append(("neutral", NEUTRAL[neutral_turns % len(NEUTRAL)]))
+            neutral_turns += 1
+        elif phase < 35:
+            script.append(("repeated", rng.choice(REPEATED)))
+        else:
+            script.append(("escalating", ESCALATING[min((phase - 35) // 2, len(ESCALATING) - 1)]))
+    return script
+
+
+def bench_conversation(turns, seed):
+    analyzer = _new_analyzer(cache=True)
+    script = synthetic_conversation(turns, seed)
+    window = max(1, min(1000, turns // 10))
+    latencies = []
+    frustration = {"neutral": [], "repeated": [], "escalating": []}
+
+    gc.collect()
+    tracemalloc.start()
+    start_current, _ = tracemalloc.get_traced_memory()
+    for phase, text in script:
+        t0 = time.perf_counter()
+        analyzer.analyze_sentiment(text)
+        context = analyzer.get_emotional_context()
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+        frustration[phase].append(context["frustration_level"])
+    gc.collect()
+    end_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    first_p50, first_p99 = _percentiles(latencies[:window])
+    last_p50, last_p99 = _percentiles(latencies[-window:])
+    means = {phase: float(np.mean(v)) for phase, v in frustration.items()}
+    return {
+        "conversation.first_turns_p50_ms": first_p50,
+        "conversation.first_turns_p99_ms": first_p99,
+        "conversation.last_turns_p50_ms": last_p50,
+        "conversation.last_turns_p99_ms": last_p99,
+        "conversation.retained_bytes": float(max(0, end_current - start_current)),
+        "conversation.frustration_neutral": means["neutral"],
+        "conversation.frustration_repeated": means["repeated"],
+        "conversation.frustration_escalating": means["escalating"],
+    }
+
+
+def check_behaviour(results):
+    #Frustration must rise with repetition and escalation, whatever the timings
+    failures = []
+    if not results["conversation.frustration_escalating"] > results["conversation.frustration_neutral"]:
+        failures.append("escalating frustration is not scored above neutral turns")
+    if not results["conversation.frustration_repeated"] > results["conversation.frustration_neutral"]:
+        failures.append("repeated questions are not scored above neutral turns")
+    return failures
+
+
+def compare(results, baseline, tolerance, min_delta_ms, min_delta_bytes):
+    failures = []
+    tolerances = baseline.get("tolerances", {})
+    print(f"\n{'metric':<52} {'baseline':>12} {'current':>12} {'change':>9}")
+    print("-" * 88)
+    for key, base in sorted(baseline.get("metrics", {}).items()):
+        if key not in results or not key.endswith(LOWER_IS_BETTER_SUFFIXES):
+            continue
+        current = results[key]
+        change = (current - base) / base if base else 0.0
+        limit = tolerances.get(key, tolerance)
+        floor = min_delta_bytes if key.endswith("_bytes") else min_delta_ms
+        if key.endswith(REPORT_ONLY_SUFFIXES):
+            flag = "  (not gated)"
+        else:
+            flag = "  REGRESSION" if change > limit and current - base > floor else ""
+        print(f"{key:<52} {base:>12.3f} {current:>12.3f} {100 * change:>8.1f}%{flag}")
+        if flag == "  REGRESSION":
+            failures.append(f"{key}: {base:.3f} -> {current:.3f} (+{100 * change:.1f}%, limit {100 * limit:.0f}%)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EmotionAnalyzer benchmark and regression suite")
+    parser.add_argument("--calls", type=int, default=500, help="Calls per operation for warm latency")
+    parser.add_argument("--cold-runs", type=int, default=15, help="Fresh analyzers per operation for cold latency")
+    parser.add_argument("--alloc-calls", type=int, default=200, help="Calls per operation under tracemalloc")
+    parser.add_argument("--turns", type=int, default=10000, help="Turns of the synthetic conversation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", type=str, default=None, help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Latency increases below this many ms never fail the run")
+    parser.add_argument("--min-delta-bytes", type=float, default=64,
+                        help="Memory increases below this many bytes never fail the run")
+    parser.add_argument("--save-baseline", type=str, default=None, help="Write the results as a new baseline")
+    parser.add_argument("--output", type=str, default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    results.update(bench_latency(args.calls, args.cold_runs, args.seed))
+    results.update(bench_allocations(args.alloc_calls, args.seed))
+    results.update(bench_conversation(args.turns, args.seed))
+
+    print(f"{'metric':<52} {'value':>12}")
+    print("-" * 66)
+    for key in sorted(results):
+        print(f"{key:<52} {results[key]:>12.3f}")
+
+    failures = check_behaviour(results)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            failures += compare(results, json.load(f), args.tolerance, args.min_delta_ms, args.min_delta_bytes)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"metrics": results, "tolerances": {}}, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
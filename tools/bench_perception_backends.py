@@ -0,0 +1,117 @@
+"""
+FPS and detection agreement of the perception inference backends.
+
+Renders the cafe scene headless (pybullet DIRECT) from a ring of camera
+poses around the table and the counter, then runs the same frames through
+every available backend:
+  torch           - ultralytics YOLOv8n under PyTorch (reference)
+  onnx, onnx-int8 - exported model on ONNX Runtime
+  openvino, openvino-int8
+Agreement is measured against the PyTorch detections of the same frame:
+a detection matches when it has the same class and IoU >= --iou; precision,
+recall and F1 are reported over all frames. The captured frames can be saved
+as the int8 calibration set with --save-calibration (needed once, before the
+first int8 export).
+
+Usage:
+    python tools/bench_perception_backends.py --frames 60 --save-calibration
+    python tools/bench_perception_backends.py --backends torch onnx openvino-int8
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import pybullet as p
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from simulation.detection_metrics import agreement
+from simulation.detector_backends import backend_available, write_calibration_set
+from simulation.perception import PerceptionModule
+
+ALL_BACKENDS = ("torch", "onnx", "onnx-int8", "openvino", "openvino-int8")
+TARGETS = [(-3.5, -3.5, 0.7), (-6.0, 0.0, 0.9)]
+
+
+def build_scene():
+    p.connect(p.DIRECT)
+    p.setAdditionalSearchPath(ROOT)
+    p.loadURDF("simulation/objects/counter.urdf", [-6, 0, 0])
+    p.loadURDF("simulation/objects/table.urdf", [-3.5, -3.5, 0])
+    for i, name in enumerate(("cappuccino", "water_bottle", "muffin", "sandwich")):
+        p.loadURDF(f"simulation/objects/{name}.urdf", [-3.6 + 0.15 * i, -3.55, 0.66])
+
+
+def capture_frames(count, width, height):
+    proj = p.computeProjectionMatrixFOV(fov=60, aspect=width / height, nearVal=0.1, farVal=5.0)
+    frames = []
+    for i in range(count):
+        target = TARGETS[i % len(TARGETS)]
+        angle = 2 * math.pi * i / count
+        distance = 1.2 + 0.8 * ((i // len(TARGETS)) % 3) / 2
+        eye = [target[0] + distance * math.cos(angle), target[1] + distance * math.sin(angle), 1.2]
+        view = p.computeViewMatrix(eye, target, [0, 0, 1])
+        _, _, rgba, _, _ = p.getCameraImage(width, height, viewMatrix=view, projectionMatrix=proj)
+        rgba = np.asarray(rgba, dtype=np.uint8).reshape((height, width, 4))
+        frames.append(cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR))
+    return frames
+
+
+def run_backend(name, frames):
+    backend, _, quant = name.partition("-")
+    perceptor = PerceptionModule(backend=backend, int8=quant == "int8")
+    t0 = time.perf_counter()
+    perceptor.detect_objects(frames[0])
+    startup = time.perf_counter() - t0
+
+    detections = []
+    t0 = time.perf_counter()
+    for frame in frames:
+        detections.append(perceptor.detect_objects(frame))
+    elapsed = time.perf_counter() - t0
+    return detections, len(frames) / elapsed, startup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perception backend FPS / agreement benchmark")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU for two detections to agree")
+    parser.add_argument("--backends", nargs="+", default=list(ALL_BACKENDS), choices=ALL_BACKENDS)
+    parser.add_argument("--save-calibration", action="store_true",
+                        help="Add the captured frames to the int8 calibration set")
+    args = parser.parse_args()
+
+    build_scene()
+    frames = capture_frames(args.frames, args.width, args.height)
+    p.disconnect()
+    if args.save_calibration:
+        print(f"Saved {write_calibration_set(frames)} calibration frames.")
+
+    #PyTorch always runs first: it is the reference for agreement
+    backends = ["torch"] + [b for b in args.backends if b != "torch" and backend_available(b.partition("-")[0])]
+
+    print(f"{'backend':<15} {'startup s':>10} {'FPS':>8} {'precision':>10} {'recall':>8} {'F1':>6}")
+    print("-" * 62)
+    reference = None
+    for name in backends:
+        try:
+            detections, fps, startup = run_backend(name, frames)
+        except (FileNotFoundError, ImportError, RuntimeError) as e:
+            print(f"{name:<15} skipped: {e}")
+            continue
+        if name == "torch":
+            reference = detections
+        precision, recall, f1 = agreement(reference, detections, args.iou)
+        print(f"{name:<15} {startup:>10.2f} {fps:>8.1f} {precision:>10.3f} {recall:>8.3f} {f1:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Headless perception benchmark on recorded frames (no PyBullet, no GUI).
+
+Record frames during a normal simulation run:
+    PERCEPTION_RECORD_DIR=recordings/run1 python main_simulation_dynamic.py
+then replay them through PerceptionModule for every backend and inference
+resolution (YOLO imgsz). Each configuration runs in a fresh interpreter so
+memory numbers are comparable. For each one the benchmark reports:
+  - capture-free FPS (detection + localization only)
+  - per-stage latency p50 / p99: preprocess, inference, postprocess (from
+    ultralytics) and localize (depth unprojection)
+  - RSS after the run and peak RSS
+  - stability: F1 between the detections of consecutive frames
+  - agreement: F1 against the first configuration (normally torch at the
+    first resolution) on the same frames
+With --adaptive every backend also runs with AdaptiveInference (imgsz is
+then chosen per frame); its frames are broken down by mode with the share of
+frames, p50 latency and recall against the reference in each mode.
+
+Usage:
+    python tools/bench_perception_replay.py recordings/run1 --backends torch onnx --imgsz 640 320
+    python tools/bench_perception_replay.py recordings/run1 --imgsz 640 --adaptive
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from simulation.detection_metrics import agreement
+
+STAGES = ("preprocess", "inference", "postprocess", "localize")
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_child(recording, config, imgsz, limit, iou, adaptive):
+    from simulation.adaptive_inference import AdaptiveInference
+    from simulation.frame_recorder import load_recording
+    from simulation.perception import CONFIDENCE_THRESHOLD, PerceptionModule
+
+    frames = [frame for _, frame in load_recording(recording, limit)]
+    if not frames:
+        raise SystemExit(f"No frame_*.npz files in {recording}")
+    backend, _, quant = config.partition("-")
+    perceptor = PerceptionModule(backend=backend, int8=quant == "int8")
+    perceptor.detect_objects(frames[0][0], imgsz)
+    policy = AdaptiveInference(confidence_threshold=CONFIDENCE_THRESHOLD) if adaptive else None
+
+    stages = {stage: [] for stage in STAGES}
+    detections, modes, latencies = [], [], []
+    t_start = time.perf_counter()
+    for image, depth_buf, view, proj in frames:
+        t_frame = time.perf_counter()
+        dets = policy.detect(perceptor, image) if policy else perceptor.detect_objects(image, imgsz)
+        t0 = time.perf_counter()
+        perceptor.localize_objects_3d(dets, depth_buf, view, proj)
+        stages["localize"].append((time.perf_counter() - t0) * 1000.0)
+        latencies.append((time.perf_counter() - t_frame) * 1000.0)
+        for stage in STAGES[:3]:
+            #With the adaptive policy these are the last of possibly two passes
+            stages[stage].append(perceptor.last_speed.get(stage, 0.0))
+        if policy:
+            modes.append(policy.last_mode)
+        detections.append([{"label": d["label"], "bbox": [float(v) for v in d["bbox"]]} for d in dets])
+    elapsed = time.perf_counter() - t_start
+
+    _, _, stability = agreement(detections[:-1], detections[1:], iou)
+    result = {
+        "config": config + ("+adaptive" if adaptive else ""),
+        "imgsz": "auto" if adaptive else imgsz,
+        "frames": len(frames),
+        "fps": len(frames) / elapsed,
+        "rss_mb": rss_mb(),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        "stability_f1": stability,
+        "detections": detections,
+        "latencies_ms": latencies,
+        "modes": modes,
+    }
+    for stage, samples in stages.items():
+        p50, p99 = np.percentile(samples, [50, 99])
+        result[f"{stage}_p50_ms"] = float(p50)
+        result[f"{stage}_p99_ms"] = float(p99)
+    print(json.dumps(result))
+
+
+def per_mode(reference, detections, modes, latencies, iou):
+    #Share of frames, latency and recall of the adaptive policy in each mode
+    breakdown = {}
+    for mode in sorted(set(modes)):
+        idx = [i for i, m in enumerate(modes) if m == mode]
+        _, recall, _ = agreement([reference[i] for i in idx], [detections[i] for i in idx], iou)
+        breakdown[mode] = {
+            "share": len(idx) / len(modes),
+            "latency_p50_ms": float(np.percentile([latencies[i] for i in idx], 50)),
+            "recall": recall,
+        }
+    return breakdown
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded frames through PerceptionModule")
+    parser.add_argument("recording", help="Directory of frame_*.npz files")
+    parser.add_argument("--backends", nargs="+", default=["torch"],
+                        choices=["torch", "onnx", "onnx-int8", "openvino", "openvino-int8"])
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[640], help="YOLO inference resolutions")
+    parser.add_argument("--limit", type=int, default=None, help="Replay at most this many frames")
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--adaptive", action="store_true", help="Also run every backend with AdaptiveInference")
+    parser.add_argument("--output", type=str, default=None, help="Write the results as JSON")
+    parser.add_argument("--child", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.recording, args.child, args.imgsz[0], args.limit, args.iou, args.adaptive)
+        return
+
+    header = (f"{'config':<15} {'imgsz':>5} {'FPS':>7} " +
+              " ".join(f"{s[:5] + ' p50/p99':>15}" for s in STAGES) +
+              f" {'RSS MB':>7} {'peak MB':>8} {'stable':>7} {'agree':>6}")
+    print(header)
+    print("-" * len(header))
+    runs = [(config, imgsz, False) for config in args.backends for imgsz in args.imgsz]
+    if args.adaptive:
+        runs += [(config, args.imgsz[0], True) for config in args.backends]
+    results, reference = [], None
+    for config, imgsz, adaptive in runs:
+        cmd = [sys.executable, os.path.abspath(__file__), args.recording, "--child", config,
+               "--imgsz", str(imgsz), "--iou", str(args.iou)]
+        if args.limit:
+            cmd += ["--limit", str(args.limit)]
+        if adaptive:
+            cmd.append("--adaptive")
+        out = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+        lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+        if out.returncode != 0 or not lines:
+            error = out.stderr.strip().splitlines()[-1] if out.stderr.strip() else out.returncode
+            print(f"{config:<15} {imgsz:>5} failed: {error}")
+            continue
+        r = json.loads(lines[-1])
+        detections = r.pop("detections")
+        if reference is None:
+            reference = detections
+        r["agreement_f1"] = agreement(reference, detections, args.iou)[2]
+        if r["modes"]:
+            r["per_mode"] = per_mode(reference, detections, r["modes"], r["latencies_ms"], args.iou)
+        results.append(r)
+        stages = " ".join(f"{r[f'{s}_p50_ms']:>7.1f}/{r[f'{s}_p99_ms']:<7.1f}" for s in STAGES)
+        print(f"{r['config']:<15} {r['imgsz']:>5} {r['fps']:>7.1f} {stages} {r['rss_mb']:>7.0f} "
+              f"{r['peak_rss_mb']:>8.0f} {r['stability_f1']:>7.3f} {r['agreement_f1']:>6.3f}")
+
+    for r in results:
+        if "per_mode" not in r:
+            continue
+        print(f"\n{r['config']} by mode:")
+        print(f"  {'mode':<6} {'share':>6} {'p50 ms':>8} {'recall':>7}")
+        for mode, m in r["per_mode"].items():
+            print(f"  {mode:<6} {m['share']:>6.0%} {m['latency_p50_ms']:>8.1f} {m['recall']:>7.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
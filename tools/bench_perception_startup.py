@@ -0,0 +1,90 @@
+"""
+Startup time and resident memory of the perception stack.
+
+Builds the same number of PerceptionModules as the dynamic demo (motion
+module, DynamicNavigator, simulation bridge, main) and runs one inference on
+each. Each mode runs in a fresh interpreter so RSS numbers are comparable:
+  legacy  - one YOLO('yolov8n.pt') per module, as before the model registry
+  shared  - PerceptionModule with the process-wide model registry
+
+Usage:
+    python tools/bench_perception_startup.py --modules 4
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_child(mode, modules):
+    import numpy as np
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    result = {"mode": mode, "rss_start_mb": rss_mb()}
+
+    t0 = time.perf_counter()
+    if mode == "legacy":
+        from ultralytics import YOLO
+        models = [YOLO("yolov8n.pt") for _ in range(modules)]
+        infer = [lambda m=m: m(frame, verbose=False) for m in models]
+    else:
+        from simulation.perception import PerceptionModule
+        perceptors = [PerceptionModule() for _ in range(modules)]
+        infer = [lambda pm=pm: pm.detect_objects(frame) for pm in perceptors]
+    result["construct_s"] = time.perf_counter() - t0
+    result["rss_constructed_mb"] = rss_mb()
+
+    t0 = time.perf_counter()
+    for fn in infer:
+        fn()
+    result["first_inference_s"] = time.perf_counter() - t0
+    result["startup_total_s"] = result["construct_s"] + result["first_inference_s"]
+    result["rss_after_inference_mb"] = rss_mb()
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perception startup time / RSS benchmark")
+    parser.add_argument("--modules", type=int, default=4, help="PerceptionModules created by the demo")
+    parser.add_argument("--child", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.modules)
+        return
+
+    print(f"{'mode':<8} {'construct s':>12} {'1st infer s':>12} {'total s':>9} {'RSS built MB':>13} {'RSS MB':>8}")
+    print("-" * 68)
+    for mode in ("legacy", "shared"):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", mode, "--modules", str(args.modules)],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+        if out.returncode != 0 or not lines:
+            print(f"{mode:<8} failed: {out.stderr.strip().splitlines()[-1] if out.stderr.strip() else out.returncode}")
+            continue
+        r = json.loads(lines[-1])
+        print(f"{mode:<8} {r['construct_s']:>12.2f} {r['first_inference_s']:>12.2f} {r['startup_total_s']:>9.2f} "
+              f"{r['rss_constructed_mb']:>13.0f} {r['rss_after_inference_mb']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
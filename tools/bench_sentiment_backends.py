@@ -0,0 +1,107 @@
+"""
+Latency and accuracy of the EmotionAnalyzer sentiment backends.
+
+Latency is measured on the queries of test_robustness_dataset.jsonl: cold
+first call (includes lazy model loading), per-text p50/p95 and batched
+throughput. The robustness queries are neutral requests, so the share scored
+neutral is reported too. Accuracy is measured per language on the labelled
+English/Italian test_sentiment_dataset.jsonl, mapping polarity to a label
+with the same +-0.3 thresholds EmotionAnalyzer uses.
+
+Usage:
+    python tools/bench_sentiment_backends.py
+    python tools/bench_sentiment_backends.py --backends lexicon,onnx --model-dir models/sentiment-onnx
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from simulation.sentiment_backends import create_backend
+
+POLARITY_THRESHOLD = 0.3
+
+
+def load_jsonl(name):
+    with open(os.path.join(ROOT, name), "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def label(polarity):
+    if polarity > POLARITY_THRESHOLD:
+        return "positive"
+    if polarity < -POLARITY_THRESHOLD:
+        return "negative"
+    return "neutral"
+
+
+def bench_backend(backend, robustness, labelled, repeat):
+    queries = [item["query"] for item in robustness]
+
+    t0 = time.perf_counter()
+    backend.score(queries[0])
+    cold_ms = (time.perf_counter() - t0) * 1000.0
+
+    single = []
+    for _ in range(repeat):
+        for q in queries:
+            t0 = time.perf_counter()
+            backend.score(q)
+            single.append((time.perf_counter() - t0) * 1000.0)
+    p50, p95 = np.percentile(single, [50, 95])
+
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        scores = backend.score_batch(queries)
+        best = min(best, time.perf_counter() - t0)
+    neutral_rate = float(np.mean([label(p) == "neutral" for p in scores[:, 0]]))
+
+    predictions = backend.score_batch([item["query"] for item in labelled])[:, 0]
+    correct, total = defaultdict(int), defaultdict(int)
+    for item, polarity in zip(labelled, predictions):
+        for key in (item["language"], "all"):
+            total[key] += 1
+            correct[key] += label(polarity) == item["expected_sentiment"]
+    accuracy = {k: correct[k] / total[k] for k in total}
+
+    return {
+        "cold_ms": cold_ms, "p50_ms": p50, "p95_ms": p95,
+        "batch_texts_per_s": len(queries) / best,
+        "robustness_neutral": neutral_rate, "accuracy": accuracy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentiment backend latency/accuracy benchmark")
+    parser.add_argument("--backends", type=str, default="lexicon", help="Comma separated: lexicon,onnx")
+    parser.add_argument("--model-dir", type=str, default=os.getenv("SENTIMENT_MODEL_DIR", "models/sentiment-onnx"))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    robustness = load_jsonl("test_robustness_dataset.jsonl")
+    labelled = load_jsonl("test_sentiment_dataset.jsonl")
+
+    print(f"{'backend':<10} {'cold ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'batch/s':>9} "
+          f"{'neutral%':>9} {'acc en':>7} {'acc it':>7} {'acc all':>8}")
+    print("-" * 84)
+    for name in args.backends.split(","):
+        name = name.strip()
+        kwargs = {"model_dir": args.model_dir} if name == "onnx" else {}
+        r = bench_backend(create_backend(name, **kwargs), robustness, labelled, args.repeat)
+        acc = r["accuracy"]
+        print(f"{name:<10} {r['cold_ms']:>9.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['batch_texts_per_s']:>9.0f} {100 * r['robustness_neutral']:>8.1f}% "
+              f"{100 * acc.get('en', 0):>6.1f}% {100 * acc.get('it', 0):>6.1f}% {100 * acc['all']:>7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Concurrent multi-robot load generator for llm_server.
+
+Each simulated robot behaves like a Pepper bridge and replays dialogue flows:
+wake word followed by a first interaction, a few follow-ups with the
+determined role, an occasional role change (new user) and resets through
+/reset_emotion. Results are reported per scenario: throughput, latency
+percentiles, error rate and fallback rate (from the X-Fallback-Reason header).
+
+Usage (server already running, e.g. against tools/mock_openai.py):
+    python tools/load_test.py --robots 8 --duration 60
+
+Self-contained run that spawns the mock backend and llm_server:
+    python tools/load_test.py --spawn --robots 16 --duration 60 \\
+        --mock-latency-ms 400 --mock-failure-rate 0.02 --mock-malformed-rate 0.05
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import numpy as np
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ["first_interaction", "follow_up", "role_change", "reset"]
+
+
+def load_queries():
+    by_role = defaultdict(list)
+    with open(os.path.join(ROOT, "test_dataset.jsonl"), "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                by_role[item["expected_role"]].append(item["query"])
+    return by_role
+
+
+class LoadStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.fallbacks = defaultdict(int)
+
+    def record(self, scenario, latency_ms, ok, fallback):
+        with self._lock:
+            self.samples[scenario].append(latency_ms)
+            if not ok:
+                self.errors[scenario] += 1
+            if fallback:
+                self.fallbacks[scenario] += 1
+
+    def report(self, wall_time_s):
+        print(f"\n{'scenario':<18} {'reqs':>6} {'req/s':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'err%':>7} {'fallback%':>10}")
+        print("-" * 88)
+        total = 0
+        for scenario in SCENARIOS:
+            lat = self.samples.get(scenario)
+            if not lat:
+                continue
+            total += len(lat)
+            arr = np.array(lat)
+            p50, p90, p99 = np.percentile(arr, [50, 90, 99])
+            print(f"{scenario:<18} {len(arr):>6} {len(arr) / wall_time_s:>8.2f} "
+                  f"{p50:>8.1f} {p90:>8.1f} {p99:>8.1f} {arr.max():>8.1f} "
+                  f"{100.0 * self.errors[scenario] / len(arr):>6.1f}% "
+                  f"{100.0 * self.fallbacks[scenario] / len(arr):>9.1f}%")
+        all_lat = np.concatenate([np.array(v) for v in self.samples.values()]) if self.samples else np.array([0.0])
+        all_err = sum(self.errors.values())
+        all_fb = sum(self.fallbacks.values())
+        print("-" * 88)
+        print(f"{'total':<18} {total:>6} {total / wall_time_s:>8.2f} "
+              f"{np.percentile(all_lat, 50):>8.1f} {np.percentile(all_lat, 90):>8.1f} "
+              f"{np.percentile(all_lat, 99):>8.1f} {all_lat.max():>8.1f} "
+              f"{100.0 * all_err / max(total, 1):>6.1f}% {100.0 * all_fb / max(total, 1):>9.1f}%")
+        print("(latencies in ms)")
+
+
+class SimulatedRobot(threading.Thread):
+    """
+    One Pepper bridge replaying dialogue flows until the deadline.
+    """
+    def __init__(self, robot_id, base_url, queries, stats, deadline, think_ms, max_follow_ups, role_change_prob):
+        super().__init__(name=f"robot-{robot_id}", daemon=True)
+        self.robot_id = robot_id
+        self.base_url = base_url.rstrip("/")
+        self.queries = queries
+        self.stats = stats
+        self.deadline = deadline
+        self.think_ms = think_ms
+        self.max_follow_ups = max_follow_ups
+        self.role_change_prob = role_change_prob
+        self.http = requests.Session()
+        self.rng = random.Random(robot_id)
+        self.current_role = "unknown"
+
+    def _think(self):
+        if self.think_ms > 0:
+            time.sleep(self.rng.uniform(0.5, 1.5) * self.think_ms / 1000.0)
+
+    def _reset(self):
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            ok = self.http.post(f"{self.base_url}/reset_emotion", headers={"X-Session-ID": self.name},
+                                timeout=10.0).ok
+        except requests.RequestException:
+            pass
+        self.stats.record("reset", (time.perf_counter() - t0) * 1000.0, ok, False)
+        self.current_role = "unknown"
+
+    def _chat(self, scenario, text):
+        session_status = "first_interaction" if self.current_role == "unknown" else "ongoing_interaction"
+        payload = {"text": text, "session_status": session_status, "current_role": self.current_role}
+        headers = {"X-Request-ID": f"load-{self.robot_id}-{uuid.uuid4().hex[:8]}", "X-Session-ID": self.name}
+        t0 = time.perf_counter()
+        ok, fallback = False, False
+        try:
+            resp = self.http.post(f"{self.base_url}/chat", json=payload, headers=headers, timeout=20.0)
+            ok = resp.ok
+            if ok:
+                fallback = "X-Fallback-Reason" in resp.headers
+                role = resp.json().get("determined_role", "customer")
+                if self.current_role == "unknown":
+                    self.current_role = role
+        except (requests.RequestException, ValueError):
+            pass
+        self.stats.record(scenario, (time.perf_counter() - t0) * 1000.0, ok, fallback)
+
+    def _query_for(self, role):
+        return self.rng.choice(self.queries[role])
+
+    def run(self):
+        while time.time() < self.deadline:
+            #Wake word + first interaction of a new customer
+            self._reset()
+            user_role = self.rng.choices(["customer", "worker", "supervisor"], weights=[0.7, 0.2, 0.1])[0]
+            self._chat("first_interaction", self._query_for(user_role))
+            self._think()
+
+            for _ in range(self.rng.randint(1, self.max_follow_ups)):
+                if time.time() >= self.deadline:
+                    return
+                self._chat("follow_up", self._query_for(user_role))
+                self._think()
+
+            if self.rng.random() < self.role_change_prob and time.time() < self.deadline:
+                self._reset()
+                new_role = self.rng.choice([r for r in ("customer", "worker", "supervisor") if r != user_role])
+                self._chat("role_change", self._query_for(new_role))
+                self._think()
+
+
+def _wait_ready(url, timeout=60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1.0).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def spawn_stack(args):
+    env = dict(os.environ)
+    mock_cmd = [
+        sys.executable, os.path.join(ROOT, "tools", "mock_openai.py"), "--port", str(args.mock_port),
+        "--latency-ms", str(args.mock_latency_ms), "--jitter-ms", str(args.mock_jitter_ms),
+        "--failure-rate", str(args.mock_failure_rate), "--malformed-rate", str(args.mock_malformed_rate),
+    ]
+    mock = subprocess.Popen(mock_cmd, cwd=ROOT, env=env)
+    if not _wait_ready(f"http://127.0.0.1:{args.mock_port}/stats"):
+        mock.terminate()
+        raise RuntimeError("Mock OpenAI backend did not start.")
+
+    env.update(OPENAI_BASE_URL=f"http://127.0.0.1:{args.mock_port}/v1", OPENAI_API_KEY="mock")
+    server_cmd = [sys.executable, "-m", "uvicorn", "llm_server:app", "--port", str(args.server_port),
+                  "--workers", str(args.server_workers), "--log-level", "warning"]
+    server = subprocess.Popen(server_cmd, cwd=ROOT, env=env)
+    if not _wait_ready(f"http://127.0.0.1:{args.server_port}/readyz"):
+        server.terminate(); mock.terminate()
+        raise RuntimeError("llm_server did not start.")
+    return [server, mock]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-robot load generator for llm_server")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:8000", help="llm_server base URL")
+    parser.add_argument("--robots", type=int, default=4, help="Number of concurrent simulated bridges")
+    parser.add_argument("--duration", type=float, default=30.0, help="Test duration in seconds")
+    parser.add_argument("--think-ms", type=float, default=500.0, help="Mean user think time between turns")
+    parser.add_argument("--max-follow-ups", type=int, default=3)
+    parser.add_argument("--role-change-prob", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn", action="store_true", help="Start the mock backend and llm_server as subprocesses")
+    parser.add_argument("--server-port", type=int, default=8000)
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--mock-port", type=int, default=8100)
+    parser.add_argument("--mock-latency-ms", type=float, default=300.0)
+    parser.add_argument("--mock-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--mock-failure-rate", type=float, default=0.0)
+    parser.add_argument("--mock-malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    procs = []
+    if args.spawn:
+        procs = spawn_stack(args)
+        args.url = f"http://127.0.0.1:{args.server_port}"
+
+    try:
+        queries = load_queries()
+        stats = LoadStats()
+        start = time.time()
+        deadline = start + args.duration
+        robots = [
+            SimulatedRobot(args.seed * 1000 + i, args.url, queries, stats, deadline,
+                           args.think_ms, args.max_follow_ups, args.role_change_prob)
+            for i in range(args.robots)
+        ]
+        print(f"Running {args.robots} robots against {args.url} for {args.duration:.0f}s...")
+        for r in robots:
+            r.start()
+        for r in robots:
+            r.join()
+        stats.report(time.time() - start)
+    finally:
+        for proc in procs:
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Local OpenAI-compatible mock used to load-test llm_server without calling
+the real API. It implements POST /v1/embeddings and POST /v1/chat/completions
+with configurable per-call latency, failure injection (HTTP 500/429) and
+malformed-JSON injection in the completion content.
+
+Chat completions replay the recorded `llm_response` of test_dataset.jsonl when
+the query is known and fall back to simple keyword rules otherwise.
+
+Usage:
+    python tools/mock_openai.py --port 8100 --latency-ms 400 --jitter-ms 150 \\
+        --failure-rate 0.02 --malformed-rate 0.05
+    OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=mock uvicorn llm_server:app
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+MOCK_CONFIG = {
+    "latency_ms": float(os.getenv("MOCK_LATENCY_MS", 300)),
+    "jitter_ms": float(os.getenv("MOCK_JITTER_MS", 100)),
+    "emb_latency_ms": float(os.getenv("MOCK_EMB_LATENCY_MS", 40)),
+    "failure_rate": float(os.getenv("MOCK_FAILURE_RATE", 0.0)),
+    "malformed_rate": float(os.getenv("MOCK_MALFORMED_RATE", 0.0)),
+    "emb_dims": int(os.getenv("MOCK_EMB_DIMS", 256)),
+}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+app = FastAPI()
+stats = {"embeddings": 0, "chat_completions": 0, "failures": 0, "malformed": 0}
+
+
+def _load_recorded_responses():
+    recorded = {}
+    try:
+        with open(os.path.join(ROOT, "test_dataset.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    recorded[item["query"].lower().strip()] = item["llm_response"]
+    except FileNotFoundError:
+        pass
+    return recorded
+
+RECORDED = _load_recorded_responses()
+MENU_NAMES = ["cappuccino", "espresso", "cornetto", "tea", "orange juice", "sandwich", "muffin", "water bottle"]
+
+
+async def _simulate_latency(base_ms):
+    delay = max(0.0, random.gauss(base_ms, MOCK_CONFIG["jitter_ms"] / 2.0 if base_ms else 0.0))
+    await asyncio.sleep(delay / 1000.0)
+
+
+def _maybe_fail():
+    if random.random() < MOCK_CONFIG["failure_rate"]:
+        stats["failures"] += 1
+        status = random.choice([500, 429])
+        return JSONResponse(status_code=status, content={
+            "error": {"message": "Injected mock failure", "type": "server_error", "code": status}
+        })
+    return None
+
+
+def _embed(text, dims):
+    seed = int.from_bytes(hashlib.sha1(text.lower().encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dims).astype(np.float32)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+def _parse_user_message(messages):
+    user_msg = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    query = re.search(r"User query: (.*)", user_msg)
+    role = re.search(r"Current known role: (\w+)", user_msg)
+    return (query.group(1).strip() if query else user_msg.strip(),
+            role.group(1) if role else "unknown")
+
+
+def _heuristic_response(query, current_role):
+    q = query.lower()
+    if current_role in ("customer", "worker", "supervisor"):
+        role = current_role
+    elif any(w in q for w in ("report", "sales", "revenue", "staff", "metrics", "supervisor")):
+        role = "supervisor"
+    elif any(w in q for w in ("stock", "inventory", "machine", "restock", "worker")):
+        role = "worker"
+    else:
+        role = "customer"
+
+    product = next((m for m in MENU_NAMES if m in q), None)
+    if any(w in q for w in ("take me", "guide", "where", "show me", "locate")):
+        return {"determined_role": role, "response_type": "function_call", "content": "Okay, follow me.",
+                "function_call": {"name": "Maps_to", "arguments": {"location": product or "counter"}}}
+    if product and any(w in q for w in ("price", "how much", "cost")):
+        return {"determined_role": role, "response_type": "function_call", "content": "",
+                "function_call": {"name": "get_price", "arguments": {"product": product}}}
+    if product and "allergen" in q:
+        return {"determined_role": role, "response_type": "function_call", "content": "",
+                "function_call": {"name": "get_allergens", "arguments": {"product": product}}}
+    return {"determined_role": role, "response_type": "content",
+            "content": "Hello! How can I help you today?", "function_call": None}
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    await _simulate_latency(MOCK_CONFIG["emb_latency_ms"])
+    failure = _maybe_fail()
+    if failure:
+        return failure
+    inputs = body.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    stats["embeddings"] += 1
+    return {
+        "object": "list",
+        "model": body.get("model", "mock-embedding"),
+        "data": [
+            {"object": "embedding", "index": i, "embedding": _embed(text, MOCK_CONFIG["emb_dims"])}
+            for i, text in enumerate(inputs)
+        ],
+        "usage": {"prompt_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await _simulate_latency(MOCK_CONFIG["latency_ms"])
+    failure = _maybe_fail()
+    if failure:
+        return failure
+    stats["chat_completions"] += 1
+
+    query, current_role = _parse_user_message(body.get("messages", []))
+    recorded = RECORDED.get(query.lower())
+    reply = dict(recorded) if recorded else _heuristic_response(query, current_role)
+    if current_role in ("customer", "worker", "supervisor"):
+        reply["determined_role"] = current_role
+    content = json.dumps(reply, ensure_ascii=False)
+
+    if random.random() < MOCK_CONFIG["malformed_rate"]:
+        stats["malformed"] += 1
+        content = random.choice([
+            content[: len(content) // 2],
+            "Sure! " + content,
+            '{"response_type": "content", "content": "missing role"}',
+        ])
+
+    return {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock-llm"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    return {"config": MOCK_CONFIG, "stats": stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock backend")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=MOCK_CONFIG["latency_ms"], help="Mean chat completion latency")
+    parser.add_argument("--jitter-ms", type=float, default=MOCK_CONFIG["jitter_ms"], help="Latency spread (~2 sigma)")
+    parser.add_argument("--emb-latency-ms", type=float, default=MOCK_CONFIG["emb_latency_ms"], help="Mean embeddings latency")
+    parser.add_argument("--failure-rate", type=float, default=MOCK_CONFIG["failure_rate"], help="Fraction of calls answered with HTTP 500/429")
+    parser.add_argument("--malformed-rate", type=float, default=MOCK_CONFIG["malformed_rate"], help="Fraction of completions with invalid JSON content")
+    parser.add_argument("--emb-dims", type=int, default=MOCK_CONFIG["emb_dims"])
+    args = parser.parse_args()
+
+    MOCK_CONFIG.update(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, emb_latency_ms=args.emb_latency_ms,
+        failure_rate=args.failure_rate, malformed_rate=args.malformed_rate, emb_dims=args.emb_dims
+    )
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
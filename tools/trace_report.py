@@ -0,0 +1,135 @@
+"""
+Prints per-stage waterfalls and latency percentiles from the span JSONL file
+written by simulation/tracing.py.
+
+Usage:
+    python tools/trace_report.py traces.jsonl                 # percentiles + last 3 waterfalls
+    python tools/trace_report.py traces.jsonl --last 10
+    python tools/trace_report.py traces.jsonl --trace <trace_id>
+"""
+
+import argparse
+import json
+import math
+from collections import defaultdict
+
+BAR_WIDTH = 40
+
+
+def load_spans(path):
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return spans
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    idx = (len(sorted_values) - 1) * q
+    lo, hi = math.floor(idx), math.ceil(idx)
+    if lo == hi:
+        return sorted_values[lo]
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (idx - lo)
+
+
+def group_traces(spans):
+    traces = defaultdict(list)
+    for s in spans:
+        traces[s["trace_id"]].append(s)
+    return traces
+
+
+def trace_bounds(trace_spans):
+    start = min(s["start"] for s in trace_spans)
+    end = max(s["start"] + (s["duration_ms"] or 0) / 1000.0 for s in trace_spans)
+    return start, end
+
+
+def print_percentiles(spans, traces):
+    by_stage = defaultdict(list)
+    for s in spans:
+        if s.get("duration_ms") is not None:
+            by_stage[(s["service"], s["name"])].append(s["duration_ms"])
+
+    end_to_end = []
+    for trace_spans in traces.values():
+        start, end = trace_bounds(trace_spans)
+        end_to_end.append((end - start) * 1000.0)
+
+    header = f"{'service':<20} {'stage':<24} {'count':>6} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = sorted(by_stage.items(), key=lambda kv: -percentile(sorted(kv[1]), 0.5))
+    rows.append((("*", "end_to_end"), end_to_end))
+    for (service, name), values in rows:
+        v = sorted(values)
+        print(f"{service:<20} {name:<24} {len(v):>6} "
+              f"{percentile(v, 0.5):>9.1f} {percentile(v, 0.9):>9.1f} "
+              f"{percentile(v, 0.99):>9.1f} {v[-1] if v else float('nan'):>9.1f}")
+    print("(all values in ms)\n")
+
+
+def print_waterfall(trace_id, trace_spans):
+    start, end = trace_bounds(trace_spans)
+    total_ms = max((end - start) * 1000.0, 1e-6)
+    by_id = {s["span_id"]: s for s in trace_spans}
+
+    def depth(s):
+        d, parent = 0, s.get("parent_id")
+        while parent in by_id and d < 32:
+            d += 1
+            parent = by_id[parent].get("parent_id")
+        return d
+
+    print(f"Trace {trace_id}  total={total_ms:.1f} ms  spans={len(trace_spans)}")
+    for s in sorted(trace_spans, key=lambda x: x["start"]):
+        offset_ms = (s["start"] - start) * 1000.0
+        dur_ms = s["duration_ms"] or 0.0
+        col = int(offset_ms / total_ms * BAR_WIDTH)
+        width = max(1, int(round(dur_ms / total_ms * BAR_WIDTH)))
+        bar = " " * col + "█" * min(width, BAR_WIDTH - col if col < BAR_WIDTH else 1)
+        label = "  " * depth(s) + f"{s['service']}:{s['name']}"
+        status = "" if s.get("status", "ok") == "ok" else f"  [{s['status']}]"
+        print(f"  {label:<44} {offset_ms:>9.1f} {dur_ms:>9.1f}  |{bar:<{BAR_WIDTH}}|{status}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CaféBot trace report")
+    parser.add_argument("path", nargs="?", default="traces.jsonl", help="Span JSONL file")
+    parser.add_argument("--trace", type=str, default=None, help="Print the waterfall of a single trace id")
+    parser.add_argument("--last", type=int, default=3, help="Number of most recent waterfalls to print")
+    parser.add_argument("--no-percentiles", action="store_true", help="Only print waterfalls")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+    if not spans:
+        print(f"No spans found in {args.path}.")
+        return
+    traces = group_traces(spans)
+
+    if args.trace:
+        if args.trace not in traces:
+            print(f"Trace {args.trace} not found.")
+            return
+        print_waterfall(args.trace, traces[args.trace])
+        return
+
+    if not args.no_percentiles:
+        print_percentiles(spans, traces)
+
+    recent = sorted(traces.items(), key=lambda kv: trace_bounds(kv[1])[0])[-args.last:] if args.last > 0 else []
+    for trace_id, trace_spans in recent:
+        print_waterfall(trace_id, trace_spans)
+
+
+if __name__ == "__main__":
+    main()